@@ -0,0 +1,236 @@
+import gzip
+import json
+import random
+import signal
+import threading
+import time
+import http.client
+import urllib.parse
+import psutil
+import sys
+import os
+
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.config import (
+    HOST_ID, SPOOL_DIR, AGENT_INGEST_URL, AGENT_SAMPLE_INTERVAL, AGENT_FLUSH_INTERVAL, AGENT_BATCH_MAX,
+    AGENT_RETRY_BASE, AGENT_RETRY_MAX, AGENT_REQUEST_TIMEOUT, AGENT_CPU_BUDGET_PERCENT, AGENT_RSS_BUDGET_MB,
+    AGENT_MAX_SAMPLE_INTERVAL, AGENT_PAYLOAD_FORMAT
+)
+from app.crud.SpoolCrud import DurableSpool
+from app.dataoperate.hostmetrics import HostMetrics
+from app.dataoperate.wireformat import encode_batch, BATCH_CONTENT_TYPE
+from bson import ObjectId
+
+MB = 1024 ** 2
+
+
+class ResourceBudget:
+    """agent 自身的资源占用：按统计窗口计算 CPU 占用（单核百分比）与常驻内存，并与预算比较"""
+    def __init__(self, cpu_budget: float = AGENT_CPU_BUDGET_PERCENT, rss_budget_mb: float = AGENT_RSS_BUDGET_MB):
+        self.process = psutil.Process()
+        self.cpu_budget = cpu_budget
+        self.rss_budget_mb = rss_budget_mb
+        self.cpu_percent = 0.0
+        self.rss_mb = self.process.memory_info().rss / MB
+        self._last = (time.monotonic(), self._cpu_seconds())
+
+    def _cpu_seconds(self) -> float:
+        times = self.process.cpu_times()
+        return times.user + times.system
+
+    def update(self) -> None:
+        """统计上次调用以来的 CPU 占用与当前常驻内存"""
+        now, cpu = time.monotonic(), self._cpu_seconds()
+        elapsed = now - self._last[0]
+        if elapsed > 0:
+            self.cpu_percent = (cpu - self._last[1]) / elapsed * 100
+        self._last = (now, cpu)
+        self.rss_mb = self.process.memory_info().rss / MB
+
+    @property
+    def over_cpu(self) -> bool:
+        return self.cpu_percent > self.cpu_budget
+
+    @property
+    def over_rss(self) -> bool:
+        return self.rss_mb > self.rss_budget_mb
+
+    def report(self):
+        return {
+            "cpu_percent": round(self.cpu_percent, 3),
+            "cpu_budget_percent": self.cpu_budget,
+            "rss_mb": round(self.rss_mb, 1),
+            "rss_budget_mb": self.rss_budget_mb,
+            "over_budget": self.over_cpu or self.over_rss
+        }
+
+
+class CollectAgent:
+    """
+    独立采集 agent：不连接 MongoDB，复用服务端的 HostMetrics 采集本机指标
+    - 采样线程：按采样间隔采集，样本追加到本地持久化队列（进程重启、中心不可达期间不丢失）
+    - 上报线程：每隔上报间隔（带抖动）从队列按批读取，编码（默认样本二进制格式）并 gzip 压缩后 POST 到中心的 /inforeceive/ingest，
+      成功后才提交回放位置；失败时按指数退避 + 随机抖动重试，避免大量主机同时重连
+    - 自身 CPU / 内存占用随每批上报给中心；CPU 超出预算时拉长采样间隔，回落到预算一半以下时逐步恢复
+    """
+    def __init__(self, url: str = AGENT_INGEST_URL, host_id: str = HOST_ID):
+        self.url = urllib.parse.urlsplit(url)
+        self.host_id = host_id
+        self.metrics = HostMetrics()
+        self.spool = DurableSpool(os.path.join(SPOOL_DIR, "agent"))
+        self.budget = ResourceBudget()
+        self.interval = AGENT_SAMPLE_INTERVAL
+        self._stop = threading.Event()
+        self._conn = None
+        # 运行统计
+        self.sample_count = 0
+        self.shipped_count = 0
+        self.rejected_count = 0
+        self.batch_count = 0
+        self.failed_batches = 0
+        self.last_error = None
+
+    def stats(self):
+        spool = self.spool.stats()
+        return dict(self.budget.report(), **{
+            "sample_interval": self.interval,
+            "sample_count": self.sample_count,
+            "shipped_count": self.shipped_count,
+            "rejected_count": self.rejected_count,
+            "batch_count": self.batch_count,
+            "failed_batches": self.failed_batches,
+            "backlog": spool["backlog"],
+            "dropped_count": spool["dropped_count"],
+            "last_error": self.last_error
+        })
+
+    def _adjust_interval(self) -> None:
+        """按自身 CPU 占用调整采样间隔"""
+        self.budget.update()
+        if self.budget.over_cpu and self.interval < AGENT_MAX_SAMPLE_INTERVAL:
+            self.interval = min(self.interval * 2, AGENT_MAX_SAMPLE_INTERVAL)
+            print(f"⚠️ CPU 占用 {self.budget.cpu_percent:.2f}% 超出预算 {self.budget.cpu_budget}%，"
+                  f"采样间隔调整为 {self.interval:.0f} s")
+        elif self.budget.cpu_percent < self.budget.cpu_budget / 2 and self.interval > AGENT_SAMPLE_INTERVAL:
+            self.interval = max(self.interval / 2, AGENT_SAMPLE_INTERVAL)
+        if self.budget.over_rss:
+            print(f"⚠️ 常驻内存 {self.budget.rss_mb:.1f} MB 超出预算 {self.budget.rss_budget_mb} MB")
+
+    def _encode(self, batch):
+        """按 AGENT_PAYLOAD_FORMAT 编码一批样本并 gzip 压缩，返回 (请求体, Content-Type)"""
+        header = {"host_id": self.host_id, "agent": self.stats()}
+        if AGENT_PAYLOAD_FORMAT == "wire":
+            return gzip.compress(encode_batch(batch, header), 6), BATCH_CONTENT_TYPE
+        payload = dict(header, samples=batch)
+        # _id 以十六进制字符串发送，中心按同一 _id 去重
+        return gzip.compress(json.dumps(payload, separators=(",", ":"), default=str).encode(), 6), "application/json"
+
+    def _post(self, body: bytes, content_type: str):
+        """发送一批样本（复用长连接），返回服务端响应；连接异常时关闭连接，下次重建"""
+        if self._conn is None:
+            connection = http.client.HTTPSConnection if self.url.scheme == "https" else http.client.HTTPConnection
+            self._conn = connection(self.url.hostname, self.url.port, timeout=AGENT_REQUEST_TIMEOUT)
+        try:
+            self._conn.request("POST", self.url.path or "/", body=body, headers={
+                "Content-Type": content_type,
+                "Content-Encoding": "gzip",
+                "X-Host-Id": self.host_id
+            })
+            response = self._conn.getresponse()
+            data = response.read()
+        except Exception:
+            self._conn.close()
+            self._conn = None
+            raise
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+        result = json.loads(data)
+        if result.get("errCode") != 0:
+            raise RuntimeError(result.get("message"))
+        return result["data"]
+
+    def ship_once(self) -> bool:
+        """
+        上报队列中积压的全部样本（每次请求至多 AGENT_BATCH_MAX 条）
+        :return: 全部成功返回 True，失败时已上报的部分保持提交，其余留在队列中等待重试
+        """
+        while True:
+            batch, position = self.spool.read_batch(AGENT_BATCH_MAX)
+            if not batch:
+                return True
+            try:
+                result = self._post(*self._encode(batch))
+            except Exception as e:
+                self.failed_batches += 1
+                self.last_error = str(e)
+                return False
+            self.spool.commit(position)
+            self.batch_count += 1
+            self.shipped_count += result["accepted"] + result.get("duplicates", 0)
+            self.rejected_count += result["rejected"]
+            self.last_error = None
+            if result["rejected"]:
+                print(f"⚠️ 中心拒绝 {result['rejected']} 条样本: {result['errors'][:3]}")
+
+    def _ship_loop(self) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            if attempt == 0:
+                wait = AGENT_FLUSH_INTERVAL * random.uniform(0.9, 1.1)
+            else:
+                # 指数退避 + 完全随机抖动：等待时间在 [0, min(上限, 基数 × 2^n)] 内均匀分布
+                wait = random.uniform(0, min(AGENT_RETRY_MAX, AGENT_RETRY_BASE * 2 ** attempt))
+            if self._stop.wait(wait):
+                break
+            if self.ship_once():
+                attempt = 0
+            else:
+                attempt += 1
+                print(f"❌ 上报失败（第 {attempt} 次）: {self.last_error}，积压 {self.spool.stats()['backlog']} 条")
+
+    def run(self) -> None:
+        """主循环：采样写入本地队列，上报在后台线程中进行"""
+        print(f"采集 agent 启动：主机 {self.host_id}，每 {self.interval:.0f} s 采样，"
+              f"每 {AGENT_FLUSH_INTERVAL:.0f} s 上报到 {self.url.geturl()}（按 Ctrl+C 停止）")
+        self.spool.open()
+        shipper = threading.Thread(target=self._ship_loop, name="agent-shipper", daemon=True)
+        shipper.start()
+        next_tick = time.monotonic()
+        ticks = 0
+        try:
+            while not self._stop.is_set():
+                try:
+                    # 入队时生成 _id：未收到响应而重发的批次携带相同的 _id，中心据此去重
+                    self.spool.append(dict(self.metrics.sample(), _id=ObjectId()))
+                    self.sample_count += 1
+                except Exception as e:
+                    print(f"采集失败: {e}")
+                ticks += 1
+                if ticks % 10 == 0:
+                    self._adjust_interval()
+                next_tick += self.interval
+                delay = next_tick - time.monotonic()
+                if delay < 0:
+                    # 落后超过一个周期时不补采，从当前时间重新对齐
+                    next_tick = time.monotonic()
+                elif self._stop.wait(delay):
+                    break
+        except KeyboardInterrupt:
+            print("\n已停止采集")
+        finally:
+            self._stop.set()
+            shipper.join()
+            # 退出前尽量把剩余样本上报一次，失败的留在队列中，下次启动后继续上报
+            if not self.ship_once():
+                print(f"❌ 退出前上报失败，{self.spool.stats()['backlog']} 条样本留在本地队列: {self.last_error}")
+            print(f"agent 状态: {self.stats()}")
+            self.spool.close()
+
+    def stop(self, *args) -> None:
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    agent = CollectAgent(sys.argv[1] if len(sys.argv) > 1 else AGENT_INGEST_URL)
+    signal.signal(signal.SIGTERM, agent.stop)
+    agent.run()
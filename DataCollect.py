@@ -1,7 +1,16 @@
 import psutil
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
 import time
 import platform
+import sys
+import os
+
+sys.path.append(os.path.abspath("./fastapi"))
+from app.dataoperate.counterrate import CounterRate
+from app.core.config import SPOOL_DIR, SPOOL_REPLAY_BATCH
+from app.crud.SpoolCrud import DurableSpool
 
 # MongoDB 连接配置
 uri = "mongodb://localhost:27017/"
@@ -9,10 +18,20 @@ client = MongoClient(uri)
 db = client.test  # 数据库名，可自定义
 collection = db.data1  # 集合名，可自定义
 
+# 累计计数器速率引擎，跨采样保留上一次的原始计数
+counter_rate = CounterRate()
+
+# 批量写入配置
+BATCH_SIZE = 30        # 每批写入条数
+FLUSH_INTERVAL = 10    # 最长刷写间隔（秒）
+# 样本先追加到本地持久化队列，MongoDB 不可用或进程重启期间不丢失，恢复后按批回放
+spool = DurableSpool(os.path.join(SPOOL_DIR, "datacollect"))
+
 
 def get_detailed_system_metrics():
     """采集系统指标，严格保留 cpu_info 结构"""
     metrics = {}
+    sample_time = time.monotonic()
 
     # ========== 1. CPU 信息（严格按需求定义） ==========
     # CPU 频率处理
@@ -29,6 +48,7 @@ def get_detailed_system_metrics():
     except Exception:
         cpu_model = "Unknown"
 
+    cpu_stats = psutil.cpu_stats()
     cpu_info = {
         "cpu_count": psutil.cpu_count(logical=False),
         "logical_cpu_count": psutil.cpu_count(logical=True),
@@ -36,10 +56,10 @@ def get_detailed_system_metrics():
         "cpu_freq": cpu_freq_current,
         "cpu_model": cpu_model,
         "cpu_stats": {
-            "ctx_switches": psutil.cpu_stats().ctx_switches,
-            "interrupts": psutil.cpu_stats().interrupts,
-            "soft_interrupts": psutil.cpu_stats().soft_interrupts,
-            "syscalls": psutil.cpu_stats().syscalls
+            "ctx_switches": cpu_stats.ctx_switches,
+            "interrupts": cpu_stats.interrupts,
+            "soft_interrupts": cpu_stats.soft_interrupts,
+            "syscalls": cpu_stats.syscalls
         }
     }
     metrics["cpu_info"] = cpu_info
@@ -67,11 +87,11 @@ def get_detailed_system_metrics():
 
     # ========== 3. 磁盘信息（维持原有逻辑） ==========
     disk_info = []
+    disk_io = psutil.disk_io_counters(perdisk=True)  # 每个周期只读取一次
     for part in psutil.disk_partitions():
         if not part.mountpoint.startswith(('/proc', '/sys', '/dev')):
             try:
                 disk_usage = psutil.disk_usage(part.mountpoint)
-                disk_io = psutil.disk_io_counters(perdisk=True)
                 disk_info.append({
                     "device": part.device,
                     "mountpoint": part.mountpoint,
@@ -118,34 +138,66 @@ def get_detailed_system_metrics():
         "boot_time": psutil.boot_time()
     }
 
-    return metrics
+    # ========== 7. 累计计数器每秒速率 ==========
+    return counter_rate.apply(metrics, sample_time)
 
 
-def save_metrics_to_mongodb(metrics):
-    """将指标存入 MongoDB"""
+def save_metrics_to_mongodb(batch):
+    """将一批指标存入 MongoDB"""
     try:
-        result = collection.insert_one(metrics)
-        print(f"✅ 数据已存入 MongoDB，ID: {result.inserted_id}")
+        collection.insert_many(batch, ordered=False)
         return True
+    except BulkWriteError as e:
+        # 重复键说明该样本已在上次重试中写入，其余错误才算失败
+        if all(err.get("code") == 11000 for err in e.details.get("writeErrors", [])):
+            return True
+        print(f"❌ 批量存储部分失败: {e}")
+        return False
     except Exception as e:
         print(f"❌ 存储失败: {e}")
         return False
 
 
+def flush_pending():
+    """回放本地持久化队列中积压的全部样本，失败时保留在队列中等待下次重试"""
+    while True:
+        batch, position = spool.read_batch(SPOOL_REPLAY_BATCH)
+        if not batch:
+            return
+        if not save_metrics_to_mongodb(batch):
+            return
+        spool.commit(position)
+        print(f"✅ 已批量存入 {len(batch)} 条数据")
+
+
 def main():
-    """主循环：每 1 秒采集一次"""
+    """主循环：每 1 秒采集一次，按条数或时间批量写入"""
     print("开始每 1 秒采集系统信息（按 Ctrl+C 停止）")
+    last_flush = time.time()
+    unflushed = 0
     try:
         while True:
             start_time = time.time()
             metrics = get_detailed_system_metrics()
-            save_metrics_to_mongodb(metrics)
+            # 预先分配 _id，回放重试时据此去重
+            metrics["_id"] = ObjectId()
+            spool.append(metrics)
+            unflushed += 1
+            if unflushed >= BATCH_SIZE or start_time - last_flush >= FLUSH_INTERVAL:
+                flush_pending()
+                last_flush = start_time
+                unflushed = 0
             elapsed = time.time() - start_time
             if elapsed < 1:
                 time.sleep(1 - elapsed)
     except KeyboardInterrupt:
         print("\n已停止采集")
     finally:
+        flush_pending()
+        dropped = spool.stats()["dropped_count"]
+        if dropped:
+            print(f"⚠️ 本地持久化队列超出上限，丢弃最旧的样本 {dropped} 条")
+        spool.close()
         client.close()
         print("已关闭 MongoDB 连接")
 
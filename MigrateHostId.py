@@ -0,0 +1,43 @@
+"""
+一次性迁移：给没有 host_id 字段的历史文档补上本机标识（HOST_ID），并创建 (host_id, 时间) 复合索引
+早期单机部署写入的样本与报告没有 host_id，按主机查询时会被漏掉；迁移后按主机过滤与复合索引对历史数据同样有效
+可重复执行，已有 host_id 的文档不会被修改
+用法（仓库根目录下）：python MigrateHostId.py [--dry-run] [主机标识]
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.config import HOST_ID, get_database
+from app.crud.SystemInfoCrud import SystemInfoCrud
+from app.crud.CauseReportCrud import CauseReportCrud
+
+# 需要补齐 host_id 的集合（汇总层级写入时已按 HOST_ID 归属，不需要迁移）
+COLLECTIONS = ("system_info", "cause_report")
+
+
+def migrate_collection(db, collection_name: str, host_id: str, dry_run: bool = False) -> int:
+    """
+    给一个集合中缺少 host_id 的文档补上主机标识（时序集合只允许修改 metaField，host_id 正是 metaField）
+    :return: 补齐的文档数
+    """
+    query = {"host_id": None}
+    if dry_run:
+        count = db[collection_name].count_documents(query)
+    else:
+        count = db[collection_name].update_many(query, {"$set": {"host_id": host_id}}).modified_count
+    print(f"{collection_name}: 补齐 {count} 条")
+    return count
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--dry-run"]
+    dry_run = "--dry-run" in sys.argv
+    host_id = args[0] if args else HOST_ID
+    db = get_database()
+    for collection_name in COLLECTIONS:
+        migrate_collection(db, collection_name, host_id, dry_run)
+    if not dry_run:
+        SystemInfoCrud(db).ensure_indexes()
+        CauseReportCrud(db).ensure_indexes()
+        print("(host_id, 时间) 复合索引已创建")
@@ -0,0 +1,64 @@
+"""
+一次性迁移：把历史文档中字符串格式（"%Y-%m-%d %H:%M:%S"）的时间字段转换为 BSON 日期，并创建时间索引
+可重复执行，已转换的文档不会被再次处理
+用法（仓库根目录下）：python MigrateTimestamps.py [--dry-run]
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath("./fastapi"))
+from pymongo import UpdateOne
+from app.core.config import get_database
+from app.core.timeutil import to_datetime
+from app.crud.SystemInfoCrud import SystemInfoCrud, TIMESTAMP_FIELDS
+from app.crud.CauseReportCrud import CauseReportCrud, REPORT_TIMESTAMP_FIELDS
+
+BATCH_SIZE = 1000
+
+# 集合 -> 需要转换的时间字段
+MIGRATIONS = {
+    "system_info": TIMESTAMP_FIELDS,
+    "cause_report": REPORT_TIMESTAMP_FIELDS,
+}
+
+
+def migrate_field(db, collection_name: str, field: str, dry_run: bool = False) -> int:
+    """
+    转换一个集合中的一个时间字段
+    :return: 转换的文档数
+    """
+    collection = db[collection_name]
+    cursor = collection.find({field: {"$type": "string"}}, {field: 1})
+    converted = 0
+    skipped = 0
+    batch = []
+    for doc in cursor:
+        value = to_datetime(doc[field])
+        if isinstance(value, str):
+            # 空字符串或格式不符的值保持原样
+            skipped += 1
+            continue
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {field: value}}))
+        if len(batch) >= BATCH_SIZE:
+            if not dry_run:
+                collection.bulk_write(batch, ordered=False)
+            converted += len(batch)
+            batch = []
+    if batch:
+        if not dry_run:
+            collection.bulk_write(batch, ordered=False)
+        converted += len(batch)
+    print(f"{collection_name}.{field}: 转换 {converted} 条，跳过 {skipped} 条")
+    return converted
+
+
+if __name__ == "__main__":
+    dry_run = "--dry-run" in sys.argv
+    db = get_database()
+    for collection_name, fields in MIGRATIONS.items():
+        for field in fields:
+            migrate_field(db, collection_name, field, dry_run)
+    if not dry_run:
+        SystemInfoCrud(db).ensure_indexes()
+        CauseReportCrud(db).ensure_indexes()
+        print("时间索引已创建")
@@ -0,0 +1,144 @@
+"""
+system_info 存储布局对比：每秒一条文档 vs 应用层列式桶（bucketlayout）
+1. 不依赖数据库：对同一批合成样本比较 BSON 编码后的体积
+2. 连接 MongoDB 时：分别写入两个独立的测试库，对比磁盘占用、索引大小与按主机 + 时间范围读取样本的延迟
+用法（仓库根目录下）：python benchmark/bucket_layout_bench.py [样本数] [主机数] [查询次数]
+"""
+import sys
+import os
+import time
+import random
+import datetime
+import statistics
+
+sys.path.append(os.path.abspath("./fastapi"))
+sys.path.append(os.path.abspath("./benchmark"))
+import bson
+from app.core.config import BUCKET_SPAN_SECONDS, BUCKET_MAX_SAMPLES
+from app.core.database import database_manager
+from app.crud.SystemInfoCrud import SystemInfoCrud
+from app.dataoperate.bucketlayout import pack_bucket, unpack_bucket, BUCKET_COLLECTION
+from app.dataoperate.rollup import bucket_start
+from storage_layout_bench import synth_sample, footprint
+
+BENCH_DATABASES = {"standard": "SH13_bucket_bench_standard", "bucket": "SH13_bucket_bench_bucket"}
+BATCH_SIZE = 10000
+MB = 1024 ** 2
+
+
+def generate(total, hosts, end):
+    """按主机轮流生成样本，每台主机每秒一条，时间截止到 end"""
+    per_host = total // hosts
+    start_ts = end - datetime.timedelta(seconds=per_host)
+    i = 0
+    for second in range(per_host):
+        ts = start_ts + datetime.timedelta(seconds=second)
+        for h in range(hosts):
+            yield synth_sample(f"host-{h}", ts, i)
+            i += 1
+
+
+def to_buckets(samples):
+    """按主机、按 BUCKET_SPAN_SECONDS 窗口分组打包，与 SampleBucketer 的封桶规则一致"""
+    open_buckets = {}
+    for sample in samples:
+        window = bucket_start(sample["timestamp"], BUCKET_SPAN_SECONDS)
+        current = open_buckets.get(sample["host_id"])
+        if current is not None and (current[0] != window or len(current[1]) >= BUCKET_MAX_SAMPLES):
+            yield pack_bucket(current[1])
+            current = None
+        if current is None:
+            current = open_buckets[sample["host_id"]] = (window, [])
+        current[1].append(sample)
+    for _, docs in open_buckets.values():
+        yield pack_bucket(docs)
+
+
+def encoded_size(total, hosts):
+    """本地比较两种布局的 BSON 体积，并校验解包结果与原样本一致"""
+    end = datetime.datetime.now().replace(microsecond=0)
+    samples = list(generate(total, hosts, end))
+    raw = sum(len(bson.encode(sample)) for sample in samples)
+    buckets = list(to_buckets(samples))
+    packed = sum(len(bson.encode(doc)) for doc in buckets)
+    restored = [s for doc in buckets for s in unpack_bucket(doc)]
+    restored.sort(key=lambda s: (s["timestamp"], s["host_id"]))
+    samples.sort(key=lambda s: (s["timestamp"], s["host_id"]))
+    assert restored == samples, "解包结果与原样本不一致"
+    print(f"BSON 体积：逐条文档 {raw / MB:.2f} MB，列式桶 {packed / MB:.2f} MB（{len(buckets)} 个桶），"
+          f"压缩比 {packed / raw:.2%}")
+
+
+def load(db, layout, total, hosts, end):
+    """写入测试数据，返回 (样本数, 耗时)"""
+    started = time.perf_counter()
+    count = 0
+    batch = []
+    if layout == "standard":
+        collection, documents = db["system_info"], generate(total, hosts, end)
+    else:
+        collection, documents = db[BUCKET_COLLECTION], to_buckets(generate(total, hosts, end))
+    for doc in documents:
+        batch.append(doc)
+        count += doc.get("count", 1)
+        if len(batch) >= (BATCH_SIZE if layout == "standard" else max(1, BATCH_SIZE // BUCKET_MAX_SAMPLES)):
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    return count, time.perf_counter() - started
+
+
+def query_latency(crud, hosts, start, end, span, rounds):
+    """随机主机、随机起点的时间范围读取延迟（含桶解包）"""
+    latencies = []
+    rows = 0
+    seconds = int((end - start).total_seconds() - span.total_seconds())
+    for _ in range(rounds):
+        lo = start + datetime.timedelta(seconds=random.randint(0, max(seconds, 0)))
+        t = time.perf_counter()
+        rows += len(crud._load(lo, lo + span, f"host-{random.randrange(hosts)}"))
+        latencies.append(time.perf_counter() - t)
+    latencies.sort()
+    return latencies, rows / rounds
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 864000
+    hosts = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    encoded_size(min(total, 36000), hosts)
+
+    try:
+        database_manager.connect()
+    except Exception as e:
+        print(f"MongoDB 不可用，跳过写入与查询对比: {e}")
+        sys.exit(0)
+
+    end = datetime.datetime.now().replace(microsecond=0)
+    start = end - datetime.timedelta(seconds=total // hosts)
+    layouts = {}
+    for layout, database in BENCH_DATABASES.items():
+        database_manager.get_client().drop_database(database)
+        db = database_manager.get_client()[database]
+        crud = SystemInfoCrud(db)
+        crud._storage = layout
+        crud.ensure_indexes()
+        count, elapsed = load(db, layout, total, hosts, end)
+        name = "system_info" if layout == "standard" else BUCKET_COLLECTION
+        storage, index = footprint(db, name)
+        layouts[layout] = (crud, storage, index)
+        print(f"{layout:<8} 写入 {count} 条样本，耗时 {elapsed:.1f} s（{count / elapsed:.0f} 条/s），"
+              f"数据 {storage / MB:.1f} MB，索引 {index / MB:.1f} MB")
+
+    for label, span in (("10 分钟", datetime.timedelta(minutes=10)), ("1 小时", datetime.timedelta(hours=1))):
+        for layout, (crud, _, _) in layouts.items():
+            latencies, rows = query_latency(crud, hosts, start, end, span, rounds)
+            print(f"{label:<6} {layout:<8} 平均 {statistics.mean(latencies) * 1000:8.2f} ms  "
+                  f"p50 {latencies[len(latencies) // 2] * 1000:8.2f} ms  "
+                  f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:8.2f} ms  平均 {rows:.0f} 行")
+
+    standard, bucket = layouts["standard"], layouts["bucket"]
+    if standard[1]:
+        print(f"列式桶磁盘占用（数据 + 索引）为逐条文档的 {(bucket[1] + bucket[2]) / (standard[1] + standard[2]):.2%}")
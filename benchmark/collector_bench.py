@@ -0,0 +1,40 @@
+"""
+采集后端单次采样开销对比：psutil 路径 vs /proc 单次读取路径
+只比较 cpu_info/memory_info/disk_info/network_info 部分，进程信息两者相同
+用法（仓库根目录下）：python benchmark/collector_bench.py [采样次数]
+"""
+import sys
+import os
+import time
+import statistics
+
+sys.path.append(os.path.abspath("./fastapi"))
+from app.dataoperate.datacollect import DataCollect
+from app.dataoperate.procreader import ProcReader
+
+
+def bench(name, func, rounds):
+    func()  # 预热
+    wall = []
+    cpu_start = time.process_time()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        wall.append(time.perf_counter() - start)
+    cpu_total = time.process_time() - cpu_start
+    wall.sort()
+    print(f"{name:<8} 平均 {statistics.mean(wall) * 1e6:9.1f} us  "
+          f"p50 {wall[len(wall) // 2] * 1e6:9.1f} us  "
+          f"p99 {wall[int(len(wall) * 0.99)] * 1e6:9.1f} us  "
+          f"CPU {cpu_total / rounds * 1e6:9.1f} us/次")
+    return statistics.mean(wall)
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    psutil_collect = DataCollect(backend="psutil")
+    reader = ProcReader()
+    print(f"采样次数: {rounds}")
+    t_psutil = bench("psutil", psutil_collect.read_psutil, rounds)
+    t_proc = bench("proc", reader.read, rounds)
+    print(f"/proc 后端耗时为 psutil 路径的 {t_proc / t_psutil:.2%}")
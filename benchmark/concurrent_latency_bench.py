@@ -0,0 +1,76 @@
+"""
+并发延迟测试：/systeminfo/getsysteminfo 单独请求 vs 同时存在慢查询（/solution/all 等）时的延迟
+数据库调用若阻塞事件循环，后者的 p99 会被慢查询拖到与其相同的量级
+用法（先启动服务）：python benchmark/concurrent_latency_bench.py [基础地址] [请求次数] [背景并发数]
+"""
+import sys
+import time
+import threading
+import statistics
+import urllib.request
+
+FAST_PATH = "/systeminfo/getsysteminfo"
+SLOW_PATHS = ["/solution/all", "/systeminfo/getdailysysteminfo", "/causereport/causereport/summary_by_day"]
+
+
+def get(url):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=60) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+
+def measure(base, rounds):
+    latencies = []
+    for _ in range(rounds):
+        try:
+            latencies.append(get(base + FAST_PATH))
+        except Exception as e:
+            print(f"请求失败: {e}")
+    latencies.sort()
+    return latencies
+
+
+def report(name, latencies):
+    if not latencies:
+        print(f"{name:<10} 无有效结果")
+        return
+    print(f"{name:<10} 平均 {statistics.mean(latencies) * 1000:8.2f} ms  "
+          f"p50 {latencies[len(latencies) // 2] * 1000:8.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:8.2f} ms  "
+          f"max {latencies[-1] * 1000:8.2f} ms")
+
+
+def background(base, stop, counter):
+    i = 0
+    while not stop.is_set():
+        path = SLOW_PATHS[i % len(SLOW_PATHS)]
+        i += 1
+        try:
+            get(base + path)
+            counter.append(1)
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    base = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8000"
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    get(base + FAST_PATH)  # 预热
+    report("单独请求", measure(base, rounds))
+
+    stop = threading.Event()
+    counter = []
+    threads = [threading.Thread(target=background, args=(base, stop, counter), daemon=True)
+               for _ in range(workers)]
+    for t in threads:
+        t.start()
+    time.sleep(1)
+    loaded = measure(base, rounds)
+    stop.set()
+    for t in threads:
+        t.join()
+    report("并发慢查询", loaded)
+    print(f"背景请求完成数: {len(counter)}（并发 {workers}）")
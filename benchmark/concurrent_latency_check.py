@@ -0,0 +1,109 @@
+"""
+并发延迟检查（不需要启动服务与 MongoDB）：慢查询进行中时 /systeminfo/getsysteminfo 的延迟
+- 慢查询：SolutionCrud.get_all_solutions()（/solution/all），集合的 find 换成阻塞 SLOW_QUERY 秒的同步调用，模拟 pymongo 慢查询
+- 快请求：SystemInfoServe.get_system_info()（/systeminfo/getsysteminfo），读取后台采集缓冲区中的最新样本
+- 对照组：同样的慢查询直接在事件循环中执行，快请求会被拖到与慢查询相同的量级，用来确认检查本身能发现串行化
+按 FastAPI lifespan 的方式创建、关闭数据库线程池，连续进行两轮，确认关闭后可以重新创建
+检查失败时以非零状态退出
+用法（仓库根目录下）：python benchmark/concurrent_latency_check.py [每轮慢查询数] [快请求数]
+"""
+import sys
+import os
+import time
+import asyncio
+
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.dbexecutor import start_db_executor, shutdown_db_executor
+from app.crud.SolutionCrud import SolutionCrud
+from app.dataoperate.hostmetrics import HostMetrics
+from app.dataoperate.sampler import system_sampler
+from app.serve.SystemInfoServe import SystemInfoServe
+
+SLOW_QUERY = 0.5
+# 慢查询进行中时快请求 p99 的上限（秒）
+FAST_P99_LIMIT = SLOW_QUERY / 5
+
+
+class SlowCollection:
+    """find 阻塞 SLOW_QUERY 秒后返回空结果，模拟同步驱动上的慢查询"""
+    def find(self, *args, **kwargs):
+        time.sleep(SLOW_QUERY)
+        return iter([])
+
+    def create_index(self, *args, **kwargs):
+        return None
+
+
+class SlowDatabase:
+    def __getitem__(self, name):
+        return SlowCollection()
+
+    def list_collection_names(self):
+        return ["solutions"]
+
+
+class BlockingSolutionCrud(SolutionCrud):
+    """对照组：不经过线程池，直接在事件循环中执行同步查询（改造前的写法）"""
+    async def get_all_solutions(self):
+        return list(self.db["solutions"].find())
+
+
+async def measure(crud, slow_count, fast_count):
+    """
+    同时发起 slow_count 个慢查询，慢查询进行中每隔 10 ms 安排一个快请求
+    快请求的延迟从计划发起的时刻算起，事件循环被阻塞时的排队时间也计算在内
+    :return: (快请求延迟列表（升序）, 慢查询总耗时)
+    """
+    serve = SystemInfoServe()
+    start = time.perf_counter()
+    slow = [asyncio.create_task(crud.get_all_solutions()) for _ in range(slow_count)]
+    latencies = []
+
+    async def fast(planned):
+        await asyncio.sleep(planned - time.perf_counter())
+        await serve.get_system_info()
+        latencies.append(time.perf_counter() - planned)
+
+    await asyncio.gather(*(fast(start + 0.01 * (i + 1)) for i in range(fast_count)), *slow)
+    return sorted(latencies), time.perf_counter() - start
+
+
+def p99(latencies):
+    return latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+
+
+def main():
+    slow_count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    fast_count = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    system_sampler.buffer.append(HostMetrics().sample())
+    failures = []
+
+    for round_no in (1, 2):
+        # 与 lifespan 相同：开始时创建线程池，结束时关闭
+        start_db_executor()
+        try:
+            latencies, elapsed = asyncio.run(measure(SolutionCrud(db=SlowDatabase()), slow_count, fast_count))
+        finally:
+            shutdown_db_executor()
+        print(f"第 {round_no} 轮（线程池）：快请求 p99 {p99(latencies) * 1000:8.2f} ms  max {latencies[-1] * 1000:8.2f} ms  "
+              f"{slow_count} 个慢查询共 {elapsed:.2f} s")
+        if p99(latencies) > FAST_P99_LIMIT:
+            failures.append(f"第 {round_no} 轮快请求 p99 {p99(latencies) * 1000:.1f} ms 超过 {FAST_P99_LIMIT * 1000:.0f} ms")
+        if elapsed > SLOW_QUERY * slow_count * 0.75:
+            failures.append(f"第 {round_no} 轮 {slow_count} 个慢查询耗时 {elapsed:.2f} s，没有并发执行")
+
+    latencies, elapsed = asyncio.run(measure(BlockingSolutionCrud(db=SlowDatabase()), slow_count, fast_count))
+    print(f"对照组（阻塞事件循环）：快请求 p99 {p99(latencies) * 1000:8.2f} ms  max {latencies[-1] * 1000:8.2f} ms  "
+          f"{slow_count} 个慢查询共 {elapsed:.2f} s")
+    if latencies[-1] < SLOW_QUERY:
+        failures.append("对照组中的快请求没有被慢查询阻塞，检查方法无效")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ 慢查询不再阻塞事件循环，数据库线程池可随 lifespan 重新创建")
+
+
+if __name__ == "__main__":
+    main()
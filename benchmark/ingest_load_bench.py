@@ -0,0 +1,124 @@
+"""
+远程采集接入压测：模拟大量主机按 1 Hz 采样、每隔若干秒 gzip 打包上报到 /inforeceive/ingest
+统计服务端实际接收的样本速率、请求延迟与失败数，判断单个 worker 能否跟上 主机数 × 1 条/秒
+用法（先以单 worker 启动服务）：python benchmark/ingest_load_bench.py [基础地址] [主机数] [持续秒数] [上报间隔秒] [并发连接数]
+"""
+import sys
+import os
+import gzip
+import json
+import time
+import random
+import datetime
+import threading
+import statistics
+import http.client
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath("./benchmark"))
+from storage_layout_bench import synth_sample
+
+INGEST_PATH = "/inforeceive/ingest"
+
+
+def make_body(host_id, end, count, seq):
+    """生成一台主机最近 count 秒的样本并 gzip 压缩"""
+    samples = []
+    for k in range(count):
+        sample = synth_sample(host_id, end - datetime.timedelta(seconds=count - 1 - k), seq + k)
+        sample["timestamp"] = sample["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
+        sample.pop("id")
+        samples.append(sample)
+    return gzip.compress(json.dumps({"host_id": host_id, "samples": samples}).encode(), 5)
+
+
+_local = threading.local()
+
+
+def post(url, body):
+    """发送一批样本，返回 (耗时, 服务端接收条数)；每个线程复用一条长连接，与 agent 的行为一致"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        parts = urllib.parse.urlsplit(url)
+        conn = _local.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    start = time.perf_counter()
+    try:
+        conn.request("POST", urllib.parse.urlsplit(url).path, body=body,
+                     headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        result = json.loads(conn.getresponse().read())
+    except Exception:
+        conn.close()
+        _local.conn = None
+        raise
+    elapsed = time.perf_counter() - start
+    if result["errCode"] != 0:
+        raise RuntimeError(result["message"])
+    return elapsed, result["data"]["accepted"]
+
+
+if __name__ == "__main__":
+    base = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8000"
+    hosts = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 60
+    interval = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+    workers = int(sys.argv[5]) if len(sys.argv) > 5 else 16
+    url = base + INGEST_PATH
+
+    # 请求体在压测开始前预先生成，避免客户端 CPU 成为瓶颈；每台主机各一份，轮流复用
+    print(f"预生成 {hosts} 台主机的上报数据（每批 {interval} 条）...")
+    now = datetime.datetime.now().replace(microsecond=0)
+    bodies = [make_body(f"load-host-{h}", now, interval, h * interval) for h in range(hosts)]
+    print(f"平均请求体 {statistics.mean(len(b) for b in bodies) / 1024:.1f} KB（gzip）")
+
+    latencies = []
+    accepted = [0]
+    failures = [0]
+    lock = threading.Lock()
+
+    def send(h):
+        try:
+            elapsed, count = post(url, bodies[h])
+            with lock:
+                latencies.append(elapsed)
+                accepted[0] += count
+        except Exception as e:
+            with lock:
+                failures[0] += 1
+                if failures[0] <= 5:
+                    print(f"请求失败: {e}")
+
+    # 每台主机在各自的随机相位上每 interval 秒上报一次，整体请求速率为 hosts / interval
+    offsets = [random.uniform(0, interval) for _ in range(hosts)]
+    schedule = sorted((offsets[h], h) for h in range(hosts))
+    lagging = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        round_start = 0.0
+        while round_start < duration:
+            for offset, h in schedule:
+                due = round_start + offset
+                if due >= duration:
+                    break
+                delay = started + due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -interval:
+                    lagging += 1
+                pool.submit(send, h)
+            round_start += interval
+    elapsed = time.perf_counter() - started
+
+    expected = hosts * duration
+    rate = accepted[0] / elapsed
+    print(f"{hosts} 台主机 × 1 Hz，上报间隔 {interval} s，持续 {elapsed:.1f} s，请求 {len(latencies)} 次，失败 {failures[0]} 次")
+    print(f"接收 {accepted[0]} 条（期望约 {expected:.0f} 条），实际速率 {rate:.0f} 条/s，目标 {hosts} 条/s")
+    if latencies:
+        latencies.sort()
+        print(f"请求延迟 平均 {statistics.mean(latencies) * 1000:8.2f} ms  "
+              f"p50 {latencies[len(latencies) // 2] * 1000:8.2f} ms  "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:8.2f} ms  "
+              f"max {latencies[-1] * 1000:8.2f} ms")
+    if lagging:
+        print(f"客户端调度落后超过一个上报间隔 {lagging} 次，结果偏保守")
+    print("结论：" + ("可以" if rate >= hosts * 0.95 and failures[0] == 0 else "无法") + f"稳定承载 {hosts} 台主机 × 1 Hz")
@@ -0,0 +1,72 @@
+"""
+本地嵌入式指标存储（LocalMetricCrud）：压缩率与按时间范围读取的延迟
+写入合成样本（单主机、每秒一条）后，对比段文件大小与 BSON 编码大小，并测量不同时间跨度的读取延迟
+不需要 MongoDB，数据写入临时目录
+用法（仓库根目录下）：python benchmark/local_store_bench.py [样本数] [查询次数]
+"""
+import sys
+import os
+import time
+import random
+import shutil
+import tempfile
+import datetime
+import statistics
+
+sys.path.append(os.path.abspath("./fastapi"))
+sys.path.append(os.path.abspath("./benchmark"))
+import bson
+from app.crud.LocalMetricCrud import LocalMetricStore
+from storage_layout_bench import synth_sample
+
+MB = 1024 ** 2
+WEEK = 7 * 24 * 3600
+
+
+def read_latency(store, start, end, span, rounds, projection=None):
+    latencies = []
+    rows = 0
+    seconds = int((end - start).total_seconds() - span.total_seconds())
+    for _ in range(rounds):
+        lo = start + datetime.timedelta(seconds=random.randint(0, max(seconds, 0)))
+        t = time.perf_counter()
+        rows += len(store.find(lo, lo + span, projection=projection))
+        latencies.append(time.perf_counter() - t)
+    latencies.sort()
+    return latencies, rows / rounds
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 86400
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    directory = tempfile.mkdtemp(prefix="local_store_bench_")
+    try:
+        store = LocalMetricStore(directory, retention_days=None)
+        end = datetime.datetime.now().replace(microsecond=0)
+        start = end - datetime.timedelta(seconds=total)
+        raw = 0
+        started = time.perf_counter()
+        for i in range(total):
+            sample = synth_sample("host-0", start + datetime.timedelta(seconds=i), i)
+            raw += len(bson.encode(sample))
+            store.add(sample)
+        store.flush()
+        elapsed = time.perf_counter() - started
+        stats = store.stats()
+        per_sample = stats["disk_bytes"] / total
+        print(f"写入 {total} 条，耗时 {elapsed:.1f} s（{total / elapsed:.0f} 条/s），"
+              f"{stats['segments']} 个段 / {stats['blocks']} 个块")
+        print(f"段文件 {stats['disk_bytes'] / MB:.2f} MB（{per_sample:.1f} 字节/条），"
+              f"BSON {raw / MB:.2f} MB（{raw / total:.1f} 字节/条），压缩比 {stats['disk_bytes'] / raw:.2%}")
+        print(f"按 1 Hz 估算，一周约 {per_sample * WEEK / MB:.1f} MB")
+
+        projection = {"_id": 0, "timestamp": 1, "cpu_info.cpu_percent": 1, "memory_info.memory_percent": 1}
+        for label, span in (("10 分钟", datetime.timedelta(minutes=10)), ("1 小时", datetime.timedelta(hours=1))):
+            for mode, proj in (("整条样本", None), ("两个字段", projection)):
+                latencies, rows = read_latency(store, start, end, span, rounds, proj)
+                print(f"{label:<6} {mode:<6} 平均 {statistics.mean(latencies) * 1000:8.2f} ms  "
+                      f"p50 {latencies[len(latencies) // 2] * 1000:8.2f} ms  平均 {rows:.0f} 行")
+        store.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,102 @@
+"""
+system_info 读取的字段投影（fields=）收益：完整样本 vs 只取标量指标
+对同一天的数据分别统计 MongoDB 返回的 BSON 字节数、取回耗时、BSON 解码耗时，以及接口 JSON 响应大小与总耗时
+合成样本写入独立的测试库，不影响业务数据
+用法（仓库根目录下）：python benchmark/projection_bench.py [样本数] [每条样本的进程数]
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import datetime
+
+sys.path.append(os.path.abspath("./fastapi"))
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import ASCENDING
+from app.core.database import database_manager
+from app.core.timeutil import prefix_range
+from app.crud.SystemInfoCrud import SystemInfoCrud, sample_projection
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from storage_layout_bench import synth_sample
+
+BENCH_DATABASE = "SH13_projection_bench"
+BATCH_SIZE = 5000
+MB = 1024 ** 2
+
+CASES = [
+    ("完整样本", None),
+    ("CPU / 内存 / 网络速率", ["cpu_info.cpu_percent", "memory_info.memory_percent",
+                          "network_info.bytes_sent_kb_per_sec", "network_info.bytes_recv_kb_per_sec"]),
+    ("仅 CPU", ["cpu_info.cpu_percent"]),
+]
+
+
+def synth_processes(count, i):
+    return [{"pid": 1000 + p, "name": f"proc-{p}", "username": "root",
+             "cpu_percent": (i * 7 + p) % 100 / 10, "memory_percent": (i + p * 3) % 100 / 20} for p in range(count)]
+
+
+def raw_fetch(collection, query, projection):
+    """以 RawBSONDocument 取回（不解码），返回 (BSON 字节列表, 耗时)"""
+    raw = collection.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+    started = time.perf_counter()
+    docs = [doc.raw for doc in raw.find(query, projection).sort("timestamp", ASCENDING)]
+    return docs, time.perf_counter() - started
+
+
+def decode_time(docs):
+    started = time.perf_counter()
+    for doc in docs:
+        bson.decode(doc)
+    return time.perf_counter() - started
+
+
+async def api_read(crud, date, fields):
+    """与 /systeminfo/getdailysysteminfobydate 相同的读取与序列化"""
+    started = time.perf_counter()
+    data = await crud.find_systeminfo_by_date(date, fields=fields)
+    body = json.dumps({"errCode": 0, "message": "success", "data": data}, ensure_ascii=False, default=str).encode()
+    return len(body), time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 86400
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    db = database_manager.get_client()[BENCH_DATABASE]
+    db.drop_collection("system_info")
+    crud = SystemInfoCrud(db)
+    crud.ensure_indexes()
+    day = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    batch = []
+    for i in range(total):
+        sample = synth_sample("bench", day + datetime.timedelta(seconds=i * 86400 / total), i)
+        sample["process_info"] = synth_processes(processes, i)
+        batch.append(sample)
+        if len(batch) >= BATCH_SIZE:
+            db["system_info"].insert_many(batch)
+            batch = []
+    if batch:
+        db["system_info"].insert_many(batch)
+    date = day.strftime("%Y-%m-%d")
+    start, end = prefix_range(date)
+    query = {"timestamp": {"$gte": start, "$lt": end}}
+    print(f"写入 {total} 条样本（{date}，每条 {processes} 个进程）")
+
+    print(f"\n{'读取字段':<22}{'BSON MB':>10}{'取回 ms':>10}{'解码 ms':>10}{'JSON MB':>10}{'接口 ms':>10}")
+    baseline = None
+    for label, fields in CASES:
+        docs, fetch = raw_fetch(db["system_info"], query, sample_projection(fields))
+        size = sum(len(doc) for doc in docs)
+        decode = decode_time(docs)
+        body, elapsed = asyncio.run(api_read(crud, date, fields))
+        if baseline is None:
+            baseline = size
+        print(f"{label:<22}{size / MB:>10.1f}{fetch * 1000:>10.0f}{decode * 1000:>10.0f}"
+              f"{body / MB:>10.1f}{elapsed * 1000:>10.0f}   BSON 为完整样本的 {size / baseline:.1%}")
+
+    database_manager.get_client().drop_database(BENCH_DATABASE)
@@ -0,0 +1,60 @@
+"""
+/systeminfo/range 的降采样开销：7 天数据（分钟级汇总 1 万点 / 秒级原始 60 万点）LTTB 降采样到目标点数的 CPU 耗时，
+以及降采样后与原始点直接返回的 JSON 大小对比；不需要数据库
+用法（仓库根目录下）：python benchmark/range_downsample_bench.py [目标点数] [重复次数]
+"""
+import sys
+import os
+import gzip
+import json
+import math
+import time
+import random
+import datetime
+
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.config import RANGE_VALUE_DECIMALS
+from app.dataoperate.downsample import downsample_series
+
+METRICS = ("cpu_percent", "memory_percent", "bytes_recv_kb_per_sec")
+KB = 1024
+
+
+def synth_columns(count, step):
+    """按固定间隔生成 count 行：日周期 + 噪声 + 偶发尖峰，少量缺失值"""
+    start = datetime.datetime.now().replace(microsecond=0) - datetime.timedelta(seconds=count * step)
+    times = [start + datetime.timedelta(seconds=i * step) for i in range(count)]
+    columns = {field: [] for field in METRICS}
+    for i in range(count):
+        day = math.sin(i * step / 86400 * 2 * math.pi)
+        columns["cpu_percent"].append(min(100.0, 40 + 25 * day + random.gauss(0, 5) + (50 if random.random() < 1e-3 else 0)))
+        columns["memory_percent"].append(60 + 10 * day + random.gauss(0, 1))
+        columns["bytes_recv_kb_per_sec"].append(None if random.random() < 0.01 else abs(random.gauss(200, 80)))
+    return times, columns
+
+
+def raw_size(times, columns):
+    """不降采样、按同样的 [[毫秒, 取值]] 结构返回全部点的 JSON 大小"""
+    millis = [int(t.timestamp() * 1000) for t in times]
+    body = json.dumps({field: [[m, round(v, RANGE_VALUE_DECIMALS)] for m, v in zip(millis, values) if v is not None]
+                       for field, values in columns.items()}, separators=(",", ":")).encode()
+    return len(body), len(gzip.compress(body, 6))
+
+
+if __name__ == "__main__":
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print(f"{'数据源':<14}{'原始点数':>10}{'降采样 ms':>12}{'原始 KB':>10}{'原始 gzip':>11}{'结果 KB':>10}{'结果 gzip':>11}")
+    for label, count, step in (("1m 汇总 7 天", 7 * 1440, 60), ("原始 7 天", 7 * 86400, 1)):
+        times, columns = synth_columns(count, step)
+        rounds = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            series = downsample_series(times, columns, points, RANGE_VALUE_DECIMALS)
+            rounds.append(time.perf_counter() - started)
+        body = json.dumps(series, separators=(",", ":")).encode()
+        full, full_gzip = raw_size(times, columns)
+        print(f"{label:<14}{count:>10}{min(rounds) * 1000:>12.1f}{full / KB:>10.0f}{full_gzip / KB:>11.0f}"
+              f"{len(body) / KB:>10.1f}{len(gzip.compress(body, 6)) / KB:>11.1f}")
+    print(f"\n{len(METRICS)} 个指标，每个降采样到 {points} 点；耗时取 {repeat} 次中的最小值，含时间戳换算")
@@ -0,0 +1,141 @@
+"""
+system_info 存储布局对比：普通集合 vs MongoDB 原生时序集合
+写入同样的合成样本后，对比磁盘占用与按主机 + 时间范围查询的延迟
+需要 MongoDB 5.0+，数据写入独立的测试库，不影响业务数据
+用法（仓库根目录下）：python benchmark/storage_layout_bench.py [样本数] [主机数] [查询次数]
+"""
+import sys
+import os
+import time
+import random
+import datetime
+import statistics
+
+sys.path.append(os.path.abspath("./fastapi"))
+from pymongo import ASCENDING
+from app.core.database import database_manager
+from app.crud.SystemInfoCrud import SystemInfoCrud
+
+BENCH_DATABASE = "SH13_layout_bench"
+BATCH_SIZE = 10000
+MB = 1024 ** 2
+
+
+def synth_sample(host_id, ts, i):
+    """生成一条与采集结果结构相近的合成样本"""
+    cpu = random.uniform(0, 100)
+    mem = random.uniform(20, 90)
+    return {
+        "id": i,
+        "host_id": host_id,
+        "timestamp": ts,
+        "anomaly_id": 0,
+        "cpu_info": {
+            "cpu_count": 8,
+            "logical_cpu_count": 16,
+            "cpu_percent": round(cpu, 1),
+            "cpu_freq": 2400.0,
+            "cpu_model": "x86_64",
+            "cpu_stats": {"ctx_switches": i * 1200, "interrupts": i * 800, "soft_interrupts": i * 500, "syscalls": 0,
+                          "ctx_switches_per_sec": random.uniform(800, 1600)}
+        },
+        "memory_info": {
+            "total_memory_gb": 31.2,
+            "used_memory_gb": 31.2 * mem / 100,
+            "available_memory_gb": 31.2 * (1 - mem / 100),
+            "memory_percent": round(mem, 1),
+            "swap_memory_info": {"total_smemory_gb": 8.0, "used_smemory_gb": 0.5, "smemory_percent": 6.2}
+        },
+        "disk_info": [
+            {"device": "/dev/sda1", "mountpoint": "/", "total_disk_gb": 500.0,
+             "used_disk_gb": 200.0 + i * 1e-6, "disk_percent": 40.0},
+            {"device": "/dev/sdb1", "mountpoint": "/data", "total_disk_gb": 2000.0,
+             "used_disk_gb": 900.0, "disk_percent": 45.0}
+        ],
+        "network_info": {
+            "bytes_sent_kb": i * 12.5, "bytes_recv_kb": i * 30.1,
+            "packets_sent": i * 20, "packets_recv": i * 45,
+            "bytes_sent_kb_per_sec": random.uniform(0, 50), "bytes_recv_kb_per_sec": random.uniform(0, 100)
+        },
+        "process_info": [
+            {"pid": 1000 + p, "name": f"proc{p}", "username": "root",
+             "cpu_percent": random.uniform(0, 10), "memory_percent": random.uniform(0, 5)}
+            for p in range(10)
+        ],
+        "process_summary": {"total_count": 300, "rest": {"count": 290, "cpu_percent": 5.0, "memory_percent": 20.0}}
+    }
+
+
+def load(collection, total, hosts, end):
+    """按主机轮流写入 total 条样本，每台主机每秒一条，时间截止到 end"""
+    per_host = total // hosts
+    start_ts = end - datetime.timedelta(seconds=per_host)
+    batch = []
+    started = time.perf_counter()
+    i = 0
+    for second in range(per_host):
+        ts = start_ts + datetime.timedelta(seconds=second)
+        for h in range(hosts):
+            batch.append(synth_sample(f"host-{h}", ts, i))
+            i += 1
+            if len(batch) >= BATCH_SIZE:
+                collection.insert_many(batch, ordered=False)
+                batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    return i, time.perf_counter() - started
+
+
+def footprint(db, name):
+    stats = db.command("collStats", name)
+    return stats.get("storageSize", 0), stats.get("totalIndexSize", 0)
+
+
+def query_latency(collection, hosts, start, end, span, rounds):
+    """随机主机、随机起点的时间范围查询延迟"""
+    latencies = []
+    rows = 0
+    seconds = int((end - start).total_seconds() - span.total_seconds())
+    for _ in range(rounds):
+        lo = start + datetime.timedelta(seconds=random.randint(0, max(seconds, 0)))
+        query = {"host_id": f"host-{random.randrange(hosts)}", "timestamp": {"$gte": lo, "$lt": lo + span}}
+        t = time.perf_counter()
+        rows += len(list(collection.find(query, {"_id": 0, "timestamp": 1, "cpu_info.cpu_percent": 1})))
+        latencies.append(time.perf_counter() - t)
+    latencies.sort()
+    return latencies, rows / rounds
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 3000000
+    hosts = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    db = database_manager.get_client()[BENCH_DATABASE]
+    crud = SystemInfoCrud(db)
+    end = datetime.datetime.now().replace(microsecond=0)
+    start = end - datetime.timedelta(seconds=total // hosts)
+
+    layouts = {}
+    for layout in ("standard", "timeseries"):
+        name = f"system_info_{layout}"
+        db.drop_collection(name)
+        if layout == "timeseries":
+            crud.create_timeseries_collection(name)
+        db[name].create_index([("host_id", ASCENDING), ("timestamp", ASCENDING)])
+        count, elapsed = load(db[name], total, hosts, end)
+        storage, index = footprint(db, name)
+        layouts[layout] = (db[name], storage, index)
+        print(f"{layout:<10} 写入 {count} 条，耗时 {elapsed:.1f} s（{count / elapsed:.0f} 条/s），"
+              f"数据 {storage / MB:.1f} MB，索引 {index / MB:.1f} MB")
+
+    for label, span in (("1 小时", datetime.timedelta(hours=1)), ("1 天", datetime.timedelta(days=1))):
+        for layout, (collection, _, _) in layouts.items():
+            latencies, rows = query_latency(collection, hosts, start, end, span, rounds)
+            print(f"{label:<5} {layout:<10} 平均 {statistics.mean(latencies) * 1000:8.2f} ms  "
+                  f"p50 {latencies[len(latencies) // 2] * 1000:8.2f} ms  "
+                  f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:8.2f} ms  平均 {rows:.0f} 行")
+
+    standard, timeseries = layouts["standard"], layouts["timeseries"]
+    if timeseries[1]:
+        print(f"时序集合磁盘占用为普通集合的 {(timeseries[1] + timeseries[2]) / (standard[1] + standard[2]):.2%}")
@@ -0,0 +1,79 @@
+"""
+整天历史数据的两种返回方式对比：构造完整列表后一次性序列化 vs 按批读取游标逐批输出 NDJSON
+分别统计首字节时间、总耗时与 Python 堆内存峰值（tracemalloc），合成样本写入独立的测试库，不影响业务数据
+用法（仓库根目录下）：python benchmark/stream_memory_bench.py [样本数]
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import datetime
+import tracemalloc
+
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.database import database_manager
+from app.crud.SystemInfoCrud import SystemInfoCrud
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from storage_layout_bench import synth_sample
+
+BENCH_DATABASE = "SH13_stream_bench"
+BATCH_SIZE = 10000
+MB = 1024 ** 2
+
+
+async def as_list(crud, date):
+    """与 stream=false 相同：整天样本读入列表后序列化为一个响应体"""
+    started = time.perf_counter()
+    body = json.dumps({"errCode": 0, "message": "success", "data": await crud.find_systeminfo_by_date(date)},
+                      ensure_ascii=False, default=str).encode()
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed, len(body)
+
+
+async def as_stream(crud, date):
+    """与 stream=true 相同：逐批取出 NDJSON 分块，模拟客户端边收边丢弃"""
+    started = time.perf_counter()
+    first = None
+    size = 0
+    async for chunk in crud.stream_systeminfo_by_date(date):
+        if first is None:
+            first = time.perf_counter() - started
+        size += len(chunk)
+    return first or 0.0, time.perf_counter() - started, size
+
+
+def measure(fn, crud, date):
+    tracemalloc.start()
+    first, total, size = asyncio.run(fn(crud, date))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, total, size, peak
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 86400
+
+    db = database_manager.get_client()[BENCH_DATABASE]
+    db.drop_collection("system_info")
+    crud = SystemInfoCrud(db)
+    crud.ensure_indexes()
+    day = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    batch = []
+    for i in range(total):
+        batch.append(synth_sample("bench", day + datetime.timedelta(seconds=i * 86400 / total), i))
+        if len(batch) >= BATCH_SIZE:
+            db["system_info"].insert_many(batch)
+            batch = []
+    if batch:
+        db["system_info"].insert_many(batch)
+    date = day.strftime("%Y-%m-%d")
+    print(f"写入 {total} 条样本（{date}）")
+
+    print(f"\n{'方式':<8}{'首字节 ms':>12}{'总耗时 ms':>12}{'响应 MB':>10}{'堆峰值 MB':>12}")
+    for label, fn in (("列表", as_list), ("NDJSON", as_stream)):
+        first, elapsed, size, peak = measure(fn, crud, date)
+        print(f"{label:<8}{first * 1000:>12.1f}{elapsed * 1000:>12.1f}{size / MB:>10.1f}{peak / MB:>12.1f}")
+
+    database_manager.get_client().drop_database(BENCH_DATABASE)
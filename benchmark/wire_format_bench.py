@@ -0,0 +1,61 @@
+"""
+样本二进制格式 vs JSON / BSON：编码后大小（原始与 gzip）、编解码 CPU 耗时
+样本取自 HostMetrics 实际采集的结果，补上 collect_data() 写入前的 id / _id / 检测结果字段；
+往返一致性由 benchmark/wire_format_check.py 单独检查
+用法（仓库根目录下）：python benchmark/wire_format_bench.py [样本数] [每项重复次数]
+"""
+import sys
+import os
+import gzip
+import json
+import time
+import statistics
+
+sys.path.append(os.path.abspath("./fastapi"))
+import bson
+from app.core.timeutil import to_storage
+from app.dataoperate.wireformat import encode_sample, decode_sample, encode_batch
+from wire_format_check import collect_samples
+
+
+def timed(fn, items, repeat):
+    """返回每条样本的平均耗时（微秒），取多轮中的最小值"""
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        rounds.append((time.perf_counter() - start) / len(items) * 1e6)
+    return min(rounds)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print(f"采集 {count} 条样本 ...")
+    samples = collect_samples(count)
+    stored = [to_storage(dict(s), ("timestamp",)) for s in samples]
+
+    # JSON 编码与 agent 上报一致：_id 转为字符串；BSON 与 spool 原有编码一致
+    json_docs = [dict(s, _id=str(s["_id"])) for s in samples]
+    codecs = [
+        ("wire", encode_sample, decode_sample, samples),
+        ("JSON", lambda d: json.dumps(d, separators=(",", ":")).encode(), json.loads, json_docs),
+        ("BSON", bson.encode, bson.decode, stored),
+    ]
+    print(f"\n{'格式':<6}{'单条大小':>10}{'单条 gzip':>12}{'批次 gzip':>12}{'编码 µs':>10}{'解码 µs':>10}")
+    for name, encode, decode, docs in codecs:
+        payloads = [encode(d) for d in docs]
+        size = statistics.mean(len(p) for p in payloads)
+        gzipped = statistics.mean(len(gzip.compress(p, 6)) for p in payloads)
+        if name == "wire":
+            batch_gzip = len(gzip.compress(encode_batch(docs), 6))
+        elif name == "JSON":
+            batch_gzip = len(gzip.compress(json.dumps({"samples": docs}, separators=(",", ":")).encode(), 6))
+        else:
+            batch_gzip = len(gzip.compress(b"".join(payloads), 6))
+        print(f"{name:<6}{size:>8.0f} B{gzipped:>10.0f} B{batch_gzip / len(docs):>10.0f} B"
+              f"{timed(encode, docs, repeat):>10.1f}{timed(decode, payloads, repeat):>10.1f}")
+    print(f"\n批次 gzip 为 {len(samples)} 条样本打包压缩后的平均每条大小，与 agent 实际上报方式一致；"
+          f"wire 的 float 按 float32 存储（约 7 位有效数字）")
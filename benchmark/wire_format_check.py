@@ -0,0 +1,151 @@
+"""
+样本二进制格式往返检查：encode_sample / encode_batch 编码后解码，必须与 collect_data() 结构的原文档一致
+- 样本取自 HostMetrics 实际采集的结果，补上 collect_data() 写入前的 id / _id / 检测结果字段
+- 两种时间戳形式：字符串（agent 上报）与 datetime（to_storage 后写入 spool）
+- float32 字段按 float32 精度比较（相对误差不超过 FLOAT32_RELATIVE_ERROR），其余字段类型与取值必须完全一致
+- 附加字段（schema 之外的键、None 值、类型或取值范围与声明不符的值）经 BSON 附加字段原样往返
+检查失败时以非零状态退出
+用法（仓库根目录下）：python benchmark/wire_format_check.py [样本数]
+"""
+import sys
+import os
+import time
+import random
+import datetime
+
+sys.path.append(os.path.abspath("./fastapi"))
+from bson import ObjectId
+from app.core.timeutil import to_storage
+from app.dataoperate.hostmetrics import HostMetrics
+from app.dataoperate.wireformat import encode_sample, decode_sample, encode_batch, decode_batch, describe_schema
+
+FLOAT32_RELATIVE_ERROR = 1e-6
+
+
+class Mismatch(Exception):
+    """往返前后的文档不一致"""
+
+
+def collect_samples(count):
+    """按 collect_data() 的结构生成样本：实际采集结果 + 自增 id + 检测结果 + _id"""
+    metrics = HostMetrics()
+    metrics.sample()
+    samples = []
+    for i in range(count):
+        time.sleep(0.05)
+        doc = {"id": i + 1, **metrics.sample(), "_id": ObjectId()}
+        if random.random() <= 0.2:
+            doc["anomaly_id"] = random.randint(1, 10)
+            doc["risk_score"] = 0.3 + 0.7 * random.random()
+        samples.append(doc)
+    return samples
+
+
+def assert_same(expected, actual, path="$"):
+    """逐字段比较，float 按 float32 精度比较，其余类型与取值必须完全一致，不一致时抛出 Mismatch"""
+    if isinstance(expected, dict):
+        if not isinstance(actual, dict):
+            raise Mismatch(f"{path}: 应为对象，实际为 {type(actual).__name__}")
+        if expected.keys() != actual.keys():
+            raise Mismatch(f"{path}: 字段不一致 {sorted(expected.keys() ^ actual.keys())}")
+        for key in expected:
+            assert_same(expected[key], actual[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        if not isinstance(actual, list) or len(expected) != len(actual):
+            raise Mismatch(f"{path}: 列表长度不一致")
+        for i, (x, y) in enumerate(zip(expected, actual)):
+            assert_same(x, y, f"{path}[{i}]")
+    elif isinstance(expected, float):
+        if type(actual) is not float:
+            raise Mismatch(f"{path}: 类型应为 float，实际为 {type(actual).__name__}")
+        if abs(expected - actual) > FLOAT32_RELATIVE_ERROR * max(1.0, abs(expected)):
+            raise Mismatch(f"{path}: {expected!r} != {actual!r}")
+    elif type(expected) is not type(actual) or expected != actual:
+        raise Mismatch(f"{path}: {expected!r} != {actual!r}")
+
+
+def round_trip(doc):
+    return decode_sample(encode_sample(doc))
+
+
+def check_string_timestamps(samples):
+    for doc in samples:
+        assert_same(doc, round_trip(doc))
+
+
+def check_datetime_timestamps(samples):
+    for doc in samples:
+        stored = to_storage(dict(doc), ("timestamp",))
+        if type(stored["timestamp"]) is not datetime.datetime:
+            raise Mismatch("to_storage 后 timestamp 应为 datetime")
+        assert_same(stored, round_trip(stored))
+    # 带微秒的 datetime 也应原样还原
+    precise = dict(samples[0], timestamp=datetime.datetime(2026, 10, 18, 8, 30, 15, 123456))
+    assert_same(precise, round_trip(precise))
+
+
+def check_float32_tolerance(samples):
+    doc = dict(samples[0])
+    doc["memory_info"] = dict(doc["memory_info"], total_memory_gb=31.123456789, memory_percent=1 / 3,
+                              used_memory_gb=1e-7, available_memory_gb=123456.789)
+    assert_same(doc, round_trip(doc))
+    # 比较本身必须能发现超出 float32 精度的差异，否则上面的检查没有意义
+    decoded = round_trip(doc)
+    decoded["memory_info"]["total_memory_gb"] *= 1 + 10 * FLOAT32_RELATIVE_ERROR
+    try:
+        assert_same(doc, decoded)
+    except Mismatch:
+        return
+    raise Mismatch("超出 float32 精度的差异没有被发现")
+
+
+def check_extras(samples):
+    doc = dict(samples[0], os_info={"system": "Linux", "release": "6.1"}, note=None, tags=["a", 1, 2.5])
+    doc["cpu_info"] = dict(doc["cpu_info"], cpu_freq=None, cpu_count=8.0, cpu_percent=42,
+                           vendor_flags={"avx2": True})
+    doc["memory_info"] = dict(doc["memory_info"], total_memory_gb=1e39)
+    doc["network_info"] = dict(doc["network_info"], packets_sent=-1, packets_recv=1.5)
+    doc["process_info"] = [dict(p, pid=1 << 33, cmdline=["python", "x.py"]) for p in doc["process_info"][:2]]
+    doc["host_id"] = 12345
+    assert_same(doc, round_trip(doc))
+    missing = {key: value for key, value in samples[0].items() if key not in ("disk_info", "risk_score")}
+    assert_same(missing, round_trip(missing))
+    iso = dict(samples[0], timestamp="2026-10-18T08:30:15")
+    assert_same(iso, round_trip(iso))
+
+
+def check_batch(samples):
+    header = {"host_id": "check", "agent": {"cpu_percent": 0.5, "backlog": 3}}
+    batch = decode_batch(encode_batch(samples, header))
+    if {key: batch[key] for key in header} != header:
+        raise Mismatch(f"批次头不一致: {batch}")
+    assert_same(samples, batch["samples"])
+
+
+CHECKS = [
+    ("字符串时间戳（agent 上报）", check_string_timestamps),
+    ("datetime 时间戳（spool）", check_datetime_timestamps),
+    ("float32 精度", check_float32_tolerance),
+    ("附加字段（BSON）", check_extras),
+    ("批次编码", check_batch),
+]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    samples = collect_samples(count)
+    failed = 0
+    for name, check in CHECKS:
+        try:
+            check(samples)
+            print(f"✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {name}: {type(e).__name__}: {e}")
+    print(f"{count} 条样本，schema 共 {len(describe_schema())} 个字段，{len(CHECKS) - failed}/{len(CHECKS)} 项通过")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,23 +4,33 @@ import os
 # 添加项目路径
 sys.path.append(os.path.abspath("./fastapi"))
 
+from typing import Optional
 from fastapi import APIRouter, Body, File, UploadFile
 from app.serve.CauseReportServe import CauseReportServe
+from app.core.streaming import ndjson_response
 
 router = APIRouter()
 cause_report_serve = CauseReportServe()
 
 
 @router.post("/causereport/summary_by_date_full")
-async def get_summary_report_by_date_full(date_str: str = Body(..., embed=True)):
-    '''先生成异常检测报告，再返回当天综合性报告'''
-    await cause_report_serve.generate_report_from_systeminfo()
-    return await cause_report_serve.generate_summary_report_by_date(date_str)
+async def get_summary_report_by_date_full(date_str: str = Body(..., embed=True),
+                                          host_id: Optional[str] = Body(None, embed=True)):
+    '''先生成异常检测报告，再返回当天综合性报告（指定 host_id 时只处理该主机）'''
+    await cause_report_serve.generate_report_from_systeminfo(host_id)
+    return await cause_report_serve.generate_summary_report_by_date(date_str, host_id)
 
 @router.get("/causereport/summary_by_day")
-async def get_summary_reports_by_day():
-    '''获取每一天最后一条综合性报告的集合'''
-    return await cause_report_serve.get_latest_summary_reports_by_day()
+async def get_summary_reports_by_day(host_id: Optional[str] = None):
+    '''获取每一天（每台主机）最后一条综合性报告的集合'''
+    return await cause_report_serve.get_latest_summary_reports_by_day(host_id)
+
+@router.get("/causereport/all")
+async def get_all_cause_reports(host_id: Optional[str] = None, stream: bool = False):
+    '''获取所有异常报告；stream=true 时以 NDJSON 逐条流式返回'''
+    if stream:
+        return ndjson_response(cause_report_serve.stream_all_cause_reports(host_id))
+    return await cause_report_serve.get_all_cause_reports(host_id)
 
 @router.post("/causereport/upload_pdf")
 async def upload_pdf_report(file: UploadFile = File(...)):
@@ -0,0 +1,41 @@
+import sys
+import os
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+
+
+from typing import Optional
+from fastapi import APIRouter, Request, Header
+from app.serve.InfoReceiveServe import InfoReceiveServe
+
+router = APIRouter()
+info_receive_serve = InfoReceiveServe()
+
+@router.post("/ingest")
+async def ingest(request: Request, x_host_id: Optional[str] = Header(None)):
+    '''接收远端 agent 批量上报的系统信息（JSON 或样本二进制批次，可 gzip 压缩，按 host_id 区分主机）'''
+    try:
+        body = await request.body()
+        data = await info_receive_serve.ingest(body, request.headers.get("content-encoding"), x_host_id)
+        return {"errCode": 0, "message": "success", "data": data}
+    except Exception as e:
+        return {"errCode": 1, "message": str(e), "data": None}
+
+@router.get("/stats")
+async def get_ingest_stats():
+    '''获取远程采集接入统计'''
+    try:
+        data = info_receive_serve.stats()
+        return {"errCode": 0, "message": "success", "data": data}
+    except Exception as e:
+        return {"errCode": 1, "message": str(e), "data": None}
+
+@router.get("/agents")
+async def get_agents(over_budget: bool = False):
+    '''获取各主机采集 agent 最近一次上报的自身资源占用与积压情况'''
+    try:
+        data = info_receive_serve.get_agents(over_budget)
+        return {"errCode": 0, "message": "success", "data": data}
+    except Exception as e:
+        return {"errCode": 1, "message": str(e), "data": None}
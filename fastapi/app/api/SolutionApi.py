@@ -7,6 +7,7 @@ from typing import Dict, Any, List
 sys.path.append(os.path.abspath("./fastapi"))
 
 from app.serve.SolutionServe import SolutionServe
+from app.core.streaming import ndjson_response
 
 router = APIRouter()
 solution_serve = SolutionServe()
@@ -24,11 +25,14 @@ async def generate_solution(report_id: int) -> Dict[str, Any]:
     return {"errCode": 0, "message": "success", "data": result["data"]}
 
 @router.get("/all", tags=["解决方案接口"])
-async def get_all_solutions():
+async def get_all_solutions(stream: bool = False):
     """
     获取所有解决方案
+    :param stream: 为 true 时以 NDJSON 逐条流式返回
     :return: 所有解决方案列表
     """
+    if stream:
+        return ndjson_response(solution_serve.stream_all_solutions())
     result = await solution_serve.get_all_solutions()
     if result["errCode"] != 0:
         raise HTTPException(status_code=404, detail=result["message"])
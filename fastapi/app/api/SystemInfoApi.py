@@ -5,35 +5,104 @@ import os
 sys.path.append(os.path.abspath("./fastapi"))
 
 
+from typing import List, Optional
 from fastapi import APIRouter
 from app.serve.SystemInfoServe import SystemInfoServe
+from app.core.streaming import ndjson_response, sse_response
+from app.dataoperate.livechannel import live_channel
+from app.core.config import RANGE_DEFAULT_POINTS
 
 router = APIRouter()
 system_info_serve = SystemInfoServe()
 
+def _field_list(fields: Optional[str]) -> Optional[List[str]]:
+    '''逗号分隔的字段路径转为列表，如 "cpu_info.cpu_percent,memory_info.memory_percent"'''
+    return [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
 @router.get("/getsysteminfo")
-async def get_system_info():
-    '''获取系统信息'''
+async def get_system_info(fields: Optional[str] = None):
+    '''获取系统信息；fields 为逗号分隔的字段路径，只返回这些字段'''
+    try:
+        data = await system_info_serve.get_system_info(_field_list(fields))
+        return {"errCode": 0, "message": "success", "data": data}
+    except Exception as e:
+        return {"errCode": 1, "message": str(e), "data": None}
+    
+@router.get("/live")
+async def live_system_info():
+    '''实时推送后台采集的每个新样本（SSE，event: sample），连接后先推送最新样本；所有连接共享同一份序列化结果'''
+    return sse_response(live_channel.subscribe())
+
+@router.get("/getcollectorstatus")
+async def get_collector_status():
+    '''获取后台采集与写入队列状态'''
     try:
-        data = await system_info_serve.get_system_info()
+        data = await system_info_serve.get_collector_status()
         return {"errCode": 0, "message": "success", "data": data}
     except Exception as e:
         return {"errCode": 1, "message": str(e), "data": None}
     
 @router.get("/getdailysysteminfo")
-async def get_daily_system_info():
-    '''获取每日系统信息'''
+async def get_daily_system_info(mode: str = "summary", page: int = 1, page_size: Optional[int] = None,
+                                host_id: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                                fields: Optional[str] = None):
+    '''获取每日系统信息（分页）：mode=summary 返回每天的汇总统计，mode=raw 返回按日期归组的原始样本（可用 fields 只取部分字段）'''
     try:
-        data = await system_info_serve.get_daily_system_info()
+        data = await system_info_serve.get_daily_system_info(mode, page, page_size, host_id, start, end,
+                                                             _field_list(fields))
         return {"errCode": 0, "message": "success", "data": data}
     except Exception as e:
         return {"errCode": 1, "message": str(e), "data": None}
     
 @router.get("/getdailysysteminfobydate")
-async def get_daily_system_info_by_date(date: str):
-    '''获取每日系统信息'''
+async def get_daily_system_info_by_date(date: str, host_id: Optional[str] = None, stream: bool = False,
+                                        fields: Optional[str] = None):
+    '''获取每日系统信息；stream=true 时以 NDJSON 逐条流式返回当天样本（不包裹 date / system_info），fields 只取部分字段'''
+    try:
+        if stream:
+            return ndjson_response(system_info_serve.stream_daily_system_info_by_date(date, host_id, _field_list(fields)))
+        data = await system_info_serve.get_daily_system_info_by_date(date, host_id, _field_list(fields))
+        return {"errCode": 0, "message": "success", "data": data}
+    except Exception as e:
+        return {"errCode": 1, "message": str(e), "data": None}
+
+@router.get("/getmetricseries")
+async def get_metric_series(start: str, end: str, fields: Optional[str] = None,
+                            resolution: Optional[float] = None, host_id: Optional[str] = None):
+    '''获取指标时间序列（按时间跨度自动选择 1h / 1m / 原始层级），fields 为逗号分隔的字段名'''
+    try:
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        data = await system_info_serve.get_metric_series(start, end, field_list, resolution, host_id)
+        return {"errCode": 0, "message": "success", "data": data}
+    except Exception as e:
+        return {"errCode": 1, "message": str(e), "data": None}
+
+@router.get("/range")
+async def get_range_series(start: str, metrics: str, end: Optional[str] = None, points: int = RANGE_DEFAULT_POINTS,
+                           stat: str = "mean", host_id: Optional[str] = None):
+    '''获取时间范围内的图表序列（服务端 LTTB 降采样到 points 个点），metrics 为逗号分隔的字段名，如 cpu_percent,memory_percent'''
+    try:
+        metric_list = [m.strip() for m in metrics.split(",") if m.strip()]
+        data = await system_info_serve.get_range_series(start, end, metric_list, points, stat, host_id)
+        return {"errCode": 0, "message": "success", "data": data}
+    except Exception as e:
+        return {"errCode": 1, "message": str(e), "data": None}
+
+@router.get("/fleet/top")
+async def get_fleet_top(field: str = "cpu_percent", stat: str = "mean", limit: int = 10,
+                        start: Optional[str] = None, end: Optional[str] = None, minutes: Optional[float] = None):
+    '''获取时间窗口内某个指标排名前 N 的主机（由汇总层级聚合），未指定 start 时取最近 minutes 分钟'''
+    try:
+        data = await system_info_serve.get_fleet_top(field, stat, limit, start, end, minutes)
+        return {"errCode": 0, "message": "success", "data": data}
+    except Exception as e:
+        return {"errCode": 1, "message": str(e), "data": None}
+
+@router.get("/fleet/hosts")
+async def get_fleet_hosts(start: Optional[str] = None, end: Optional[str] = None, minutes: Optional[float] = None):
+    '''获取时间窗口内上报过样本的主机'''
     try:
-        data = await system_info_serve.get_daily_system_info_by_date(date)
+        data = await system_info_serve.get_fleet_hosts(start, end, minutes)
         return {"errCode": 0, "message": "success", "data": data}
     except Exception as e:
         return {"errCode": 1, "message": str(e), "data": None}
@@ -1,11 +1,118 @@
-from pymongo import MongoClient
+import socket
 
 MONGODB_URI = 'mongodb://localhost:27017/'
 DATABASE_NAME = 'SH13'
 
+# MongoDB 连接池配置（进程内所有 CRUD 共用一个 MongoClient）
+MONGO_MAX_POOL_SIZE = 32                  # 连接池上限，应不小于 DB_EXECUTOR_WORKERS
+MONGO_MIN_POOL_SIZE = 2                   # 常驻的最少连接数
+MONGO_MAX_IDLE_TIME_MS = 60000            # 空闲连接回收时间
+MONGO_WAIT_QUEUE_TIMEOUT_MS = 5000        # 连接池耗尽时等待空闲连接的超时
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000  # 选择可用服务器的超时
+MONGO_CONNECT_TIMEOUT_MS = 5000           # 建立连接超时
+MONGO_SOCKET_TIMEOUT_MS = 30000           # 单次读写超时
+MONGO_READ_PREFERENCE = "primaryPreferred"  # 读偏好：primary / primaryPreferred / secondaryPreferred ...
+
+# 数据库线程池大小：同时执行的 pymongo 调用上限
+DB_EXECUTOR_WORKERS = 16
+
+# 流式响应（NDJSON）：每次从游标取出并编码的文档数，决定单次占用数据库线程的时长与峰值内存
+STREAM_BATCH_SIZE = 500
+
+# 后台采集配置
+COLLECT_INTERVAL = 1.0       # 采样周期（秒）
+SAMPLE_BUFFER_SIZE = 300     # 内存环形缓冲区保留的最近样本数
+SAMPLE_WAIT_TIMEOUT = 5.0    # 接口等待后台任务首个样本的最长时间（秒），超时后直接采样返回
+LIVE_HEARTBEAT_INTERVAL = 15.0  # 实时推送（/systeminfo/live）空闲时的心跳间隔（秒）
+LIVE_STREAM_MAX_SECONDS = 60.0  # 单个推送连接的最长持续时间（秒），到期后客户端自动重连
+LIVE_RETRY_MS = 1000            # 断开后 EventSource 的重连间隔（毫秒）
+COLLECTOR_BACKEND = "psutil" # 采集后端："psutil"，或 "proc"（仅 Linux，每周期单次读取 /proc）
+PROCESS_TOP_K = 10           # process_info 中按 CPU、内存各保留的 Top-K 进程数
+HOST_ID = socket.gethostname()  # 样本所属主机标识（time-series 模式下作为 metaField）
+
+# system_info 存储布局：
+# - "standard"：普通集合，每秒一条文档
+# - "timeseries"：MongoDB 5.0+ 原生时序集合，仅在 system_info 集合不存在时按此配置创建，已有集合以实际检测结果为准
+# - "bucket"：列式桶文档，写入 system_info_buckets，读取时同时合并 system_info 中的历史文档
+# - "local"：不依赖 MongoDB 的本地嵌入式存储（见 LocalMetricCrud），适合边缘小主机
+SYSTEM_INFO_STORAGE = "standard"
+SYSTEM_INFO_TS_GRANULARITY = "seconds"           # 时序集合分桶粒度，与 1 秒采样周期匹配
+SYSTEM_INFO_TS_EXPIRE_SECONDS = 30 * 24 * 3600   # 时序集合自动过期时间，None 表示不过期
+BUCKET_SPAN_SECONDS = 60                         # 列式桶的时间窗口（秒），桶按窗口对齐
+BUCKET_MAX_SAMPLES = 60                          # 每个桶最多容纳的样本数
+
+# 本地嵌入式指标存储（SYSTEM_INFO_STORAGE = "local"）：Gorilla 压缩块追加写入内存映射的段文件
+LOCAL_STORE_DIR = "./localstore"            # 段文件目录
+LOCAL_BLOCK_SAMPLES = 120                   # 每个压缩块的样本数，写满后编码并追加到段文件
+LOCAL_SEGMENT_BYTES = 4 * 1024 ** 2         # 段文件大小，写满后封段并截断到实际大小
+LOCAL_RETENTION_DAYS = 30                   # 段文件保留天数，None 表示不清理
+
+# system_info 写后缓冲：按条数或时间批量写入
+WRITE_BUFFER_MAX_SIZE = 3600            # 队列上限（条），超出后触发背压策略
+WRITE_BATCH_SIZE = 100                  # 每批写入条数
+WRITE_FLUSH_INTERVAL = 5.0              # 最长刷写间隔（秒）
+WRITE_BACKPRESSURE_POLICY = "drop_oldest"  # 背压策略："drop_oldest" 或 "downsample"
+
+# 本地持久化队列（spool）：样本先追加到本地内存映射文件，再由回放任务批量写入 MongoDB，
+# MongoDB 重启或不可用期间的样本不丢失（standard / timeseries 布局启用后替代写后缓冲）
+SPOOL_ENABLED = True
+SPOOL_DIR = "./spool"                   # 段文件与回放位置所在目录
+SPOOL_SEGMENT_BYTES = 8 * 1024 ** 2     # 段文件大小
+SPOOL_MAX_BYTES = 512 * 1024 ** 2       # 总大小上限，超出时丢弃最旧的段
+SPOOL_REPLAY_BATCH = 1000               # 每批回放条数
+SPOOL_REPLAY_INTERVAL = 1.0             # 队列为空时的轮询间隔（秒）
+SPOOL_RETRY_INTERVAL = 5.0              # 写入失败（数据库不可达）后的重试间隔（秒）
+SPOOL_CODEC = "wire"                    # 记录编码："wire"（样本二进制格式，见 dataoperate/wireformat.py）或 "bson"；读取时两种均可识别
+
+# 远程采集接入（/inforeceive/ingest）：远端 agent 按主机批量上报样本，支持 gzip 压缩
+INGEST_MAX_BODY_BYTES = 16 * 1024 ** 2  # 解压后请求体上限，超出直接拒绝
+INGEST_MAX_SAMPLES = 5000               # 单批样本数上限
+INGEST_MAX_ERRORS = 10                  # 响应中最多返回的校验错误条数
+INGEST_DEDUP_WINDOW = 100000            # 按 _id 对重发批次去重时记住的最近样本数
+
+# 独立采集 agent（CollectAgent.py）：样本先写入本地持久化队列，按间隔 gzip 批量上报到 /inforeceive/ingest
+AGENT_INGEST_URL = "http://127.0.0.1:8000/inforeceive/ingest"  # 中心接入地址
+AGENT_SAMPLE_INTERVAL = 1.0       # 采样间隔（秒）
+AGENT_FLUSH_INTERVAL = 10.0       # 上报间隔（秒），实际间隔加入 ±10% 抖动，避免大量主机同时上报
+AGENT_BATCH_MAX = 600             # 单次请求最多携带的样本数，积压时分多次上报
+AGENT_RETRY_BASE = 1.0            # 上报失败后的首次重试等待（秒），之后指数增长并加入随机抖动
+AGENT_RETRY_MAX = 60.0            # 重试等待上限（秒）
+AGENT_REQUEST_TIMEOUT = 10.0      # 单次上报请求超时（秒）
+AGENT_CPU_BUDGET_PERCENT = 2.0    # agent 自身 CPU 占用预算（单核百分比），超出时自动拉长采样间隔
+AGENT_RSS_BUDGET_MB = 64          # agent 自身常驻内存预算（MB），超出时在自报状态中标记
+AGENT_MAX_SAMPLE_INTERVAL = 10.0  # 超出 CPU 预算时采样间隔的上限（秒）
+AGENT_PAYLOAD_FORMAT = "wire"     # 上报格式："wire"（样本二进制格式）或 "json"，中心两种均接收
+
+# 多分辨率汇总（system_info_1m / system_info_1h）
+ROLLUP_FLUSH_INTERVAL = 10.0   # 汇总增量写入间隔（秒）
+ROLLUP_TARGET_POINTS = 500     # 未指定分辨率时，按时间跨度 / 目标点数选择汇总层级
+
+# 图表时间范围接口（/systeminfo/range）：服务端 LTTB 降采样
+RANGE_DEFAULT_POINTS = 500     # 每个指标默认返回的点数
+RANGE_MAX_POINTS = 5000        # points 上限
+RANGE_OVERSAMPLE = 4           # 选择数据层级时要求的原始点数 / 目标点数，保证降采样有足够的候选点
+RANGE_VALUE_DECIMALS = 2       # 返回取值保留的小数位数
+
+# 每日系统信息接口（/systeminfo/getdailysysteminfo）分页
+DAILY_SUMMARY_PAGE_SIZE = 31       # 汇总模式每页天数
+DAILY_RAW_PAGE_SIZE = 1000         # 原始样本模式每页样本数
+DAILY_MAX_PAGE_SIZE = 10000        # page_size 上限
+
+# 数据保留与压缩（后台任务），保留天数为 None 表示不清理
+RETENTION_ENABLED = True
+RETENTION_INTERVAL = 3600.0        # 执行间隔（秒）
+RETENTION_BATCH_SIZE = 1000        # 每批删除条数
+RETENTION_BATCH_PAUSE = 0.5        # 批次间暂停（秒），限制删除速率
+RAW_RETENTION_DAYS = 7             # system_info 原始样本（仅删除已有 1h 汇总的部分）
+ROLLUP_1M_RETENTION_DAYS = 90      # system_info_1m 分钟级汇总
+CAUSE_REPORT_RETENTION_DAYS = 180  # cause_report 异常报告
+
+# 自增 ID 分配：每次向 counters 集合预留的 ID 个数
+SEQUENCE_BLOCK_SIZE = 20
+
 def get_database():
     """
-    获取MongoDB数据库连接
+    获取MongoDB数据库连接（进程内共享同一个 MongoClient 连接池）
     """
-    client = MongoClient(MONGODB_URI)
-    return client[DATABASE_NAME]
+    from app.core.database import database_manager
+    return database_manager.get_database()
@@ -0,0 +1,243 @@
+import sys
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+
+from pymongo import MongoClient, monitoring
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import (
+    BulkWriteError, InvalidDocument, ConnectionFailure, ExecutionTimeout, WTimeoutError, OperationFailure
+)
+from app.core.config import (
+    MONGODB_URI, DATABASE_NAME,
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS, MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_READ_PREFERENCE
+)
+
+DUPLICATE_KEY_ERROR = 11000
+# 重试可能成功的逐条写入错误码：网络与超时、主节点切换、节点关闭等；
+# 其余写入错误（文档校验失败、文档过大等）由文档本身导致，重试也不会成功
+TRANSIENT_WRITE_ERRORS = frozenset({6, 7, 50, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436})
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    连接池监听器：统计已建立/关闭的连接数，以及从连接池取连接的等待时间
+    等待时间 = checkout 开始到拿到连接之间的耗时，与命令本身的执行时间分开统计
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.opened = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checkout_count = 0
+        self.checkout_failed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.opened += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+
+    def connection_check_out_started(self, event):
+        # checkout 在发起请求的线程内同步完成，用线程局部变量记录开始时间
+        self._local.start = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._local.start = None
+        with self._lock:
+            self.checkout_failed += 1
+
+    def connection_checked_out(self, event):
+        start = getattr(self._local, "start", None)
+        wait = time.perf_counter() - start if start is not None else 0.0
+        self._local.start = None
+        with self._lock:
+            self.checked_out += 1
+            self.checkout_count += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "opened": self.opened,
+                "closed": self.closed,
+                "open": self.opened - self.closed,
+                "in_use": self.checked_out,
+                "checkout_count": self.checkout_count,
+                "checkout_failed": self.checkout_failed,
+                "avg_wait_ms": round(self.wait_total / self.checkout_count * 1000, 3) if self.checkout_count else 0.0,
+                "max_wait_ms": round(self.wait_max * 1000, 3)
+            }
+
+
+class CommandStatsListener(monitoring.CommandListener):
+    """命令监听器：统计服务端命令的执行耗时（不含连接池等待）"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.failed_count = 0
+        self.duration_total = 0.0
+        self.duration_max = 0.0
+
+    def started(self, event):
+        pass
+
+    def _record(self, duration_micros: int) -> None:
+        duration = duration_micros / 1e6
+        with self._lock:
+            self.count += 1
+            self.duration_total += duration
+            self.duration_max = max(self.duration_max, duration)
+
+    def succeeded(self, event):
+        self._record(event.duration_micros)
+
+    def failed(self, event):
+        self._record(event.duration_micros)
+        with self._lock:
+            self.failed_count += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "count": self.count,
+                "failed": self.failed_count,
+                "avg_ms": round(self.duration_total / self.count * 1000, 3) if self.count else 0.0,
+                "max_ms": round(self.duration_max * 1000, 3)
+            }
+
+
+class DatabaseManager:
+    """
+    进程级共享的 MongoClient
+    所有 CRUD 类共用同一个连接池；在 FastAPI lifespan 中初始化和关闭，
+    脚本等非服务场景下首次使用时自动创建
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.client: Optional[MongoClient] = None
+        self.pool_listener = PoolStatsListener()
+        self.command_listener = CommandStatsListener()
+
+    def get_client(self) -> MongoClient:
+        with self._lock:
+            if self.client is None:
+                self.client = MongoClient(
+                    MONGODB_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                    readPreference=MONGO_READ_PREFERENCE,
+                    event_listeners=[self.pool_listener, self.command_listener]
+                )
+            return self.client
+
+    def get_database(self) -> Database:
+        return self.get_client()[DATABASE_NAME]
+
+    def connect(self) -> Dict[str, Any]:
+        """
+        建立连接并确认服务端可达（FastAPI 启动时调用）
+        :return: 连接池状态
+        """
+        self.get_client().admin.command("ping")
+        return self.stats()
+
+    def close(self) -> None:
+        """关闭共享连接池（FastAPI 关闭时调用）"""
+        with self._lock:
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池与命令耗时统计"""
+        return {
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "read_preference": MONGO_READ_PREFERENCE,
+            "pool": self.pool_listener.stats(),
+            "commands": self.command_listener.stats()
+        }
+
+
+database_manager = DatabaseManager()
+
+
+def is_transient_error(error: Exception) -> bool:
+    """是否为重试可能成功的整批写入失败：连接失败、超时、主节点切换等"""
+    if isinstance(error, (ConnectionFailure, ExecutionTimeout, WTimeoutError)):
+        return True
+    return isinstance(error, OperationFailure) and error.code in TRANSIENT_WRITE_ERRORS
+
+
+def insert_documents(collection: Collection, docs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    以 insert_many(ordered=False) 批量写入，按失败原因拆分文档
+    - 重复键说明文档已在之前的重试中写入，视为成功
+    - 临时错误（见 TRANSIENT_WRITE_ERRORS）与写关注错误的文档需要重试
+    - 其余逐条错误以及在客户端即无法编码的文档被拒绝，重试也不会成功，由调用方丢弃并计数
+    连接失败、超时等整批失败的异常直接抛出，由调用方整批重试
+    :param collection: 目标集合
+    :param docs: 待写入的文档，应已带有 _id
+    :return: (需重试的文档, 被拒绝的文档)
+    """
+    try:
+        collection.insert_many(docs, ordered=False)
+        return [], []
+    except BulkWriteError as e:
+        retry, rejected = [], []
+        for err in e.details.get("writeErrors", []):
+            code = err.get("code")
+            if code != DUPLICATE_KEY_ERROR:
+                (retry if code in TRANSIENT_WRITE_ERRORS else rejected).append(docs[err["index"]])
+        if e.details.get("writeConcernErrors"):
+            # 写关注未满足时无法确定哪些文档已持久化，除被拒绝的外整批重试，已写入的由 _id 去重
+            rejected_ids = {id(doc) for doc in rejected}
+            retry = [doc for doc in docs if id(doc) not in rejected_ids]
+        return retry, rejected
+    except InvalidDocument:
+        # 无法编码或超过大小上限的文档使整批在客户端失败，逐条写入找出这些文档
+        if len(docs) == 1:
+            return [], list(docs)
+        retry, rejected = [], []
+        for doc in docs:
+            doc_retry, doc_rejected = insert_documents(collection, [doc])
+            retry.extend(doc_retry)
+            rejected.extend(doc_rejected)
+        return retry, rejected
@@ -0,0 +1,45 @@
+import sys
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.config import DB_EXECUTOR_WORKERS
+
+# pymongo 为同步驱动，所有数据库调用都放到这个有界线程池中执行，
+# 慢查询只占用线程池中的一个线程，不会阻塞 uvicorn 事件循环；
+# 线程池随 FastAPI lifespan 创建与关闭，关闭后再次进入 lifespan（或脚本中调用 run_db）时重新创建
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def start_db_executor() -> ThreadPoolExecutor:
+    """创建数据库线程池（在 FastAPI lifespan 开始时调用，已创建时直接返回）"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="mongo")
+        return _executor
+
+
+async def run_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在数据库线程池中执行阻塞的 pymongo 调用
+    :param func: 同步函数
+    :return: func 的返回值
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor or start_db_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_db_executor() -> None:
+    """关闭数据库线程池（在 FastAPI lifespan 结束时调用），等待执行中的调用完成"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
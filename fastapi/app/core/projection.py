@@ -0,0 +1,86 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+_MISSING = object()
+
+
+def build_projection(fields: Optional[Iterable[str]], allowed: Iterable[str],
+                     required: Iterable[str] = ("_id",)) -> Optional[Dict[str, int]]:
+    """
+    把调用方传入的字段路径转换为 MongoDB 包含式投影
+    只接受白名单中的路径（防止任意字段名、$ 运算符进入查询）；同时请求了上级与下级路径时只保留上级，
+    避免 MongoDB 4.4+ 的 Path collision 错误
+    :param fields: 字段路径，如 ["cpu_info.cpu_percent", "memory_info"]，为空时不投影
+    :param allowed: 允许的字段路径
+    :param required: 总是包含的字段（如 _id、timestamp）
+    :return: {路径: 1}，fields 为空时返回 None
+    """
+    if not fields:
+        return None
+    allowed = set(allowed)
+    requested = []
+    for field in fields:
+        field = field.strip()
+        if not field:
+            continue
+        if field not in allowed:
+            raise ValueError(f"不支持的字段: {field}")
+        requested.append(field)
+    if not requested:
+        return None
+    requested.extend(required)
+    paths = set(requested)
+    projection = {}
+    for path in sorted(paths):
+        parts = path.split(".")
+        if any(".".join(parts[:i]) in paths for i in range(1, len(parts))):
+            continue
+        projection[path] = 1
+    return projection
+
+
+def _tree(paths: Iterable[str]) -> Dict[str, Any]:
+    """路径列表转换为嵌套字典，None 表示取整个字段（上级路径覆盖下级路径）"""
+    tree: Dict[str, Any] = {}
+    for path in sorted(paths, key=lambda p: p.count(".")):
+        node = tree
+        *parents, leaf = path.split(".")
+        for part in parents:
+            if part in node and node[part] is None:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[leaf] = None
+    return tree
+
+
+def _pick(value: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, dict):
+        result = {}
+        for key, sub in tree.items():
+            if key in value:
+                picked = _pick(value[key], sub)
+                if picked is not _MISSING:
+                    result[key] = picked
+        return result
+    if isinstance(value, list):
+        # 与 MongoDB 一致：数组中的子文档逐个投影，标量元素丢弃
+        return [_pick(item, tree) for item in value if isinstance(item, (dict, list))]
+    return _MISSING
+
+
+def apply_projection(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    在进程内对文档应用 MongoDB 风格的包含式投影（用于不经过 MongoDB 查询的存储布局）
+    与 MongoDB 相同：_id 默认包含，除非投影中显式设为 0
+    """
+    if not projection:
+        return doc
+    paths: List[str] = [k for k, v in projection.items() if v and k != "_id"]
+    if not paths:
+        return doc if projection.get("_id", 1) else {k: v for k, v in doc.items() if k != "_id"}
+    result = _pick(doc, _tree(paths))
+    if projection.get("_id", 1) and "_id" in doc:
+        result["_id"] = doc["_id"]
+    return result
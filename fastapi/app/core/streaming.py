@@ -0,0 +1,70 @@
+import sys
+import os
+import json
+import itertools
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+from fastapi.responses import StreamingResponse
+from app.core.config import STREAM_BATCH_SIZE
+from app.core.dbexecutor import run_db
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+# 流式响应显式声明不编码：GZipMiddleware 会把压缩输出攒到流结束才发出，
+# 已带 Content-Encoding 的响应它原样放行（starlette 0.44 与之后的版本都如此）
+UNCOMPRESSED_HEADERS = {"Content-Encoding": "identity"}
+
+
+def _encode_batch(cursor: Iterator[Dict[str, Any]], transform: Optional[Callable[[Dict[str, Any]], Any]],
+                  batch_size: int) -> bytes:
+    """从游标取出至多 batch_size 条文档，转换后编码为 NDJSON（在数据库线程池中执行）"""
+    lines = []
+    for doc in itertools.islice(cursor, batch_size):
+        if transform is not None:
+            doc = transform(doc)
+        lines.append(json.dumps(doc, ensure_ascii=False, default=str))
+    return ("\n".join(lines) + "\n").encode() if lines else b""
+
+
+async def ndjson_stream(open_cursor: Callable[[], Iterator[Dict[str, Any]]],
+                        transform: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                        batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """
+    按批遍历游标并逐批输出 NDJSON（每行一个文档），任意时刻只持有一批文档
+    取数、转换与编码都在数据库线程池中执行，不阻塞事件循环；
+    中途出错时输出一行 {"errCode": 1, "message": ...} 后结束（响应头已发出，无法再改状态码）
+    :param open_cursor: 返回游标（或任意文档迭代器）的同步函数
+    :param transform: 单条文档的转换（如 _id 转字符串、时间字段转字符串）
+    :param batch_size: 每批文档数
+    """
+    cursor = None
+    try:
+        cursor = await run_db(open_cursor)
+        if hasattr(cursor, "batch_size"):
+            cursor.batch_size(batch_size)
+        while True:
+            chunk = await run_db(_encode_batch, cursor, transform, batch_size)
+            if not chunk:
+                break
+            yield chunk
+    except Exception as e:
+        yield (json.dumps({"errCode": 1, "message": str(e)}, ensure_ascii=False) + "\n").encode()
+    finally:
+        # 客户端断开时生成器被取消，这里不能再等待线程池，直接关闭游标
+        if cursor is not None and hasattr(cursor, "close"):
+            cursor.close()
+
+
+def ndjson_response(chunks: AsyncIterator[bytes]) -> StreamingResponse:
+    """把 NDJSON 分块包装为流式响应（不经 gzip 压缩，每批生成后立即送达）"""
+    return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE, headers=UNCOMPRESSED_HEADERS)
+
+
+def sse_response(chunks: AsyncIterator[bytes]) -> StreamingResponse:
+    """把 SSE 分块包装为流式响应，关闭缓存、反向代理缓冲与 gzip 压缩，保证每帧立即送达"""
+    return StreamingResponse(chunks, media_type=SSE_MEDIA_TYPE,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                                      **UNCOMPRESSED_HEADERS})
@@ -0,0 +1,73 @@
+import datetime
+from typing import Any, Dict, Iterable, Tuple
+
+# 接口与前端沿用的时间字符串格式；数据库中统一存为 BSON 日期（本地时间）
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATE_FORMAT = "%Y-%m-%d"
+
+# 时间前缀格式及其对应的区间长度，用于把 "2025-07-15"、"2025-07-15 10" 等前缀转换为时间范围
+_PREFIX_FORMATS = [
+    ("%Y-%m-%d %H:%M:%S", datetime.timedelta(seconds=1)),
+    ("%Y-%m-%d %H:%M", datetime.timedelta(minutes=1)),
+    ("%Y-%m-%d %H", datetime.timedelta(hours=1)),
+    ("%Y-%m-%d", datetime.timedelta(days=1)),
+]
+
+
+def to_datetime(value: Any) -> Any:
+    """
+    时间字符串转换为 datetime，已是 datetime 或无法解析的值原样返回
+    """
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+        except ValueError:
+            return value
+    return value
+
+
+def to_timestamp_str(value: Any) -> Any:
+    """
+    datetime 转换为时间字符串，其他值原样返回
+    """
+    if isinstance(value, datetime.datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value
+
+
+def prefix_range(prefix: str) -> Tuple[datetime.datetime, datetime.datetime]:
+    """
+    把时间前缀转换为左闭右开的时间范围
+    :param prefix: 如 "2025-07-15"（整天）、"2025-07-15 10"（整小时）
+    :return: (start, end)
+    """
+    prefix = prefix.strip()
+    for fmt, span in _PREFIX_FORMATS:
+        try:
+            start = datetime.datetime.strptime(prefix, fmt)
+        except ValueError:
+            continue
+        return start, start + span
+    raise ValueError(f"无法解析的时间: {prefix}")
+
+
+def to_storage(doc: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """
+    写入数据库前把指定字段的时间字符串转换为 datetime
+    :return: 浅拷贝，不修改调用方的文档
+    """
+    doc = dict(doc)
+    for field in fields:
+        if field in doc:
+            doc[field] = to_datetime(doc[field])
+    return doc
+
+
+def from_storage(doc: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """
+    从数据库读出后把指定字段的 datetime 转换回时间字符串（原地修改）
+    """
+    for field in fields:
+        if field in doc:
+            doc[field] = to_timestamp_str(doc[field])
+    return doc
@@ -1,50 +1,178 @@
 import sys
 import os
-import re
 # 自己的路径
 sys.path.append(os.path.abspath("./fastapi"))
 
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Optional, Union, Callable, AsyncIterator
+from pymongo import ASCENDING
+from pymongo.database import Database
 from app.core.config import MONGODB_URI, DATABASE_NAME, get_database
+from app.core.dbexecutor import run_db
+from app.core.timeutil import to_storage, from_storage, prefix_range
+from app.core.streaming import ndjson_stream
+from app.crud.SequenceCrud import sequence_crud
+
+# 以 BSON 日期存储的时间字段
+REPORT_TIMESTAMP_FIELDS = ("timestamp", "original_timestamp")
 
 class CauseReportCrud:
-    def __init__(self):
-        self.db = get_database()
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db if db is not None else get_database()
+
+    def ensure_indexes(self) -> None:
+        """
+        创建按时间范围、系统信息ID、日期查询所需的索引；按主机查询走 (主机, 时间) 复合索引
+        """
+        self.db["cause_report"].create_index([("timestamp", ASCENDING)])
+        self.db["cause_report"].create_index([("original_timestamp", ASCENDING)])
+        self.db["cause_report"].create_index([("host_id", ASCENDING), ("timestamp", ASCENDING)])
+        self.db["cause_report"].create_index([("host_id", ASCENDING), ("original_timestamp", ASCENDING)])
+        self.db["cause_report"].create_index([("system_info_id", ASCENDING)])
+        self.db["cause_report_by_timestamp"].create_index([("date", ASCENDING), ("id", ASCENDING)])
+        self.db["cause_report_by_timestamp"].create_index([("host_id", ASCENDING), ("date", ASCENDING), ("id", ASCENDING)])
 
     async def save_cause_report(self, data: Dict[str, Any]) -> None:
         """
         保存单个异常报告到 MongoDB
         :param data: 异常报告数据
         """
-        self.db["cause_report"].insert_one(data)
+        doc = to_storage(data, REPORT_TIMESTAMP_FIELDS)
+        await run_db(self.db["cause_report"].insert_one, doc)
+        data["_id"] = doc["_id"]
+
+    async def save_cause_reports(self, data: List[Dict[str, Any]]) -> None:
+        """
+        批量保存异常报告到 MongoDB
+        :param data: 异常报告列表
+        """
+        if data:
+            docs = [to_storage(item, REPORT_TIMESTAMP_FIELDS) for item in data]
+            await run_db(self.db["cause_report"].insert_many, docs)
+            for item, doc in zip(data, docs):
+                item["_id"] = doc["_id"]
+
+    async def reserve_report_ids(self, count: int) -> range:
+        """
+        为一批异常报告预留连续的报告ID
+        :param count: 报告个数
+        :return: ID 区间
+        """
+        return await sequence_crud.reserve("cause_report", count)
 
-    async def find_cause_reports(self) -> List[Dict[str, Any]]:
+    async def next_summary_id(self) -> int:
+        """
+        分配一个新的综合报告ID（cause_report_by_timestamp）
+        """
+        return await sequence_crud.next_id("cause_report_by_timestamp")
+
+    async def find_cause_reports(self, host_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         从 MongoDB 中获取所有异常报告
+        :param host_id: 主机标识，为空时返回所有主机
         :return: 异常报告列表
         """
-        result = list(self.db["cause_report"].find())
+        query = {} if host_id is None else {"host_id": host_id}
+        result = await run_db(lambda: list(self.db["cause_report"].find(query)))
         for item in result:
             item["_id"] = str(item["_id"])
+            from_storage(item, REPORT_TIMESTAMP_FIELDS)
         return result
     
-    async def find_cause_reports_by_timestamp(self, timestamp: str) -> List[Dict[str, Any]]:
+    def stream_cause_reports(self, host_id: Optional[str] = None,
+                             transform: Optional[Callable[[Dict[str, Any]], Any]] = None) -> AsyncIterator[bytes]:
+        """
+        与 find_cause_reports 相同的查询，按批从游标读取并输出 NDJSON，不在内存中构造完整列表
+        :param host_id: 主机标识，为空时返回所有主机
+        :param transform: 在 _id / 时间字段转换之后对每条报告做的格式化
+        :return: NDJSON 分块（每行一条报告）
+        """
+        query = {} if host_id is None else {"host_id": host_id}
+
+        def to_api(item: Dict[str, Any]) -> Any:
+            item["_id"] = str(item["_id"])
+            from_storage(item, REPORT_TIMESTAMP_FIELDS)
+            return item if transform is None else transform(item)
+        return ndjson_stream(lambda: self.db["cause_report"].find(query), to_api)
+
+    async def find_cause_reports_by_timestamp(self, timestamp: str, host_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         根据时间戳查找异常报告
         :param timestamp: 时间戳（如2025-07-15）
+        :param host_id: 主机标识，为空时返回所有主机
         :return: 异常报告列表
         """
-        # 用re.compile生成正则对象
-        regex = re.compile(f"^{timestamp}")
-        # 优先使用original_timestamp字段查询，如果没有则使用timestamp字段
-        result = list(self.db["cause_report"].find({
+        try:
+            start, end = prefix_range(timestamp)
+        except ValueError:
+            return []
+        # 优先使用original_timestamp字段查询，如果没有则使用timestamp字段；
+        # $or 的两个分支各自走时间索引做范围扫描
+        query = {
             "$or": [
-                {"original_timestamp": regex},
-                {"timestamp": regex}
+                {"original_timestamp": {"$gte": start, "$lt": end}},
+                {"timestamp": {"$gte": start, "$lt": end}}
             ]
-        }))
+        }
+        if host_id is not None:
+            # 每个分支都带上主机条件，各自走 (主机, 时间) 复合索引
+            query = {"$or": [dict(branch, host_id=host_id) for branch in query["$or"]]}
+        result = await run_db(lambda: list(self.db["cause_report"].find(query)))
         for item in result:
             item["_id"] = str(item["_id"])
+            from_storage(item, REPORT_TIMESTAMP_FIELDS)
+        return result
+
+    async def find_processed_system_info_ids(self) -> set:
+        """
+        获取已生成过异常报告的系统信息ID集合
+        """
+        reports = await run_db(lambda: list(self.db["cause_report"].find({}, {"system_info_id": 1})))
+        return {report.get("system_info_id") for report in reports}
+
+    async def exists_cause_report(self, query: Dict[str, Any]) -> bool:
+        """
+        判断是否已存在满足条件的异常报告
+        :param query: 查询条件
+        """
+        query = to_storage(query, REPORT_TIMESTAMP_FIELDS)
+        return await run_db(self.db["cause_report"].find_one, query) is not None
+
+    async def delete_old_format_reports(self) -> int:
+        """
+        删除包含 "异常列表" 字段的旧格式异常报告
+        :return: 删除条数
+        """
+        result = await run_db(self.db["cause_report"].delete_many, {"异常列表": {"$exists": True}})
+        return result.deleted_count
+
+    async def save_summary_report(self, data: Dict[str, Any]) -> None:
+        """
+        保存综合报告到 cause_report_by_timestamp
+        :param data: 综合报告数据
+        """
+        await run_db(self.db["cause_report_by_timestamp"].insert_one, data)
+
+    async def find_latest_summary_reports_by_day(self, host_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        获取每一天（每台主机）最后一条综合报告
+        :param host_id: 主机标识，为空时返回所有主机
+        """
+        # 聚合：按 (date, host_id) 分组，取每组最后一条
+        pipeline = [
+            {"$sort": {"date": 1, "_id": 1}},
+            {"$group": {
+                "_id": {"date": "$date", "host_id": "$host_id"},
+                "last_report": {"$last": "$$ROOT"}
+            }},
+            {"$replaceRoot": {"newRoot": "$last_report"}},
+            {"$sort": {"date": 1, "host_id": 1}}
+        ]
+        if host_id is not None:
+            pipeline.insert(0, {"$match": {"host_id": host_id}})
+        result = await run_db(lambda: list(self.db["cause_report_by_timestamp"].aggregate(pipeline)))
+        for item in result:
+            if "_id" in item:
+                item["_id"] = str(item["_id"])
         return result
 
     async def get_report_by_id(self, report_id: int) -> Union[Dict[str, Any], None]:
@@ -53,19 +181,24 @@ class CauseReportCrud:
         :param report_id: 报告ID
         :return: 异常报告，如果不存在则返回None
         """
-        result = self.db["cause_report_by_timestamp"].find_one({"id": report_id})
+        result = await run_db(self.db["cause_report_by_timestamp"].find_one, {"id": report_id})
         if result:
             result["_id"] = str(result["_id"])
         return result
     
-    async def get_id(self, timestamp: str):
+    async def get_id(self, timestamp: str, host_id: Optional[str] = None):
         """
         根据时间戳获取报告ID
         :param timestamp: 时间戳
+        :param host_id: 主机标识，为空时不按主机过滤
         :return: 报告ID，如果不存在则返回-1
         """
-        result = self.db["cause_report_by_timestamp"].find_one(
-            {"date": timestamp},
+        query = {"date": timestamp}
+        if host_id is not None:
+            query["host_id"] = host_id
+        result = await run_db(
+            self.db["cause_report_by_timestamp"].find_one,
+            query,
             sort=[("id", -1)],  # 按id字段降序排序
             projection={"id": 1}  # 只返回id字段
         )
@@ -0,0 +1,463 @@
+import sys
+import os
+import json
+import mmap
+import zlib
+import struct
+import datetime
+import threading
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+
+from typing import List, Optional, Dict, Any, Tuple
+from app.core.config import LOCAL_STORE_DIR, LOCAL_BLOCK_SAMPLES, LOCAL_SEGMENT_BYTES, LOCAL_RETENTION_DAYS
+from app.core.projection import apply_projection
+from app.dataoperate.bucketlayout import flatten, unflatten
+from app.dataoperate.gorilla import encode_timestamps, decode_timestamps, encode_floats, decode_floats
+
+# 记录头：类型(1) + 负载长度(4) + 负载 CRC32(4) + 起始毫秒(8) + 结束毫秒(8)
+_RECORD = struct.Struct("<cIIqq")
+_SCHEMA = b"S"  # 段内字段路径表的追加记录
+_BLOCK = b"B"   # 压缩块
+_HEADER_LEN = struct.Struct("<I")
+_SUFFIX = ".seg"
+_EPOCH = datetime.datetime(1970, 1, 1)
+# 整数列按 delta-of-delta 编码：取值在 ±2^60 内时相邻差值之差不超过 ±2^62，能放进 64 位补码
+_INT_LIMIT = 1 << 60
+# 与浮点混在同一列时按 float64 编码，超出该范围的整数无法精确表示
+_FLOAT_INT_LIMIT = 1 << 53
+_ABSENT = object()
+
+
+def to_millis(ts: datetime.datetime) -> int:
+    return (ts - _EPOCH) // datetime.timedelta(milliseconds=1)
+
+
+def from_millis(ms: int) -> datetime.datetime:
+    return _EPOCH + datetime.timedelta(milliseconds=ms)
+
+
+def local_sample_id(host_id: Optional[str], ms: int) -> str:
+    """本地存储不保存 ObjectId，以 (主机, 时间) 生成稳定的样本标识"""
+    return f"local:{host_id}:{ms}"
+
+
+def _segment_seq(name: str) -> int:
+    """段文件名 {序号}-{起始毫秒}.seg 中的序号，序号按新建顺序递增"""
+    return int(name[:-len(_SUFFIX)].split("-")[0])
+
+
+def _dotted(path: str) -> str:
+    """flatten 路径转为 MongoDB 投影写法，如 disk_info/[0]/disk_percent -> disk_info.disk_percent"""
+    return ".".join(seg for seg in path.split("/") if not seg.startswith("[") and seg != "#")
+
+
+def _series_kind(values: List[Any]) -> str:
+    """
+    列的编码方式
+    - "i"：整数，按 delta-of-delta 编码（计数器、ID 等）
+    - "f"：浮点（可混有 float64 能精确表示的整数），按 Gorilla XOR 编码
+    - "v"：其他（字符串、布尔、None、超出上述范围的整数等），只记录取值变化的位置，原样保存
+    """
+    present = [v for v in values if v is not _ABSENT]
+    if all(type(v) is int and -_INT_LIMIT <= v < _INT_LIMIT for v in present):
+        return "i"
+    if all(type(v) is float or (type(v) is int and -_FLOAT_INT_LIMIT <= v <= _FLOAT_INT_LIMIT) for v in present):
+        return "f"
+    return "v"
+
+
+class Segment:
+    """
+    段文件：按时间顺序追加的记录序列，文件预分配后通过 mmap 写入
+    启动时顺序扫描记录头并校验 CRC，遇到未写入区域或写到一半的记录即停止，之后的写入从该位置覆盖
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.paths: List[str] = []        # 段内字段路径表，块中以下标引用
+        self.path_ids: Dict[str, int] = {}
+        self.blocks: List[Tuple[int, int, Any, int, int]] = []  # (起始毫秒, 结束毫秒, 主机, 负载偏移, 负载长度)
+        self.size = 0
+        self.writable = False
+        self._file = None
+        self.mm: Optional[mmap.mmap] = None
+
+    @property
+    def start_ms(self) -> Optional[int]:
+        return min(b[0] for b in self.blocks) if self.blocks else None
+
+    @property
+    def end_ms(self) -> Optional[int]:
+        return max(b[1] for b in self.blocks) if self.blocks else None
+
+    def open(self, writable: bool = False, capacity: int = LOCAL_SEGMENT_BYTES) -> None:
+        """
+        :param writable: 是否作为活动段打开，活动段预分配到 capacity 字节
+        """
+        self.writable = writable
+        self._file = open(self.path, "r+b" if writable else "rb")
+        length = os.fstat(self._file.fileno()).st_size
+        if writable and length < capacity:
+            self._file.truncate(capacity)
+            length = capacity
+        if length:
+            self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        self._scan()
+
+    def _scan(self) -> None:
+        pos = 0
+        length = len(self.mm) if self.mm is not None else 0
+        while pos + _RECORD.size <= length:
+            kind, size, crc, start_ms, end_ms = _RECORD.unpack_from(self.mm, pos)
+            body = pos + _RECORD.size
+            if kind not in (_SCHEMA, _BLOCK) or body + size > length:
+                break
+            payload = self.mm[body:body + size]
+            if zlib.crc32(payload) != crc:
+                break
+            if kind == _SCHEMA:
+                for path in json.loads(payload):
+                    self.path_ids[path] = len(self.paths)
+                    self.paths.append(path)
+            else:
+                host_id = _block_header(payload)["h"]
+                self.blocks.append((start_ms, end_ms, host_id, body, size))
+            pos = body + size
+        self.size = pos
+
+    def free(self) -> int:
+        return (len(self.mm) if self.mm is not None else 0) - self.size
+
+    def append(self, kind: bytes, payload: bytes, start_ms: int = 0, end_ms: int = 0) -> int:
+        """追加一条记录并刷到磁盘，返回负载偏移"""
+        body = self.size + _RECORD.size
+        self.mm[body:body + len(payload)] = payload
+        self.mm[self.size:body] = _RECORD.pack(kind, len(payload), zlib.crc32(payload), start_ms, end_ms)
+        self.mm.flush()
+        self.size = body + len(payload)
+        return body
+
+    def seal(self) -> None:
+        """封段：截断到实际大小并改为只读映射"""
+        if not self.writable:
+            return
+        self.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(self.size)
+        self.open(writable=False)
+
+    def close(self) -> None:
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.paths, self.path_ids, self.blocks = [], {}, []
+
+
+def _block_header(payload: bytes) -> Dict[str, Any]:
+    (length,) = _HEADER_LEN.unpack_from(payload, 0)
+    return json.loads(zlib.decompress(payload[_HEADER_LEN.size:_HEADER_LEN.size + length]))
+
+
+class LocalMetricStore:
+    """
+    嵌入式本地指标存储，不依赖数据库
+    - 样本按主机缓存在内存中，每满 LOCAL_BLOCK_SAMPLES 条编码为一个压缩块：
+      时间戳按 delta-of-delta、整数列按 delta-of-delta、浮点列按 Gorilla XOR 编码，
+      字符串等其他列只记录取值变化；每列单独成段，读取时只解码投影需要的列
+    - 压缩块追加写入预分配、内存映射的段文件，段写满后截断封存并新建段；
+      字段路径在段内只记录一次（schema 记录），块中以下标引用
+    - 按时间范围读取时只打开、解码与范围相交的段和块
+    - 超过 LOCAL_RETENTION_DAYS 的段在新建段时整段删除
+    所有方法为同步方法并加锁，由 SystemInfoCrud 放到线程池中调用
+    """
+    def __init__(self, directory: str = LOCAL_STORE_DIR, block_samples: int = LOCAL_BLOCK_SAMPLES,
+                 segment_bytes: int = LOCAL_SEGMENT_BYTES, retention_days: Optional[int] = LOCAL_RETENTION_DAYS):
+        self.directory = directory
+        self.block_samples = block_samples
+        self.segment_bytes = segment_bytes
+        self.retention_days = retention_days
+        self.segments: List[Segment] = []
+        self._open: Dict[Any, List[Dict[str, Any]]] = {}  # host_id -> 尚未编码的样本
+        self._lock = threading.RLock()
+        self._opened = False
+        self._next_seq = 0  # 下一个新建段的序号
+        self.last_id = 0
+        self.sample_count = 0
+        self.block_count = 0
+        self.decoded_blocks = 0
+
+    def open(self) -> None:
+        """扫描已有段文件，最后一个段作为可写的活动段"""
+        with self._lock:
+            if self._opened:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            names = sorted((n for n in os.listdir(self.directory) if n.endswith(_SUFFIX)), key=_segment_seq)
+            self._next_seq = _segment_seq(names[-1]) + 1 if names else 0
+            for i, name in enumerate(names):
+                segment = Segment(os.path.join(self.directory, name))
+                segment.open(writable=i == len(names) - 1, capacity=self.segment_bytes)
+                self.segments.append(segment)
+            self.block_count = sum(len(s.blocks) for s in self.segments)
+            # 恢复自增 ID：块按主机分别写入，取每个主机最新一个块中 id 的最大值
+            hosts = set()
+            for segment in reversed(self.segments):
+                for block in reversed(segment.blocks):
+                    if block[2] in hosts:
+                        continue
+                    hosts.add(block[2])
+                    samples = self._decode(segment, block, {"id"})
+                    self.last_id = max([self.last_id] + [s.get("id") or 0 for s in samples])
+            self._opened = True
+
+    def next_id(self) -> int:
+        with self._lock:
+            self.open()
+            self.last_id += 1
+            return self.last_id
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        """
+        加入一条样本，满一个块时编码写入段文件
+        :param doc: timestamp 为 datetime 的样本
+        """
+        with self._lock:
+            self.open()
+            if isinstance(doc.get("id"), int):
+                self.last_id = max(self.last_id, doc["id"])
+            host_id = doc.get("host_id")
+            docs = self._open.setdefault(host_id, [])
+            docs.append(doc)
+            self.sample_count += 1
+            if len(docs) >= self.block_samples:
+                self._write_block(self._open.pop(host_id))
+
+    def flush(self) -> None:
+        """把所有未写满的块写入段文件"""
+        with self._lock:
+            for host_id in list(self._open):
+                self._write_block(self._open.pop(host_id))
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._opened:
+                return
+            self.flush()
+            for segment in self.segments:
+                segment.close()
+            self.segments = []
+            self._opened = False
+
+    def _encode(self, docs: List[Dict[str, Any]], path_ids: Dict[str, int]) -> Tuple[bytes, List[str]]:
+        """
+        编码一个块
+        :return: (负载, 段路径表中尚不存在的新路径)
+        """
+        flats = []
+        for doc in docs:
+            flat = flatten({k: v for k, v in doc.items() if k not in ("_id", "timestamp")})
+            flats.append(flat)
+        paths: Dict[str, None] = {}
+        for flat in flats:
+            for path in flat:
+                paths.setdefault(path)
+        new_paths = [p for p in paths if p not in path_ids]
+        ids = dict(path_ids)
+        for path in new_paths:
+            ids[path] = len(ids)
+
+        timestamps = encode_timestamps([to_millis(doc["timestamp"]) for doc in docs])
+        data = [timestamps]
+        offset = len(timestamps)
+        header: Dict[str, Any] = {"h": docs[0].get("host_id"), "n": len(docs), "t": len(timestamps),
+                                  "i": [], "f": [], "v": {}, "a": {}}
+        for path in paths:
+            pid = ids[path]
+            values = [flat.get(path, _ABSENT) for flat in flats]
+            absent = [i for i, v in enumerate(values) if v is _ABSENT]
+            if absent:
+                header["a"][pid] = absent
+            kind = _series_kind(values)
+            if kind == "v":
+                changes, last = [], _ABSENT
+                for i, value in enumerate(values):
+                    if value is not _ABSENT and (last is _ABSENT or value != last or type(value) is not type(last)):
+                        changes.append([i, value])
+                        last = value
+                header["v"][pid] = changes
+                continue
+            # 缺失的位置沿用前一个值，编码后只占 1 位
+            filled, last = [], 0
+            for value in values:
+                last = last if value is _ABSENT else value
+                filled.append(last)
+            encoded = encode_timestamps(filled) if kind == "i" else encode_floats([float(v) for v in filled])
+            header[kind].append([pid, offset, len(encoded)])
+            data.append(encoded)
+            offset += len(encoded)
+        head = zlib.compress(json.dumps(header, separators=(",", ":"), default=str).encode())
+        return _HEADER_LEN.pack(len(head)) + head + b"".join(data), new_paths
+
+    def _write_block(self, docs: List[Dict[str, Any]]) -> None:
+        if not docs:
+            return
+        millis = [to_millis(doc["timestamp"]) for doc in docs]
+        start_ms, end_ms = min(millis), max(millis)
+        active = self.segments[-1] if self.segments and self.segments[-1].writable else None
+        payload, new_paths = self._encode(docs, active.path_ids if active else {})
+        schema = json.dumps(new_paths).encode() if new_paths else b""
+        needed = len(payload) + len(schema) + 2 * _RECORD.size
+        if active is None or active.free() < needed:
+            # 新段的路径表为空：先按空路径表重新编码（完整 schema 记录），再按最终大小新建段
+            payload, new_paths = self._encode(docs, {})
+            schema = json.dumps(new_paths).encode()
+            active = self._rotate(start_ms, len(payload) + len(schema) + 2 * _RECORD.size)
+        if new_paths:
+            active.append(_SCHEMA, schema)
+            for path in new_paths:
+                active.path_ids[path] = len(active.paths)
+                active.paths.append(path)
+        body = active.append(_BLOCK, payload, start_ms, end_ms)
+        active.blocks.append((start_ms, end_ms, docs[0].get("host_id"), body, len(payload)))
+        self.block_count += 1
+
+    def _rotate(self, start_ms: int, needed: int) -> Segment:
+        """封存当前段并新建段，顺带清理过期段"""
+        if self.segments and self.segments[-1].writable:
+            self.segments[-1].seal()
+        self._expire()
+        # 段名带递增序号：同一毫秒内多次换段也不会重名；"xb" 保证不会截断已存在（可能仍被映射）的段文件
+        path = os.path.join(self.directory, f"{self._next_seq:010d}-{start_ms}{_SUFFIX}")
+        self._next_seq += 1
+        with open(path, "xb") as f:
+            f.truncate(max(self.segment_bytes, needed))
+        segment = Segment(path)
+        segment.open(writable=True, capacity=self.segment_bytes)
+        self.segments.append(segment)
+        return segment
+
+    def _expire(self) -> None:
+        if self.retention_days is None:
+            return
+        cutoff = to_millis(datetime.datetime.now() - datetime.timedelta(days=self.retention_days))
+        for segment in [s for s in self.segments if s.end_ms is not None and s.end_ms < cutoff]:
+            self.block_count -= len(segment.blocks)
+            segment.close()
+            os.remove(segment.path)
+            self.segments.remove(segment)
+
+    def _decode(self, segment: Segment, block: Tuple[int, int, Any, int, int],
+                prefixes: Optional[set] = None) -> List[Dict[str, Any]]:
+        """
+        解码一个块，prefixes 不为空时只解码匹配这些投影前缀的列
+        :return: 扁平样本列表（含 "timestamp" 毫秒值）
+        """
+        _, _, _, offset, size = block
+        payload = segment.mm[offset:offset + size]
+        (length,) = _HEADER_LEN.unpack_from(payload, 0)
+        header = json.loads(zlib.decompress(payload[_HEADER_LEN.size:_HEADER_LEN.size + length]))
+        data = payload[_HEADER_LEN.size + length:]
+        count = header["n"]
+        self.decoded_blocks += 1
+
+        def wanted(pid) -> bool:
+            if prefixes is None:
+                return True
+            dotted = _dotted(segment.paths[int(pid)])
+            return any(dotted == p or dotted.startswith(p + ".") for p in prefixes)
+
+        flats: List[Dict[str, Any]] = [{} for _ in range(count)]
+        columns: List[Tuple[int, List[Any]]] = []
+        for kind in ("i", "f"):
+            for pid, start, size in header[kind]:
+                if wanted(pid):
+                    chunk = data[start:start + size]
+                    columns.append((pid, decode_timestamps(chunk, count) if kind == "i" else decode_floats(chunk, count)))
+        for pid, changes in header["v"].items():
+            if not wanted(pid):
+                continue
+            values, j, current = [], 0, None
+            for i in range(count):
+                if j < len(changes) and changes[j][0] == i:
+                    current = changes[j][1]
+                    j += 1
+                values.append(current)
+            columns.append((int(pid), values))
+        for pid, values in columns:
+            path = segment.paths[int(pid)]
+            absent = set(header["a"].get(str(pid), ()))
+            for i, value in enumerate(values):
+                if i not in absent:
+                    flats[i][path] = value
+        for flat, ms in zip(flats, decode_timestamps(data[:header["t"]], count)):
+            flat["timestamp"] = ms
+        return flats
+
+    def find(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+             host_id: Optional[str] = None, projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        按时间范围读取样本，返回与 MongoDB 读取结果相同的结构（timestamp 为 datetime），按时间升序
+        :param projection: MongoDB 风格的投影，只支持包含式字段
+        """
+        prefixes = None
+        if projection:
+            prefixes = {k for k, v in projection.items() if v and k != "_id"}
+        with_id = not projection or projection.get("_id", 1) != 0
+        lo = to_millis(start) if start is not None else None
+        hi = to_millis(end) if end is not None else None
+        with self._lock:
+            self.open()
+            flats: List[Dict[str, Any]] = []
+            for segment in self.segments:
+                if not segment.blocks:
+                    continue
+                if (hi is not None and segment.start_ms >= hi) or (lo is not None and segment.end_ms < lo):
+                    continue
+                for block in segment.blocks:
+                    if (hi is not None and block[0] >= hi) or (lo is not None and block[1] < lo):
+                        continue
+                    if host_id is not None and block[2] != host_id:
+                        continue
+                    flats.extend(self._decode(segment, block, prefixes))
+            pending = [doc for host, docs in self._open.items() if host_id is None or host == host_id for doc in docs]
+        samples = []
+        for flat in flats:
+            ms = flat.pop("timestamp")
+            if (lo is not None and ms < lo) or (hi is not None and ms >= hi):
+                continue
+            sample = unflatten(flat)
+            sample["timestamp"] = from_millis(ms)
+            if with_id:
+                sample["_id"] = local_sample_id(flat.get("host_id"), ms)
+            samples.append(sample)
+        for doc in pending:
+            ms = to_millis(doc["timestamp"])
+            if (lo is not None and ms < lo) or (hi is not None and ms >= hi):
+                continue
+            sample = apply_projection({k: v for k, v in doc.items() if k != "_id"}, projection)
+            if with_id:
+                sample["_id"] = local_sample_id(doc.get("host_id"), ms)
+            samples.append(sample)
+        samples.sort(key=lambda item: item["timestamp"])
+        return samples
+
+    def stats(self) -> Dict[str, Any]:
+        """存储运行状态"""
+        with self._lock:
+            disk_bytes = sum(s.size for s in self.segments)
+            return {
+                "directory": os.path.abspath(self.directory),
+                "segments": len(self.segments),
+                "blocks": self.block_count,
+                "disk_bytes": disk_bytes,
+                "open_samples": sum(len(docs) for docs in self._open.values()),
+                "written_samples": self.sample_count,
+                "decoded_blocks": self.decoded_blocks
+            }
+
+
+local_metric_store = LocalMetricStore()
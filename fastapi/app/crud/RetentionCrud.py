@@ -0,0 +1,111 @@
+import sys
+import os
+import datetime
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+
+from typing import List, Optional, Dict, Any, Set, Tuple
+from pymongo import ASCENDING
+from pymongo.database import Database
+from app.core.config import get_database
+from app.crud.RollupCrud import ROLLUP_TIERS
+
+
+class RetentionCrud:
+    """
+    数据保留与压缩所需的数据库操作
+    均为同步方法，由后台保留任务放到数据库线程池中逐批执行
+    """
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db if db is not None else get_database()
+
+    def delete_batch(self, collection_name: str, query: Dict[str, Any], limit: int) -> int:
+        """
+        删除一批满足条件的文档
+        先按 _id 取出至多 limit 条再删除，单次删除量有上限，不会长时间占用数据库
+        :return: 删除条数
+        """
+        ids = [doc["_id"] for doc in self.db[collection_name].find(query, {"_id": 1}).limit(limit)]
+        if not ids:
+            return 0
+        return self.db[collection_name].delete_many({"_id": {"$in": ids}}).deleted_count
+
+    def oldest_timestamp(self, collection_name: str, field: str = "timestamp") -> Optional[datetime.datetime]:
+        """
+        集合中最早的时间（走时间索引）
+        """
+        doc = self.db[collection_name].find_one(
+            {field: {"$type": "date"}},
+            sort=[(field, ASCENDING)],
+            projection={field: 1}
+        )
+        return doc[field] if doc else None
+
+    def rollup_buckets(self, tier: str, start: datetime.datetime, end: datetime.datetime) -> Set[Tuple[str, datetime.datetime]]:
+        """
+        某一汇总层级在时间范围内已存在的桶
+        :return: {(host_id, bucket)}
+        """
+        collection_name = ROLLUP_TIERS[tier][0]
+        query = {"bucket": {"$gte": start, "$lt": end}}
+        return {(doc.get("host_id"), doc["bucket"])
+                for doc in self.db[collection_name].find(query, {"_id": 0, "host_id": 1, "bucket": 1})}
+
+    def referenced_report_ids(self) -> Set[int]:
+        """
+        已生成解决方案的综合报告 ID，压缩时保留这些报告
+        """
+        return {doc["report_id"] for doc in self.db["solutions"].find({}, {"_id": 0, "report_id": 1})
+                if doc.get("report_id") is not None}
+
+    def superseded_summary_ids(self, keep: Set[int], limit: int) -> List[Any]:
+        """
+        cause_report_by_timestamp 中同一主机同一天有多条综合报告时，除 id 最大（最新）的一条外均为被取代的版本
+        综合报告按 (日期, 主机) 生成，不同主机的报告互不取代
+        :param keep: 需要保留的报告 ID
+        :param limit: 最多返回的条数
+        :return: 可删除文档的 _id
+        """
+        pipeline = [
+            {"$sort": {"date": 1, "host_id": 1, "id": 1}},
+            {"$group": {"_id": {"date": "$date", "host_id": "$host_id"},
+                        "docs": {"$push": {"_id": "$_id", "id": "$id"}}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}}
+        ]
+        ids = []
+        for group in self.db["cause_report_by_timestamp"].aggregate(pipeline, allowDiskUse=True):
+            for doc in group["docs"][:-1]:
+                if doc.get("id") in keep:
+                    continue
+                ids.append(doc["_id"])
+                if len(ids) >= limit:
+                    return ids
+        return ids
+
+    def delete_by_ids(self, collection_name: str, ids: List[Any]) -> int:
+        """
+        按 _id 删除
+        :return: 删除条数
+        """
+        if not ids:
+            return 0
+        return self.db[collection_name].delete_many({"_id": {"$in": ids}}).deleted_count
+
+
+if __name__ == "__main__":
+    # 自检：同一天不同主机的综合报告互不取代，只删除同一主机的旧版本（写入独立的测试库，结束后删除）
+    from app.core.database import database_manager
+
+    check_db = database_manager.get_client()["SH13_retention_check"]
+    check_db.drop_collection("cause_report_by_timestamp")
+    check_db["cause_report_by_timestamp"].insert_many([
+        {"_id": "a-1", "id": 1, "date": "2025-07-15", "host_id": "a"},
+        {"_id": "b-2", "id": 2, "date": "2025-07-15", "host_id": "b"},
+        {"_id": "a-3", "id": 3, "date": "2025-07-15", "host_id": "a"},
+        {"_id": "b-4", "id": 4, "date": "2025-07-16", "host_id": "b"},
+    ])
+    superseded = RetentionCrud(check_db).superseded_summary_ids(set(), 100)
+    database_manager.get_client().drop_database("SH13_retention_check")
+    assert superseded == ["a-1"], superseded
+    print(f"综合报告压缩自检通过：待删除 {superseded}")
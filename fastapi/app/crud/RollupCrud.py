@@ -0,0 +1,201 @@
+import sys
+import os
+import datetime
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+
+from typing import List, Optional, Dict, Any, Tuple
+from pymongo import ASCENDING, UpdateOne
+from pymongo.database import Database
+from app.core.config import get_database
+from app.core.dbexecutor import run_db
+from app.core.timeutil import to_timestamp_str
+
+# 汇总层级 -> (集合名, 桶宽度秒数)
+ROLLUP_TIERS = {
+    "1m": ("system_info_1m", 60),
+    "1h": ("system_info_1h", 3600),
+}
+
+
+class RollupCrud:
+    """
+    system_info 汇总层级的读写
+    每个桶一条文档：{"host_id", "bucket", "samples", <字段>: {"min", "max", "sum", "count", "last"}}
+    写入使用 $min/$max/$inc/$set 增量 upsert，同一个桶可以分多次写入而结果不变
+    """
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db if db is not None else get_database()
+
+    def ensure_indexes(self) -> None:
+        """
+        每个主机每个桶只有一条文档，(host_id, bucket) 唯一索引同时支撑按时间范围查询
+        """
+        for collection_name, _ in ROLLUP_TIERS.values():
+            self.db[collection_name].create_index([("host_id", ASCENDING), ("bucket", ASCENDING)], unique=True)
+            self.db[collection_name].create_index([("bucket", ASCENDING)])
+
+    def upsert_buckets(self, tier: str, buckets: Dict[tuple, Dict[str, Any]]) -> int:
+        """
+        把内存中累积的桶增量写入汇总集合
+        :param tier: 汇总层级，"1m" 或 "1h"
+        :param buckets: {(host_id, bucket): {"samples": 样本数, "fields": {字段: [min, max, sum, count, last]}}}
+        :return: 写入的桶数
+        """
+        operations = []
+        for (host_id, bucket), delta in buckets.items():
+            update = {"$min": {}, "$max": {}, "$inc": {"samples": delta["samples"]}, "$set": {}}
+            for field, (low, high, total, count, last) in delta["fields"].items():
+                update["$min"][f"{field}.min"] = low
+                update["$max"][f"{field}.max"] = high
+                update["$inc"][f"{field}.sum"] = total
+                update["$inc"][f"{field}.count"] = count
+                update["$set"][f"{field}.last"] = last
+            if not update["$set"]:
+                # 桶内样本都没有可汇总的数值字段，只累加样本数
+                update = {"$inc": update["$inc"]}
+            operations.append(UpdateOne({"host_id": host_id, "bucket": bucket}, update, upsert=True))
+        if operations:
+            self.db[ROLLUP_TIERS[tier][0]].bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def find_buckets(self, tier: str, start: datetime.datetime, end: datetime.datetime,
+                           fields: List[str], host_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按时间范围读取某一层级的汇总数据
+        :param tier: 汇总层级，"1m" 或 "1h"
+        :param start: 起始时间（含）
+        :param end: 结束时间（不含）
+        :param fields: 需要的字段
+        :param host_id: 主机标识，为空时返回所有主机
+        :return: [{"timestamp", "host_id", <字段>: {"min", "max", "mean", "last"}}]，按时间升序
+        """
+        query = {"bucket": {"$gte": start, "$lt": end}}
+        if host_id is not None:
+            query["host_id"] = host_id
+        projection = {"_id": 0, "host_id": 1, "bucket": 1}
+        projection.update({field: 1 for field in fields})
+        collection = self.db[ROLLUP_TIERS[tier][0]]
+        docs = await run_db(lambda: list(collection.find(query, projection).sort("bucket", ASCENDING)))
+        points = []
+        for doc in docs:
+            point = {"timestamp": to_timestamp_str(doc["bucket"]), "host_id": doc.get("host_id")}
+            for field in fields:
+                stats = doc.get(field)
+                if not stats or not stats.get("count"):
+                    point[field] = None
+                    continue
+                point[field] = {
+                    "min": stats["min"],
+                    "max": stats["max"],
+                    "mean": stats["sum"] / stats["count"],
+                    "last": stats["last"]
+                }
+            points.append(point)
+        return points
+
+    async def find_columns(self, tier: str, start: datetime.datetime, end: datetime.datetime, fields: List[str],
+                           stat: str = "mean", host_id: Optional[str] = None
+                           ) -> Tuple[List[datetime.datetime], Dict[str, List[Optional[float]]]]:
+        """
+        按时间范围按列读取某一层级每个桶的单项统计值，供降采样等数值计算使用
+        :param stat: "min"、"max"、"mean" 或 "last"
+        :return: (桶起始时间列表, {字段: 与时间等长的取值列表，桶内无取值时为 None})，按时间升序
+        """
+        query = {"bucket": {"$gte": start, "$lt": end}}
+        if host_id is not None:
+            query["host_id"] = host_id
+        keys = ("sum", "count") if stat == "mean" else ("count", stat)
+        projection = {"_id": 0, "bucket": 1}
+        projection.update({f"{field}.{key}": 1 for field in fields for key in keys})
+        collection = self.db[ROLLUP_TIERS[tier][0]]
+
+        def load():
+            times = []
+            columns = {field: [] for field in fields}
+            for doc in collection.find(query, projection).sort("bucket", ASCENDING):
+                times.append(doc["bucket"])
+                for field in fields:
+                    stats = doc.get(field)
+                    if not stats or not stats.get("count"):
+                        columns[field].append(None)
+                    elif stat == "mean":
+                        columns[field].append(stats["sum"] / stats["count"])
+                    else:
+                        columns[field].append(stats[stat])
+            return times, columns
+
+        return await run_db(load)
+
+    async def top_hosts(self, tier: str, start: datetime.datetime, end: datetime.datetime,
+                        field: str, stat: str = "mean", limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        按主机汇总一个时间窗口内某个字段的统计值，取排名前 limit 的主机（服务端聚合，不读取原始样本）
+        :param tier: 汇总层级，"1m" 或 "1h"
+        :param start: 起始时间（含）
+        :param end: 结束时间（不含）
+        :param field: 汇总字段，如 cpu_percent
+        :param stat: 排序依据，"mean"、"max"、"min" 或 "last"
+        :param limit: 返回的主机数
+        :return: [{"host_id", "min", "max", "mean", "last", "samples", "last_seen"}]，按 stat 降序
+        """
+        pipeline = [
+            {"$match": {"bucket": {"$gte": start, "$lt": end}, f"{field}.count": {"$gt": 0}}},
+            {"$sort": {"bucket": ASCENDING}},
+            {"$group": {
+                "_id": "$host_id",
+                "min": {"$min": f"${field}.min"},
+                "max": {"$max": f"${field}.max"},
+                "sum": {"$sum": f"${field}.sum"},
+                "count": {"$sum": f"${field}.count"},
+                "last": {"$last": f"${field}.last"},
+                "last_seen": {"$last": "$bucket"}
+            }},
+            {"$project": {
+                "_id": 0, "host_id": "$_id", "min": 1, "max": 1, "last": 1, "last_seen": 1,
+                "samples": "$count", "mean": {"$divide": ["$sum", "$count"]}
+            }},
+            {"$sort": {stat: -1, "host_id": ASCENDING}},
+            {"$limit": limit}
+        ]
+        collection = self.db[ROLLUP_TIERS[tier][0]]
+        result = await run_db(lambda: list(collection.aggregate(pipeline)))
+        for item in result:
+            item["last_seen"] = to_timestamp_str(item["last_seen"])
+        return result
+
+    async def find_hosts(self, tier: str, start: datetime.datetime, end: datetime.datetime) -> List[Dict[str, Any]]:
+        """
+        时间窗口内有汇总数据的主机
+        :return: [{"host_id", "samples", "first_seen", "last_seen"}]，按主机标识排序
+        """
+        pipeline = [
+            {"$match": {"bucket": {"$gte": start, "$lt": end}}},
+            {"$group": {
+                "_id": "$host_id",
+                "samples": {"$sum": "$samples"},
+                "first_seen": {"$min": "$bucket"},
+                "last_seen": {"$max": "$bucket"}
+            }},
+            {"$project": {"_id": 0, "host_id": "$_id", "samples": 1, "first_seen": 1, "last_seen": 1}},
+            {"$sort": {"host_id": ASCENDING}}
+        ]
+        collection = self.db[ROLLUP_TIERS[tier][0]]
+        result = await run_db(lambda: list(collection.aggregate(pipeline)))
+        for item in result:
+            item["first_seen"] = to_timestamp_str(item["first_seen"])
+            item["last_seen"] = to_timestamp_str(item["last_seen"])
+        return result
+
+    async def has_rollups(self, tier: str, start: datetime.datetime, end: datetime.datetime,
+                          host_id: Optional[str] = None) -> bool:
+        """
+        判断某一层级在给定时间范围内是否已有汇总数据
+        :param host_id: 主机标识，为空时不区分主机
+        """
+        collection = self.db[ROLLUP_TIERS[tier][0]]
+        query = {"bucket": {"$gte": start, "$lt": end}}
+        if host_id is not None:
+            query["host_id"] = host_id
+        return await run_db(collection.find_one, query, {"_id": 1}) is not None
@@ -0,0 +1,89 @@
+import sys
+import os
+import threading
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+
+from typing import Dict, List, Optional
+from pymongo.database import Database
+from pymongo import ReturnDocument
+from app.core.config import SEQUENCE_BLOCK_SIZE, get_database
+from app.core.dbexecutor import run_db
+
+
+class SequenceCrud:
+    """
+    自增 ID 分配器，计数保存在 counters 集合中：{"_id": 序列名, "seq": 已分配的最大值}
+    - 通过 find_one_and_update + $inc 原子地预留一段 ID，并发请求之间不会重复
+    - 每次向数据库预留 block_size 个 ID 缓存在本地，批量插入一次往返即可拿到整段 ID
+    - 序列名与业务集合同名，首次使用时以集合中现有的最大 id 为起点
+    """
+    def __init__(self, block_size: int = SEQUENCE_BLOCK_SIZE, db: Optional[Database] = None):
+        self.db = db if db is not None else get_database()
+        self.block_size = block_size
+        self._blocks: Dict[str, List[int]] = {}  # 序列名 -> [下一个可用 ID, 块结束 ID（不含）]
+        self._seeded = set()
+        self._lock = threading.Lock()
+
+    def _seed(self, name: str) -> None:
+        """用业务集合中已有的最大 id 初始化计数器（$max 保证幂等）"""
+        last = self.db[name].find_one(
+            {"id": {"$type": "number"}},
+            sort=[("id", -1)],
+            projection={"id": 1}
+        )
+        self.db["counters"].update_one(
+            {"_id": name},
+            {"$max": {"seq": int(last["id"]) if last else 0}},
+            upsert=True
+        )
+        self._seeded.add(name)
+
+    def _reserve_block(self, name: str, count: int) -> int:
+        """向数据库预留 count 个连续 ID，返回第一个 ID"""
+        doc = self.db["counters"].find_one_and_update(
+            {"_id": name},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["seq"] - count + 1
+
+    def allocate(self, name: str, count: int = 1) -> range:
+        """
+        分配 count 个连续 ID
+        :param name: 序列名（业务集合名）
+        :param count: 需要的 ID 个数
+        :return: 分配到的 ID 区间
+        """
+        with self._lock:
+            if name not in self._seeded:
+                self._seed(name)
+            block = self._blocks.get(name)
+            if block is None or block[1] - block[0] < count:
+                # 本地剩余不足时整段丢弃，重新预留（ID 可能出现空洞，但不会重复）
+                size = max(count, self.block_size)
+                start = self._reserve_block(name, size)
+                block = self._blocks[name] = [start, start + size]
+            start = block[0]
+            block[0] += count
+            return range(start, start + count)
+
+    async def next_id(self, name: str) -> int:
+        """
+        获取下一个 ID
+        :param name: 序列名（业务集合名）
+        """
+        return (await run_db(self.allocate, name, 1))[0]
+
+    async def reserve(self, name: str, count: int) -> range:
+        """
+        一次预留一段连续 ID，用于批量插入
+        :param name: 序列名（业务集合名）
+        :param count: ID 个数
+        """
+        return await run_db(self.allocate, name, count)
+
+
+sequence_crud = SequenceCrud()
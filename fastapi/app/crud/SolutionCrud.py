@@ -1,7 +1,11 @@
 import sys
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, AsyncIterator
+from pymongo.database import Database
 from app.core.config import get_database
+from app.core.dbexecutor import run_db
+from app.core.streaming import ndjson_stream
+from app.crud.SequenceCrud import sequence_crud
 from bson.objectid import ObjectId
 import time
 
@@ -9,8 +13,8 @@ import time
 sys.path.append(os.path.abspath("./fastapi"))
 
 class SolutionCrud:
-    def __init__(self):
-        self.db = get_database()
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db if db is not None else get_database()
         # 确保解决方案集合存在
         if 'solutions' not in self.db.list_collection_names():
             self.db.create_collection('solutions')
@@ -29,7 +33,7 @@ class SolutionCrud:
             'solutions': solution_data.get('solutions'),
             'created_at': solution_data.get('created_at')
         }
-        self.db['solutions'].insert_one(solution)
+        await run_db(self.db['solutions'].insert_one, solution)
 
     async def get_solution_by_report_id(self, report_id: int) -> Dict[str, Any]:
         """
@@ -37,7 +41,7 @@ class SolutionCrud:
         :param report_id: 根因报告ID
         :return: 解决方案数据
         """
-        solution = self.db['solutions'].find_one({'report_id': report_id})
+        solution = await run_db(self.db['solutions'].find_one, {'report_id': report_id})
         if solution:
             # 转换ObjectId为字符串
             if '_id' in solution:
@@ -52,7 +56,8 @@ class SolutionCrud:
         :param solution_data: 更新的解决方案数据
         :return: 是否更新成功
         """
-        result = self.db['solutions'].update_one(
+        result = await run_db(
+            self.db['solutions'].update_one,
             {'report_id': report_id},
             {'$set': solution_data}
         )
@@ -63,29 +68,43 @@ class SolutionCrud:
         获取所有解决方案
         :return: 所有解决方案列表
         """
-        solutions = []
-        async for solution in self.db['solutions'].find():
+        solutions = await run_db(lambda: list(self.db['solutions'].find()))
+        for solution in solutions:
             if '_id' in solution:
                 solution['_id'] = str(solution['_id'])
-            solutions.append(solution)
         return solutions
     
+    def stream_all_solutions(self) -> AsyncIterator[bytes]:
+        """
+        按批读取所有解决方案并输出 NDJSON（每行一个解决方案），不在内存中构造完整列表
+        """
+        def to_api(solution: Dict[str, Any]) -> Dict[str, Any]:
+            solution["_id"] = str(solution["_id"])
+            return solution
+        return ndjson_stream(lambda: self.db['solutions'].find(), to_api)
+
     async def get_all_SN(self) -> List[Dict[str, Any]]:
         """
         获取所有SN:solution_note
         :return: 所有SN列表
         """
-        result = list(self.db["solution_note"].find())
+        result = await run_db(lambda: list(self.db["solution_note"].find()))
         for item in result:
             item["_id"] = str(item["_id"])
         return result
     
+    async def next_SN_id(self) -> int:
+        """
+        分配一个新的SN ID
+        """
+        return await sequence_crud.next_id("solution_note")
+
     async def insert_SN(self, data: Dict[str, Any]):
         """
         插入SN:solution_note
         :param data: 插入的数据
         """
-        self.db["solution_note"].insert_one(data)
+        await run_db(self.db["solution_note"].insert_one, data)
 
     async def edit_SN(self, sn_id: int, title: str, content: str,tag: int):
         """
@@ -100,14 +119,14 @@ class SolutionCrud:
             "tag": tag,
             "update_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
         }
-        self.db["solution_note"].update_one({"id": sn_id}, {"$set": data})
+        await run_db(self.db["solution_note"].update_one, {"id": sn_id}, {"$set": data})
 
     async def delete_SN(self, sn_id: int):
         """
         删除SN:solution_note
         :param sn_id: SN ID
         """
-        self.db["solution_note"].delete_one({"id": sn_id})
+        await run_db(self.db["solution_note"].delete_one, {"id": sn_id})
 
     async def set_SN_like(self, sn_id: int, like: bool):
         """
@@ -115,7 +134,7 @@ class SolutionCrud:
         :param sn_id: SN ID
         :param like: 是否点赞
         """
-        self.db["solution_note"].update_one({"id": sn_id}, {"$set": {"like": like}})
+        await run_db(self.db["solution_note"].update_one, {"id": sn_id}, {"$set": {"like": like}})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,450 @@
+import sys
+import os
+import json
+import mmap
+import time
+import zlib
+import struct
+import asyncio
+import threading
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+
+import bson
+from typing import List, Optional, Dict, Any, Tuple
+from pymongo.database import Database
+from app.core.config import (
+    SPOOL_DIR, SPOOL_SEGMENT_BYTES, SPOOL_MAX_BYTES,
+    SPOOL_REPLAY_BATCH, SPOOL_REPLAY_INTERVAL, SPOOL_RETRY_INTERVAL, SPOOL_CODEC, get_database
+)
+from app.core.dbexecutor import run_db
+from app.core.database import insert_documents
+from app.dataoperate.wireformat import encode_sample, decode_sample, is_encoded_sample
+
+# 记录头：负载长度(4) + 负载 CRC32(4) + 序号(8)，负载为样本二进制格式或 BSON 编码的文档
+_RECORD = struct.Struct("<IIQ")
+_SUFFIX = ".spool"
+_CHECKPOINT = "checkpoint.json"
+
+
+class _SpoolSegment:
+    """段文件，以段内第一条记录的序号命名，预分配后通过 mmap 追加写入"""
+    def __init__(self, directory: str, first_seq: int):
+        self.first_seq = first_seq
+        self.path = os.path.join(directory, f"{first_seq:020d}{_SUFFIX}")
+        self.size = 0
+        self.synced = 0  # 已刷到磁盘的位置
+        self.count = 0
+        self.writable = False
+        self._file = None
+        self.mm: Optional[mmap.mmap] = None
+
+    @property
+    def next_seq(self) -> int:
+        return self.first_seq + self.count
+
+    def open(self, writable: bool, capacity: int) -> None:
+        self.writable = writable
+        self._file = open(self.path, "r+b" if writable else "rb")
+        length = os.fstat(self._file.fileno()).st_size
+        if writable and length < capacity:
+            self._file.truncate(capacity)
+            length = capacity
+        if length:
+            self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        self._scan()
+
+    def _scan(self) -> None:
+        """
+        恢复写入位置：记录的 CRC 与序号都连续才视为有效，
+        遇到未写入区域、写到一半的记录或上一轮残留的数据即停止
+        """
+        pos = 0
+        length = len(self.mm) if self.mm is not None else 0
+        while pos + _RECORD.size <= length:
+            size, crc, seq = _RECORD.unpack_from(self.mm, pos)
+            body = pos + _RECORD.size
+            if seq != self.next_seq or size == 0 or body + size > length:
+                break
+            if zlib.crc32(self.mm[body:body + size]) != crc:
+                break
+            self.count += 1
+            pos = body + size
+        self.size = pos
+        self.synced = pos
+
+    def free(self) -> int:
+        return (len(self.mm) if self.mm is not None else 0) - self.size
+
+    def append(self, payload: bytes) -> int:
+        """追加一条记录：先写负载再写记录头，进程崩溃时最多留下一条校验失败的半条记录"""
+        seq = self.next_seq
+        body = self.size + _RECORD.size
+        self.mm[body:body + len(payload)] = payload
+        self.mm[self.size:body] = _RECORD.pack(len(payload), zlib.crc32(payload), seq)
+        self.size = body + len(payload)
+        self.count += 1
+        return seq
+
+    def read(self, offset: int, limit: int) -> Tuple[List[bytes], int]:
+        """从 offset 开始读取至多 limit 条记录，返回 (负载列表, 结束偏移)"""
+        payloads = []
+        while offset < self.size and len(payloads) < limit:
+            size, _, _ = _RECORD.unpack_from(self.mm, offset)
+            body = offset + _RECORD.size
+            payloads.append(self.mm[body:body + size])
+            offset = body + size
+        return payloads, offset
+
+    def sync(self) -> None:
+        """把上次同步之后追加的记录刷到磁盘，只 msync 这段区间所在的页，而不是整个预分配的段"""
+        if self.mm is not None and self.writable and self.size > self.synced:
+            start = self.synced - self.synced % mmap.PAGESIZE
+            self.mm.flush(start, self.size - start)
+            self.synced = self.size
+
+    def seal(self) -> None:
+        """封段：截断到实际大小并改为只读映射"""
+        if not self.writable:
+            return
+        self.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(self.size)
+        self.count = 0
+        self.open(False, 0)
+
+    def close(self) -> None:
+        if self.mm is not None:
+            self.sync()
+            self.mm.close()
+            self.mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class DurableSpool:
+    """
+    本地持久化队列：追加写入的内存映射段文件 + 回放位置检查点
+    - append：样本按 codec 编码（"wire" 样本二进制格式 / "bson"）后追加到活动段，只写本地文件，不受数据库状态影响
+    - read_batch / commit：回放方从检查点开始批量读取，写入数据库成功后再提交新的检查点
+      （临时文件 + os.replace 原子替换）；提交前崩溃会重放同一批，由 _id 去重
+    - 总大小超过 max_bytes 时丢弃最旧的段，并计入 dropped_count
+    - 已完全回放的段在提交检查点时删除
+    - 读取时按记录的魔数识别编码，切换 codec 后旧段中的记录仍可回放
+    所有方法为同步方法并加锁，在事件循环中经 run_db 调用
+    """
+    def __init__(self, directory: str = SPOOL_DIR, segment_bytes: int = SPOOL_SEGMENT_BYTES,
+                 max_bytes: int = SPOOL_MAX_BYTES, codec: str = SPOOL_CODEC):
+        if codec not in ("wire", "bson"):
+            raise ValueError(f"未知的 spool 编码: {codec}")
+        self.directory = directory
+        self.codec = codec
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.segments: List[_SpoolSegment] = []
+        self._lock = threading.Lock()
+        self._opened = False
+        self._position: Tuple[int, int, int] = (0, 0, 0)  # 回放位置：(段首序号, 段内偏移, 下一条待回放的序号)
+        self.appended_count = 0
+        self.dropped_count = 0
+
+    def open(self) -> None:
+        """扫描已有段文件并读取检查点"""
+        with self._lock:
+            self._open()
+
+    def _open(self) -> None:
+        if self._opened:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(_SUFFIX))
+        for i, name in enumerate(names):
+            segment = _SpoolSegment(self.directory, int(name[:-len(_SUFFIX)]))
+            segment.open(i == len(names) - 1, self.segment_bytes)
+            self.segments.append(segment)
+        checkpoint = None
+        try:
+            with open(os.path.join(self.directory, _CHECKPOINT)) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if checkpoint and any(s.first_seq == checkpoint["segment"] for s in self.segments):
+            self._position = (checkpoint["segment"], checkpoint["offset"], checkpoint["seq"])
+        else:
+            self._position = self._segment_start(0)
+        self._opened = True
+
+    def _segment_start(self, index: int) -> Tuple[int, int, int]:
+        if index < len(self.segments):
+            return self.segments[index].first_seq, 0, self.segments[index].first_seq
+        next_seq = self.segments[-1].next_seq if self.segments else 0
+        return next_seq, 0, next_seq
+
+    def _segment_index(self, first_seq: int) -> Optional[int]:
+        for i, segment in enumerate(self.segments):
+            if segment.first_seq == first_seq:
+                return i
+        return None
+
+    def append(self, doc: Dict[str, Any]) -> int:
+        """
+        追加一条文档
+        :param doc: 可 BSON 编码的文档，应已带有 _id，回放重试时据此去重
+        :return: 记录序号
+        """
+        payload = encode_sample(doc) if self.codec == "wire" else bson.encode(doc)
+        with self._lock:
+            self._open()
+            active = self.segments[-1] if self.segments and self.segments[-1].writable else None
+            if active is None or active.free() < _RECORD.size + len(payload):
+                active = self._rotate(len(payload))
+            seq = active.append(payload)
+            self.appended_count += 1
+            return seq
+
+    def _rotate(self, needed: int) -> _SpoolSegment:
+        next_seq = self._segment_start(len(self.segments))[2]
+        if self.segments:
+            self.segments[-1].seal()
+        segment = _SpoolSegment(self.directory, next_seq)
+        with open(segment.path, "wb") as f:
+            f.truncate(max(self.segment_bytes, _RECORD.size + needed))
+        segment.open(True, self.segment_bytes)
+        if self._position[1] == 0 and self._segment_index(self._position[0]) is None:
+            self._position = (next_seq, 0, next_seq)
+        self.segments.append(segment)
+        self._enforce_limit()
+        return segment
+
+    def _enforce_limit(self) -> None:
+        """超过总大小上限时丢弃最旧的段（活动段除外）"""
+        while len(self.segments) > 1 and sum(s.size for s in self.segments[:-1]) + self.segment_bytes > self.max_bytes:
+            oldest = self.segments.pop(0)
+            if self._position[0] == oldest.first_seq:
+                self.dropped_count += oldest.next_seq - self._position[2]
+                self._position = self._segment_start(0)
+                self._write_checkpoint()
+            oldest.close()
+            os.remove(oldest.path)
+
+    def read_batch(self, limit: int) -> Tuple[List[Dict[str, Any]], Tuple[int, int, int]]:
+        """
+        从回放位置读取至多 limit 条文档（不移动回放位置），读取前把活动段刷到磁盘
+        :return: (文档列表, 读完这批之后的位置)，位置交给 commit 提交
+        """
+        with self._lock:
+            self._open()
+            if self.segments and self.segments[-1].writable:
+                self.segments[-1].sync()
+            first_seq, offset, seq = self._position
+            payloads: List[bytes] = []
+            index = self._segment_index(first_seq)
+            while index is not None and index < len(self.segments) and len(payloads) < limit:
+                segment = self.segments[index]
+                chunk, offset = segment.read(offset, limit - len(payloads))
+                payloads.extend(chunk)
+                seq += len(chunk)
+                if offset < segment.size or index == len(self.segments) - 1:
+                    first_seq = segment.first_seq
+                    break
+                index += 1
+                first_seq, offset = self._segment_start(index)[:2]
+            position = (first_seq, offset, seq)
+        return [decode_sample(p) if is_encoded_sample(p) else bson.decode(p) for p in payloads], position
+
+    def commit(self, position: Tuple[int, int, int]) -> None:
+        """提交回放位置，并删除已完全回放的段"""
+        with self._lock:
+            index = self._segment_index(position[0])
+            if index is None:
+                # 读取之后该段因超出大小上限被丢弃，回放位置已前移
+                return
+            self._position = position
+            self._write_checkpoint()
+            for segment in self.segments[:index]:
+                segment.close()
+                os.remove(segment.path)
+            self.segments = self.segments[index:]
+
+    def _write_checkpoint(self) -> None:
+        first_seq, offset, seq = self._position
+        path = os.path.join(self.directory, _CHECKPOINT)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segment": first_seq, "offset": offset, "seq": seq}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def close(self) -> None:
+        with self._lock:
+            for segment in self.segments:
+                segment.close()
+            self.segments = []
+            self._opened = False
+
+    def stats(self) -> Dict[str, Any]:
+        """积压条数与占用空间"""
+        with self._lock:
+            next_seq = self.segments[-1].next_seq if self.segments else self._position[2]
+            return {
+                "directory": os.path.abspath(self.directory),
+                "segments": len(self.segments),
+                "disk_bytes": sum(s.size for s in self.segments),
+                "backlog": max(next_seq - self._position[2], 0),
+                "appended_count": self.appended_count,
+                "dropped_count": self.dropped_count
+            }
+
+
+class SpoolReplayer:
+    """
+    回放任务：把本地持久化队列中的文档按批写入 MongoDB
+    数据库不可达时按 SPOOL_RETRY_INTERVAL 重试，恢复后以 SPOOL_REPLAY_BATCH 的大批量尽快追平积压
+    被数据库拒绝的文档（校验失败、文档过大等，重试也不会成功）跳过并计入 rejected_count，不阻塞后续回放
+    指定 id_sequence 时，写入前为没有 id 的文档从该序列整批分配自增 ID：
+    入队时不访问数据库，数据库不可用期间样本照常进入队列
+    """
+    def __init__(self, spool: DurableSpool, collection_name: str,
+                 batch_size: int = SPOOL_REPLAY_BATCH,
+                 interval: float = SPOOL_REPLAY_INTERVAL,
+                 retry_interval: float = SPOOL_RETRY_INTERVAL,
+                 db: Optional[Database] = None,
+                 id_sequence: Optional[str] = None):
+        self.spool = spool
+        self._db = db
+        self.collection_name = collection_name
+        self.id_sequence = id_sequence
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        # 运行统计
+        self.replayed_count = 0
+        self.rejected_count = 0
+        self.batch_count = 0
+        self.failed_batches = 0
+        self.replay_seconds = 0.0
+        self.last_batch_size = 0
+        self.last_batch_rate = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def db(self) -> Database:
+        # 首次回放时才获取数据库连接，只使用 DurableSpool 的进程（如采集 agent）导入本模块不会创建 MongoClient
+        if self._db is None:
+            self._db = get_database()
+        return self._db
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """启动后台回放任务"""
+        if self.running:
+            return
+        await run_db(self.spool.open)
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止回放任务，并尽量把剩余的积压写入数据库"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+        while await self.replay_once() > 0:
+            pass
+
+    def _assign_ids(self, docs: List[Dict[str, Any]]) -> None:
+        """为没有 id 的文档整批预留连续 ID（重放同一批时重新分配，已写入的文档由 _id 去重，只会留下 ID 空洞）"""
+        missing = [doc for doc in docs if "id" not in doc]
+        if not missing:
+            return
+        # 用到时才导入，只使用 DurableSpool 的进程不会因此创建 MongoClient
+        from app.crud.SequenceCrud import sequence_crud
+        for doc, doc_id in zip(missing, sequence_crud.allocate(self.id_sequence, len(missing))):
+            doc["id"] = doc_id
+
+    def _insert(self, docs: List[Dict[str, Any]]) -> int:
+        """
+        批量写入，重复键说明文档已在之前的回放中写入，视为成功
+        有文档遇到临时错误时抛出异常，整批稍后重放
+        :return: 被拒绝而跳过的文档数
+        """
+        if self.id_sequence is not None:
+            self._assign_ids(docs)
+        retry, rejected = insert_documents(self.db[self.collection_name], docs)
+        if retry:
+            raise RuntimeError(f"{len(retry)} 条文档写入遇到临时错误，整批稍后重放")
+        for doc in rejected:
+            print(f"{self.collection_name} 回放时文档被拒绝，已跳过: _id={doc.get('_id')}")
+        return len(rejected)
+
+    async def replay_once(self) -> int:
+        """
+        回放一批
+        :return: 写入条数，队列为空返回 0，写入失败返回 -1
+        """
+        docs, position = await run_db(self.spool.read_batch, self.batch_size)
+        if not docs:
+            return 0
+        start = time.perf_counter()
+        try:
+            rejected = await run_db(self._insert, docs)
+            await run_db(self.spool.commit, position)
+        except Exception as e:
+            self.failed_batches += 1
+            self.last_error = str(e)
+            return -1
+        elapsed = time.perf_counter() - start
+        self.last_error = None
+        self.batch_count += 1
+        self.replayed_count += len(docs) - rejected
+        self.rejected_count += rejected
+        self.replay_seconds += elapsed
+        self.last_batch_size = len(docs)
+        self.last_batch_rate = len(docs) / elapsed if elapsed > 0 else 0.0
+        return len(docs)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            replayed = await self.replay_once()
+            if replayed == self.batch_size:
+                # 还有积压，立即回放下一批
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(),
+                                       timeout=self.retry_interval if replayed < 0 else self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """回放任务运行状态，含回放吞吐"""
+        return dict(self.spool.stats(), **{
+            "running": self.running,
+            "collection": self.collection_name,
+            "replayed_count": self.replayed_count,
+            "rejected_count": self.rejected_count,
+            "batch_count": self.batch_count,
+            "failed_batches": self.failed_batches,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_docs_per_sec": round(self.last_batch_rate, 1),
+            "avg_docs_per_sec": round(self.replayed_count / self.replay_seconds, 1) if self.replay_seconds else 0.0,
+            "last_error": self.last_error
+        })
+
+
+system_info_spool = DurableSpool(os.path.join(SPOOL_DIR, "system_info"))
+system_info_replayer = SpoolReplayer(system_info_spool, "system_info", id_sequence="system_info")
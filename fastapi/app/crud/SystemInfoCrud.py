@@ -6,35 +6,541 @@ import os
 #自己的路径
 sys.path.append(os.path.abspath("./fastapi"))
 
-from typing import List, Optional, Dict, Any
-from app.core.config import MONGODB_URI, DATABASE_NAME, get_database
+from typing import List, Optional, Dict, Any, Tuple, Iterator, AsyncIterator
+from pymongo import ASCENDING, DESCENDING
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+from app.core.config import (
+    MONGODB_URI, DATABASE_NAME, SYSTEM_INFO_STORAGE, SYSTEM_INFO_TS_GRANULARITY, SYSTEM_INFO_TS_EXPIRE_SECONDS,
+    BUCKET_SPAN_SECONDS, SPOOL_ENABLED, get_database
+)
+from app.core.dbexecutor import run_db
+from app.core.database import DUPLICATE_KEY_ERROR
+from app.core.timeutil import to_storage, from_storage, prefix_range, to_datetime
+from app.core.streaming import ndjson_stream
+from app.core.projection import build_projection, apply_projection
+from app.crud.SequenceCrud import sequence_crud
+from app.crud.CauseReportCrud import REPORT_TIMESTAMP_FIELDS
+from app.crud.WriteBuffer import system_info_writer, system_info_bucket_writer
+from app.dataoperate.rollup import system_info_rollup, extract_metrics, ROLLUP_FIELDS
+from app.dataoperate.bucketlayout import system_info_bucketer, pack_bucket, unpack_bucket, BUCKET_COLLECTION
+from app.crud.LocalMetricCrud import local_metric_store, local_sample_id, to_millis
+from app.crud.SpoolCrud import system_info_spool, system_info_replayer
+from app.dataoperate.wireformat import describe_schema
+from bson import ObjectId
 
+# 以 BSON 日期存储的时间字段
+TIMESTAMP_FIELDS = ("timestamp",)
+# fields= 投影允许的字段路径：样本 schema 中的全部字段及其上级路径，数组元素的字段写作 "disk_info.device"
+PROJECTABLE_FIELDS = frozenset(
+    ".".join(parts[:i])
+    for path, _ in describe_schema()
+    for parts in [path.replace("[]", "").split(".")]
+    for i in range(1, len(parts) + 1)
+)
+# 投影时总是返回的字段（接口转换 _id、按日期归组、本地存储生成样本标识都依赖它们）
+PROJECTION_REQUIRED_FIELDS = ("_id", "timestamp", "host_id")
+# 每日汇总统计 min / mean / max 的指标（汇总字段名，路径见 rollup.ROLLUP_FIELDS）
+DAILY_SUMMARY_FIELDS = ("cpu_percent", "memory_percent", "swap_percent", "disk_percent_max",
+                        "bytes_sent_kb_per_sec", "bytes_recv_kb_per_sec", "risk_score")
+
+
+def sample_projection(fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    """
+    把接口的 fields 参数转换为 system_info 查询投影，只接受 PROJECTABLE_FIELDS 中的路径
+    :param fields: 字段路径列表，如 ["cpu_info.cpu_percent", "memory_info.memory_percent"]，为空时返回完整样本
+    :return: MongoDB 投影，fields 为空时返回 None
+    """
+    return build_projection(fields, PROJECTABLE_FIELDS, PROJECTION_REQUIRED_FIELDS)
+
+
+def _summary_metrics(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """把 {字段_min, 字段_mean, 字段_max} 整理为 {字段: {"min", "mean", "max"}}，没有取值的字段为 None"""
+    metrics = {}
+    for field in DAILY_SUMMARY_FIELDS:
+        mean = stats.get(f"{field}_mean")
+        metrics[field] = None if mean is None else {
+            "min": stats[f"{field}_min"], "mean": mean, "max": stats[f"{field}_max"]}
+    return metrics
 
 
 class SystemInfoCrud:
-    def __init__(self):
-        self.db = get_database()
+    """
+    system_info 支持四种存储布局：
+    - "standard"：普通集合，每秒一条文档
+    - "timeseries"：MongoDB 原生时序集合，timestamp 为 timeField、host_id 为 metaField，
+      服务端按主机和时间自动分桶并列式压缩。时序集合不对 _id 建唯一索引，
+      写后缓冲整批重试时可能产生重复样本
+    - "bucket"：应用层列式桶，每个主机每个时间窗口一条文档（见 bucketlayout），写入 system_info_buckets；
+      读取时解包并与 system_info 中的历史文档、内存中尚未封桶的样本合并
+    - "local"：不经过 MongoDB，写入本地 Gorilla 压缩段文件（见 LocalMetricCrud），读取接口与返回结构不变
+    standard / timeseries 在首次使用时从数据库检测，bucket / local 由配置指定；查询按布局选择对应写法
+    """
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db if db is not None else get_database()
+        self._storage: Optional[str] = None
+
+    def detect_storage(self) -> str:
+        """
+        检测 system_info 集合的存储布局
+        :return: "standard"、"timeseries"、"bucket" 或 "local"
+        """
+        if SYSTEM_INFO_STORAGE in ("bucket", "local"):
+            self._storage = SYSTEM_INFO_STORAGE
+            return self._storage
+        info = next(iter(self.db.list_collections(filter={"name": "system_info"})), None)
+        self._storage = "timeseries" if info and info.get("type") == "timeseries" else "standard"
+        return self._storage
+
+    @property
+    def storage(self) -> str:
+        if self._storage is None:
+            self.detect_storage()
+        return self._storage
 
-    async def find_systeminfo(self)-> List[Dict[str, Any]]:
+    def create_timeseries_collection(self, name: str = "system_info") -> None:
+        """
+        按配置创建时序集合
+        :param name: 集合名
+        """
+        options = {
+            "timeseries": {
+                "timeField": "timestamp",
+                "metaField": "host_id",
+                "granularity": SYSTEM_INFO_TS_GRANULARITY
+            }
+        }
+        if SYSTEM_INFO_TS_EXPIRE_SECONDS:
+            options["expireAfterSeconds"] = SYSTEM_INFO_TS_EXPIRE_SECONDS
+        self.db.create_collection(name, **options)
+
+    def ensure_indexes(self) -> None:
+        """
+        按配置准备 system_info 集合，并创建按时间范围查询所需的索引
+        """
+        if SYSTEM_INFO_STORAGE == "local":
+            local_metric_store.open()
+            return
+        if SYSTEM_INFO_STORAGE == "timeseries" and "system_info" not in self.db.list_collection_names():
+            self.create_timeseries_collection()
+        storage = self.detect_storage()
+        if storage != SYSTEM_INFO_STORAGE:
+            print(f"system_info 已存在且为 {storage} 布局，与配置 {SYSTEM_INFO_STORAGE} 不一致，按现有布局运行")
+        # 单主机查询走 (主机, 时间) 复合索引，只扫描该主机的时间范围；时序集合的查询总是带时间范围，不需要单独的时间索引
+        self.db["system_info"].create_index([("host_id", ASCENDING), ("timestamp", ASCENDING)])
+        if storage != "timeseries":
+            # 全部主机的时间范围查询与数据保留任务按时间索引扫描
+            self.db["system_info"].create_index([("timestamp", ASCENDING)])
+        if storage == "bucket":
+            # 桶按时间窗口对齐，范围查询只需按窗口起点扫描
+            self.db[BUCKET_COLLECTION].create_index([("host_id", ASCENDING), ("start", ASCENDING)])
+            self.db[BUCKET_COLLECTION].create_index([("start", ASCENDING)])
+
+    @staticmethod
+    def _query(start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+               host_id: Optional[str] = None) -> Dict[str, Any]:
+        """按时间范围与主机构造 system_info 查询条件"""
+        query: Dict[str, Any] = {}
+        if start is not None or end is not None:
+            query["timestamp"] = {}
+            if start is not None:
+                query["timestamp"]["$gte"] = start
+            if end is not None:
+                query["timestamp"]["$lt"] = end
+        if host_id is not None:
+            query["host_id"] = host_id
+        return query
+
+    def _load(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+              host_id: Optional[str] = None, projection: Optional[Dict[str, Any]] = None,
+              pending: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        按时间范围读取样本（同步，在数据库线程池中执行），屏蔽存储布局差异
+        - 时序集合中的文档按桶存放，返回顺序与写入顺序无关，需要显式按时间排序
+        - 列式桶布局下解包桶文档，并合并历史文档与尚未封桶的样本（pending）
+        :return: 数据库存储格式的样本（timestamp 为 datetime）
+        """
+        storage = self.storage
+        if storage == "local":
+            return local_metric_store.find(start, end, host_id, projection)
+        query = self._query(start, end, host_id)
+        cursor = self.db["system_info"].find(query, projection)
+        if query or storage != "standard":
+            cursor = cursor.sort("timestamp", ASCENDING)
+        samples = list(cursor)
+        if storage != "bucket":
+            return samples
+
+        bucket_query: Dict[str, Any] = {}
+        if start is not None or end is not None:
+            bucket_query["start"] = {}
+            if start is not None:
+                bucket_query["start"]["$gt"] = start - datetime.timedelta(seconds=BUCKET_SPAN_SECONDS)
+            if end is not None:
+                bucket_query["start"]["$lt"] = end
+        if host_id is not None:
+            bucket_query["host_id"] = host_id
+        for doc in self.db[BUCKET_COLLECTION].find(bucket_query).sort("start", ASCENDING):
+            samples.extend(unpack_bucket(doc, start, end))
+        samples.extend(pending or [])
+        samples.sort(key=lambda item: item["timestamp"])
+        if projection:
+            # 桶文档与内存中的样本在进程内投影，结果与 MongoDB 投影一致
+            samples = [apply_projection(item, projection) for item in samples]
+        return samples
+
+    def _pending(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                 host_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """内存中尚未封桶的样本，需在事件循环线程中取出后再交给 _load"""
+        if SYSTEM_INFO_STORAGE != "bucket":
+            return []
+        return system_info_bucketer.open_samples(start, end, host_id)
+
+    async def find_systeminfo(self, host_id: Optional[str] = None,
+                              fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         从 MongoDB 中获取系统信息
+        :param host_id: 主机标识，为空时返回所有主机
+        :param fields: 只返回这些字段（见 PROJECTABLE_FIELDS），为空时返回完整样本
         :return: 系统信息列表
         """
-        result = list(self.db["system_info"].find())
+        projection = sample_projection(fields)
+        pending = self._pending(host_id=host_id)
+        result = await run_db(self._load, host_id=host_id, projection=projection, pending=pending)
+        for item in result:
+            item["_id"] = str(item["_id"])
+            from_storage(item, TIMESTAMP_FIELDS)
+        return result
+
+    async def find_systeminfo_by_date(self, date: str, host_id: Optional[str] = None,
+                                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        按时间索引获取某一天（或某个时间前缀）的系统信息
+        :param date: 日期，如 2025-07-15
+        :param host_id: 主机标识，为空时不按主机过滤；时序集合下可据此只扫描该主机的桶
+        :param fields: 只返回这些字段（见 PROJECTABLE_FIELDS），为空时返回完整样本
+        :return: 系统信息列表，按时间升序
+        """
+        start, end = prefix_range(date)
+        projection = sample_projection(fields)
+        pending = self._pending(start, end, host_id)
+        result = await run_db(self._load, start, end, host_id, projection, pending)
         for item in result:
             item["_id"] = str(item["_id"])
+            from_storage(item, TIMESTAMP_FIELDS)
         return result
 
-    async def save_system_info(self, data: Dict[str, Any]) -> None:
+    def _cursor(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                host_id: Optional[str] = None, pending: Optional[List[Dict[str, Any]]] = None,
+                projection: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        按时间范围返回样本游标（同步，在数据库线程池中执行），按时间升序
+        standard / timeseries 直接返回 MongoDB 游标，由调用方按批取出；其他布局没有逐条文档，读取后返回列表迭代器
+        """
+        if self.storage in ("standard", "timeseries"):
+            return self.db["system_info"].find(self._query(start, end, host_id), projection).sort("timestamp", ASCENDING)
+        return iter(self._load(start, end, host_id, projection, pending))
+
+    @staticmethod
+    def _to_api(item: Dict[str, Any]) -> Dict[str, Any]:
+        """数据库文档转换为接口返回格式：_id 转字符串、时间字段转时间字符串"""
+        item["_id"] = str(item["_id"])
+        return from_storage(item, TIMESTAMP_FIELDS)
+
+    def stream_systeminfo_by_date(self, date: str, host_id: Optional[str] = None,
+                                  fields: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+        """
+        与 find_systeminfo_by_date 相同的查询，按批从游标读取并输出 NDJSON，不在内存中构造完整列表
+        :param date: 日期，如 2025-07-15
+        :param host_id: 主机标识，为空时不按主机过滤
+        :param fields: 只返回这些字段（见 PROJECTABLE_FIELDS），为空时返回完整样本
+        :return: NDJSON 分块（每行一条样本，按时间升序）
+        """
+        start, end = prefix_range(date)
+        projection = sample_projection(fields)
+        pending = self._pending(start, end, host_id)
+        return ndjson_stream(lambda: self._cursor(start, end, host_id, pending, projection), self._to_api)
+
+    async def find_metric_samples(self, start: datetime.datetime, end: datetime.datetime,
+                                  host_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按时间范围读取原始样本中参与汇总的数值字段（原始秒级层级）
+        :param start: 起始时间（含）
+        :param end: 结束时间（不含）
+        :param host_id: 主机标识，为空时不按主机过滤
+        :return: 只含所需字段的样本，按时间升序
+        """
+        projection = {"_id": 0, "timestamp": 1, "host_id": 1, "disk_info.disk_percent": 1}
+        projection.update({".".join(path): 1 for path in ROLLUP_FIELDS.values()})
+        pending = self._pending(start, end, host_id)
+        result = await run_db(self._load, start, end, host_id, projection, pending)
+        for item in result:
+            from_storage(item, TIMESTAMP_FIELDS)
+        return result
+
+    async def find_metric_columns(self, start: datetime.datetime, end: datetime.datetime, fields: List[str],
+                                  host_id: Optional[str] = None
+                                  ) -> Tuple[List[datetime.datetime], Dict[str, List[Optional[float]]]]:
+        """
+        按时间范围按列读取原始样本中的汇总字段（原始秒级层级），供降采样等数值计算使用
+        :param fields: 汇总字段名（见 rollup.ROLLUP_FIELDS 与 disk_percent_max）
+        :return: (样本时间列表, {字段: 与时间等长的取值列表，缺失为 None})，按时间升序
+        """
+        projection = {"_id": 0, "timestamp": 1}
+        for field in fields:
+            if field == "disk_percent_max":
+                projection["disk_info.disk_percent"] = 1
+            else:
+                projection[".".join(ROLLUP_FIELDS[field])] = 1
+        pending = self._pending(start, end, host_id)
+
+        def load():
+            times = []
+            columns = {field: [] for field in fields}
+            for sample in self._load(start, end, host_id, projection, pending):
+                metrics = extract_metrics(sample)
+                times.append(sample["timestamp"])
+                for field in fields:
+                    columns[field].append(metrics.get(field))
+            return times, columns
+
+        return await run_db(load)
+
+    def _summarize_days(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                        host_id: Optional[str] = None, pending: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        按天汇总样本（同步，在数据库线程池中执行）
+        - standard / timeseries：服务端聚合，先投影出所需字段再按日期分组，只返回每天一条统计结果
+        - bucket / local：样本不是逐条文档，读取所需字段后在进程内单次遍历累加
+        :return: [{"date", "count", "anomaly_count", "metrics": {字段: {"min", "mean", "max"}}}]，按日期降序
+        """
+        if self.storage in ("standard", "timeseries"):
+            project: Dict[str, Any] = {
+                "_id": 0,
+                "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                "anomaly": {"$cond": [{"$gt": ["$anomaly_id", 0]}, 1, 0]},
+                # 一条样本内所有分区的最高磁盘使用率
+                "disk_percent_max": {"$max": "$disk_info.disk_percent"}
+            }
+            group: Dict[str, Any] = {"_id": "$date", "count": {"$sum": 1}, "anomaly_count": {"$sum": "$anomaly"}}
+            for field in DAILY_SUMMARY_FIELDS:
+                if field in ROLLUP_FIELDS:
+                    project[field] = "$" + ".".join(ROLLUP_FIELDS[field])
+                group[f"{field}_min"] = {"$min": f"${field}"}
+                group[f"{field}_mean"] = {"$avg": f"${field}"}
+                group[f"{field}_max"] = {"$max": f"${field}"}
+            pipeline = [
+                {"$match": self._query(start, end, host_id)},
+                {"$project": project},
+                {"$group": group},
+                {"$sort": {"_id": DESCENDING}}
+            ]
+            return [{"date": day["_id"], "count": day["count"], "anomaly_count": day["anomaly_count"],
+                     "metrics": _summary_metrics(day)}
+                    for day in self.db["system_info"].aggregate(pipeline)]
+
+        projection = {"_id": 0, "timestamp": 1, "anomaly_id": 1, "disk_info.disk_percent": 1}
+        projection.update({".".join(ROLLUP_FIELDS[f]): 1 for f in DAILY_SUMMARY_FIELDS if f in ROLLUP_FIELDS})
+        days: Dict[str, Dict[str, Any]] = {}
+        for sample in self._load(start, end, host_id, projection, pending):
+            date = sample["timestamp"].strftime("%Y-%m-%d")
+            day = days.get(date)
+            if day is None:
+                day = days[date] = {"date": date, "count": 0, "anomaly_count": 0, "stats": {}}
+            day["count"] += 1
+            anomaly_id = sample.get("anomaly_id")
+            if isinstance(anomaly_id, (int, float)) and anomaly_id > 0:
+                day["anomaly_count"] += 1
+            metrics = extract_metrics(sample)
+            for field in DAILY_SUMMARY_FIELDS:
+                value = metrics.get(field)
+                if value is None:
+                    continue
+                stats = day["stats"].get(field)
+                if stats is None:
+                    day["stats"][field] = [value, value, value, 1]
+                else:
+                    stats[0] = min(stats[0], value)
+                    stats[1] = max(stats[1], value)
+                    stats[2] += value
+                    stats[3] += 1
+        result = []
+        for date in sorted(days, reverse=True):
+            day = days[date]
+            stats = {}
+            for field, (low, high, total, count) in day.pop("stats").items():
+                stats.update({f"{field}_min": low, f"{field}_mean": total / count, f"{field}_max": high})
+            day["metrics"] = _summary_metrics(stats)
+            result.append(day)
+        return result
+
+    async def summarize_days(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                             host_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按天汇总系统信息：样本数、异常样本数、主要指标的 min / mean / max
+        :param start: 起始时间（含），为空时不限
+        :param end: 结束时间（不含），为空时不限
+        :param host_id: 主机标识，为空时汇总所有主机
+        :return: 每天一条汇总，按日期降序
+        """
+        pending = self._pending(start, end, host_id)
+        return await run_db(self._summarize_days, start, end, host_id, pending)
+
+    def _load_page(self, start: Optional[datetime.datetime], end: Optional[datetime.datetime],
+                   host_id: Optional[str], skip: int, limit: int,
+                   pending: Optional[List[Dict[str, Any]]] = None,
+                   projection: Optional[Dict[str, Any]] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        按时间倒序读取一页样本（同步，在数据库线程池中执行）
+        standard / timeseries 下按时间索引倒序跳过前 skip 条，只读取本页；其他布局读取范围内样本后切片
+        :return: (范围内样本总数, 本页样本)
+        """
+        if self.storage in ("standard", "timeseries"):
+            query = self._query(start, end, host_id)
+            collection = self.db["system_info"]
+            total = collection.count_documents(query) if query else collection.estimated_document_count()
+            docs = list(collection.find(query, projection).sort("timestamp", DESCENDING).skip(skip).limit(limit))
+            return total, docs
+        samples = self._load(start, end, host_id, projection, pending)
+        samples.reverse()
+        return len(samples), samples[skip:skip + limit]
+
+    async def find_systeminfo_page(self, page: int, page_size: int, start: Optional[datetime.datetime] = None,
+                                   end: Optional[datetime.datetime] = None,
+                                   host_id: Optional[str] = None,
+                                   fields: Optional[List[str]] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        分页获取系统信息，最新的样本在第一页
+        :param page: 页码，从 1 开始
+        :param page_size: 每页样本数
+        :param start: 起始时间（含），为空时不限
+        :param end: 结束时间（不含），为空时不限
+        :param host_id: 主机标识，为空时返回所有主机
+        :param fields: 只返回这些字段（见 PROJECTABLE_FIELDS），为空时返回完整样本
+        :return: (样本总数, 本页样本，按时间降序)
+        """
+        projection = sample_projection(fields)
+        pending = self._pending(start, end, host_id)
+        total, result = await run_db(self._load_page, start, end, host_id, (page - 1) * page_size, page_size,
+                                     pending, projection)
+        for item in result:
+            item["_id"] = str(item["_id"])
+            from_storage(item, TIMESTAMP_FIELDS)
+        return total, result
+
+    async def next_id(self) -> int:
+        """
+        分配一个新的系统信息 ID
+        """
+        if SYSTEM_INFO_STORAGE == "local":
+            return await run_db(local_metric_store.next_id)
+        return await sequence_crud.next_id("system_info")
+
+    @staticmethod
+    def new_sample_id(data: Dict[str, Any]) -> Any:
+        """
+        预先为样本分配 _id（写入时沿用），本地存储布局下为按 (主机, 时间) 生成的样本标识
+        :param data: 系统信息数据
+        """
+        if SYSTEM_INFO_STORAGE == "local":
+            return local_sample_id(data.get("host_id"), to_millis(to_datetime(data["timestamp"])))
+        return ObjectId()
+
+    async def save_system_info(self, data: Dict[str, Any], metrics: Optional[Dict[str, float]] = None) -> None:
         """
         保存系统信息到 MongoDB
+        后台回放任务运行时先追加到本地持久化队列，由回放任务批量写入（数据库不可用时不丢样本、不报错）；
+        否则后台写入任务运行时进入写后缓冲批量写入，都未运行时直接写入；同时累加到汇总层级
+        本地存储布局下只写入本地段文件，不访问数据库
+        没有 id 的样本在写入时分配：进入持久化队列的由回放任务写库前分配，入队不依赖数据库
         :param data: 系统信息数据
+        :param metrics: 已取出的汇总指标（见 rollup.extract_metrics），为空时从样本中取出
         """
-        self.db["system_info"].insert_one(data)
+        if SYSTEM_INFO_STORAGE == "local":
+            if "id" not in data:
+                data["id"] = await self.next_id()
+            doc = to_storage(data, TIMESTAMP_FIELDS)
+            doc.pop("_id", None)
+            data["_id"] = local_sample_id(doc.get("host_id"), to_millis(doc["timestamp"]))
+            await run_db(local_metric_store.add, doc)
+            return
+        system_info_rollup.add(data, metrics)
+        if SYSTEM_INFO_STORAGE == "bucket":
+            if "id" not in data:
+                data["id"] = await self.next_id()
+            data.setdefault("_id", ObjectId())
+            doc = to_storage(data, TIMESTAMP_FIELDS)
+            if system_info_bucket_writer.running:
+                system_info_bucketer.add(doc)
+            else:
+                await run_db(self.db[BUCKET_COLLECTION].insert_one, pack_bucket([doc]))
+            return
+        if SPOOL_ENABLED and system_info_replayer.running:
+            data.setdefault("_id", ObjectId())
+            try:
+                # 编码与写段文件在线程池中执行：轮转段、丢弃旧段和刷盘时持有的锁不会阻塞事件循环
+                await run_db(system_info_spool.append, to_storage(data, TIMESTAMP_FIELDS))
+                return
+            except Exception as e:
+                print(f"本地持久化队列写入失败，改用写后缓冲: {e}")
+        if "id" not in data:
+            data["id"] = await self.next_id()
+        if not system_info_writer.running:
+            doc = to_storage(data, TIMESTAMP_FIELDS)
+            await run_db(self.db["system_info"].insert_one, doc)
+            data["_id"] = doc["_id"]
+            return
+        # 预先分配 _id（上报的样本沿用 agent 生成的 _id），调用方可立即使用，重试写入时也据此去重；
+        # 入队的是浅拷贝，调用方之后修改 data["_id"] 不影响待写入的文档
+        data.setdefault("_id", ObjectId())
+        system_info_writer.put(to_storage(data, TIMESTAMP_FIELDS))
+
+    async def save_system_infos(self, samples: List[Dict[str, Any]]) -> None:
+        """
+        批量保存系统信息（远程采集接入）
+        整批一次预留连续 ID（进入持久化队列时由回放任务写库前分配），之后逐条进入与 save_system_info 相同的
+        写入路径（持久化队列 / 写后缓冲 / 列式桶），这些路径本身按批写入数据库；都未运行时整批 insert_many 一次写入
+        :param samples: 已校验的系统信息样本列表，写入后补充 id（进入持久化队列的除外）与 _id；
+            自带 _id 的样本（agent 入队时生成）沿用原 _id，重发的批次在写入时按 _id 去重
+        """
+        if not samples:
+            return
+        # 先为整批取出汇总指标（写入路径中唯一依赖样本内容、可能出错的计算），出错时还没有任何样本被写入，
+        # 整批失败后 agent 重试不会重复写入已落库的前半批
+        metrics = [extract_metrics(sample) for sample in samples]
+        spooled = SYSTEM_INFO_STORAGE in ("standard", "timeseries") and SPOOL_ENABLED and system_info_replayer.running
+        if SYSTEM_INFO_STORAGE == "local":
+            ids = await run_db(lambda: [local_metric_store.next_id() for _ in samples])
+        elif not spooled:
+            ids = await sequence_crud.reserve("system_info", len(samples))
+        else:
+            ids = []
+        for sample, sample_id in zip(samples, ids):
+            sample["id"] = sample_id
+        direct = SYSTEM_INFO_STORAGE in ("standard", "timeseries") and not system_info_writer.running and not spooled
+        if not direct:
+            for sample, sample_metrics in zip(samples, metrics):
+                await self.save_system_info(sample, sample_metrics)
+            return
+        docs = []
+        for sample, sample_metrics in zip(samples, metrics):
+            system_info_rollup.add(sample, sample_metrics)
+            sample.setdefault("_id", ObjectId())
+            docs.append(to_storage(sample, TIMESTAMP_FIELDS))
+        await run_db(self._insert_new, docs)
+
+    def _insert_new(self, docs: List[Dict[str, Any]]) -> None:
+        """批量写入，重复键说明样本已由之前重发的同一批写入，视为成功"""
+        try:
+            self.db["system_info"].insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            if any(err.get("code") != DUPLICATE_KEY_ERROR for err in e.details.get("writeErrors", [])):
+                raise
 
-    async def get_nearly_system_info(self):
+    async def get_nearly_system_info(self, host_id: Optional[str] = None):
         """
         获取近七天系统信息
+        :param host_id: 主机标识，为空时返回所有主机
         """
         res=[]
         date=[]
@@ -42,8 +548,8 @@ class SystemInfoCrud:
         for i in range(7):
             date.append((today - datetime.timedelta(days=i)).strftime("%Y-%m-%d"))
 
-        start_date = (today - datetime.timedelta(days=6)).strftime("%Y-%m-%d 00:00:00")
-        end_date = (today + datetime.timedelta(days=1)).strftime("%Y-%m-%d 00:00:00")
+        start_date = datetime.datetime.combine(today - datetime.timedelta(days=6), datetime.time())
+        end_date = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time())
         
         # 查询MongoDB中近7天的数据
         query = {
@@ -52,12 +558,15 @@ class SystemInfoCrud:
                 "$lt": end_date
             }
         }
+        if host_id is not None:
+            query["host_id"] = host_id
         
-        system_info_list = list(self.db["cause_report"].find(query))
+        system_info_list = await run_db(lambda: list(self.db["cause_report"].find(query)))
         
         # 将ObjectId转换为字符串
         for item in system_info_list:
             item["_id"] = str(item["_id"])
+            from_storage(item, REPORT_TIMESTAMP_FIELDS)
         
         # 按日期分组数据
         for date in date:
@@ -0,0 +1,189 @@
+import sys
+import os
+import time
+import asyncio
+from collections import deque
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+
+from typing import List, Optional, Dict, Any, Tuple
+from pymongo.database import Database
+from app.core.config import (
+    WRITE_BUFFER_MAX_SIZE, WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL, WRITE_BACKPRESSURE_POLICY,
+    BUCKET_MAX_SAMPLES, get_database
+)
+from app.core.dbexecutor import run_db
+from app.core.database import insert_documents, is_transient_error
+
+
+class WriteBehindBuffer:
+    """
+    写后缓冲：样本先进入内存中的有界队列，由后台任务按条数或时间间隔
+    以 insert_many(ordered=False) 批量写入 MongoDB
+    队列写满（MongoDB 变慢或不可用）时按背压策略处理：
+    - "drop_oldest"：丢弃最旧的样本
+    - "downsample"：将队列中的样本隔一取一，保留时间覆盖范围、降低分辨率
+    只有连接失败、超时等临时错误的文档放回队首重试；被数据库拒绝的文档（校验失败、文档过大等）丢弃并计入 rejected_count
+    """
+    def __init__(self, collection_name: str,
+                 max_size: int = WRITE_BUFFER_MAX_SIZE,
+                 batch_size: int = WRITE_BATCH_SIZE,
+                 flush_interval: float = WRITE_FLUSH_INTERVAL,
+                 policy: str = WRITE_BACKPRESSURE_POLICY,
+                 db: Optional[Database] = None):
+        self.db = db if db is not None else get_database()
+        self.collection_name = collection_name
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.queue = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        # 运行统计
+        self.flushed_count = 0
+        self.dropped_count = 0
+        self.rejected_count = 0
+        self.failed_flushes = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.last_error: Optional[str] = None
+        self.backpressure = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """启动后台刷写任务"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台刷写任务，并尽量把队列中剩余的样本写入数据库"""
+        if self._task is None:
+            return
+        # 通知后台任务在当前批次结束后退出，而不是取消：
+        # 刚 put 入队（已唤醒）时取消 wait_for 可能丢失取消信号，导致 stop 永久挂起
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+            self._stopping = False
+        while self.queue:
+            if not await self.flush():
+                break
+
+    def _apply_backpressure(self) -> None:
+        if not self.backpressure:
+            self.backpressure = True
+            print(f"{self.collection_name} 写入队列已满（{self.max_size}），启用背压策略: {self.policy}")
+        if self.policy == "downsample":
+            before = len(self.queue)
+            self.queue = deque(list(self.queue)[1::2])
+            self.dropped_count += before - len(self.queue)
+        else:
+            self.queue.popleft()
+            self.dropped_count += 1
+
+    def put(self, doc: Dict[str, Any]) -> None:
+        """
+        写入一条文档（非阻塞）
+        :param doc: 待写入的文档，应已带有 _id，重试时据此去重
+        """
+        if len(self.queue) >= self.max_size:
+            self._apply_backpressure()
+        self.queue.append(doc)
+        if len(self.queue) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _insert(self, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        批量写入，返回 (需要重试的文档, 被拒绝的文档)，见 insert_documents
+        重复键错误说明文档已在之前的重试中写入，视为成功
+        """
+        return insert_documents(self.db[self.collection_name], batch)
+
+    async def flush(self) -> bool:
+        """
+        写出一批文档
+        :return: 是否写入成功
+        """
+        if not self.queue:
+            return True
+        batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+        start = time.perf_counter()
+        try:
+            retry, rejected = await run_db(self._insert, batch)
+            self.last_error = None
+        except Exception as e:
+            # 整批失败：连接失败、超时等临时错误整批重试，其余错误重试也不会成功，整批丢弃
+            retry, rejected = (batch, []) if is_transient_error(e) else ([], batch)
+            self.last_error = str(e)
+        latency = time.perf_counter() - start
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.flushed_count += len(batch) - len(retry) - len(rejected)
+        if rejected:
+            self.rejected_count += len(rejected)
+            print(f"{self.collection_name} 有 {len(rejected)} 条文档被拒绝写入，已丢弃: {self.last_error or '逐条写入错误'}")
+        if retry:
+            # 写入失败的文档放回队首，保持时间顺序，等待下次重试
+            self.failed_flushes += 1
+            self.queue.extendleft(reversed(retry))
+            while len(self.queue) > self.max_size:
+                self._apply_backpressure()
+            return False
+        if self.backpressure and len(self.queue) < self.max_size // 2:
+            self.backpressure = False
+            print(f"{self.collection_name} 写入队列已恢复")
+        return True
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            while self.queue:
+                if not await self.flush():
+                    # 写入失败，等待下一个刷写周期再重试
+                    break
+                if len(self.queue) < self.batch_size:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        """写入队列运行状态"""
+        return {
+            "running": self.running,
+            "collection": self.collection_name,
+            "queue_depth": len(self.queue),
+            "max_size": self.max_size,
+            "policy": self.policy,
+            "backpressure": self.backpressure,
+            "flushed_count": self.flushed_count,
+            "dropped_count": self.dropped_count,
+            "rejected_count": self.rejected_count,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_latency_ms": round(self.last_flush_latency * 1000, 3),
+            "max_flush_latency_ms": round(self.max_flush_latency * 1000, 3),
+            "last_error": self.last_error
+        }
+
+
+system_info_writer = WriteBehindBuffer("system_info")
+# 列式桶布局：每个桶含多条样本，队列上限与批大小按桶容量折算
+system_info_bucket_writer = WriteBehindBuffer(
+    "system_info_buckets",
+    max_size=max(1, WRITE_BUFFER_MAX_SIZE // BUCKET_MAX_SAMPLES),
+    batch_size=max(1, WRITE_BATCH_SIZE // BUCKET_MAX_SAMPLES)
+)
@@ -0,0 +1,220 @@
+import sys
+import os
+import datetime
+import functools
+from typing import List, Optional, Dict, Any, Tuple
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+from bson import ObjectId
+from app.core.config import BUCKET_SPAN_SECONDS, BUCKET_MAX_SAMPLES
+from app.crud.WriteBuffer import system_info_bucket_writer
+from app.dataoperate.rollup import bucket_start
+
+BUCKET_COLLECTION = system_info_bucket_writer.collection_name
+
+# 字段路径：各层键名以 "/" 连接，列表下标记为 "[i]"，列表长度记在 "<列表路径>/#"
+_SEP = "/"
+_LENGTH = "#"
+_MISSING = object()
+
+
+def flatten(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把嵌套文档展开为 {字段路径: 标量值}
+    例如 {"cpu_info": {"cpu_percent": 3.2}, "disk_info": [{"device": "/dev/sda1"}]} 展开为
+    {"cpu_info/cpu_percent": 3.2, "disk_info/#": 1, "disk_info/[0]/device": "/dev/sda1"}
+    """
+    out: Dict[str, Any] = {}
+    _flatten(doc, "", out)
+    return out
+
+
+def _flatten(value: Any, prefix: str, out: Dict[str, Any]) -> None:
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            _flatten(item, f"{prefix}{_SEP}{key}" if prefix else key, out)
+    elif isinstance(value, list) and value:
+        out[f"{prefix}{_SEP}{_LENGTH}"] = len(value)
+        for i, item in enumerate(value):
+            _flatten(item, f"{prefix}{_SEP}[{i}]", out)
+    else:
+        out[prefix] = value
+
+
+@functools.lru_cache(maxsize=8192)
+def _parse_path(path: str) -> Tuple[Tuple[Any, Any], ...]:
+    """
+    解析字段路径，结果缓存（同一批样本的路径集合基本相同）
+    :return: ((键或下标, 下一层容器类型), ...)；列表长度路径以 (_LENGTH, None) 结尾
+    """
+    segments = path.split(_SEP)
+    parsed = []
+    for i, segment in enumerate(segments):
+        if segment == _LENGTH:
+            parsed.append((_LENGTH, None))
+            break
+        key = int(segment[1:-1]) if segment.startswith("[") else segment
+        nxt = segments[i + 1] if i + 1 < len(segments) else None
+        child = None if nxt is None else (list if nxt == _LENGTH or nxt.startswith("[") else dict)
+        parsed.append((key, child))
+    return tuple(parsed)
+
+
+def unflatten(flat: Dict[str, Any]) -> Dict[str, Any]:
+    """flatten 的逆操作"""
+    root: Dict[str, Any] = {}
+    for path, value in flat.items():
+        node: Any = root
+        for key, child in _parse_path(path):
+            if key == _LENGTH:
+                node.extend([None] * (value - len(node)))
+                break
+            if isinstance(key, int):
+                if len(node) <= key:
+                    node.extend([None] * (key + 1 - len(node)))
+                if child is None:
+                    node[key] = value
+                elif node[key] is None:
+                    node[key] = child()
+            elif child is None:
+                node[key] = value
+            elif key not in node:
+                node[key] = child()
+            node = node[key] if child is not None else node
+    return root
+
+
+def _same(values: List[Any]) -> bool:
+    first = values[0]
+    return all(v is not _MISSING and type(v) is type(first) and v == first for v in values)
+
+
+def pack_bucket(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    把同一主机的一组样本打包为一个列式桶文档
+    - static：桶内所有样本取值相同的字段（主机静态属性、总内存、CPU 型号等），只存一次
+    - columns：其余字段按路径存为与样本一一对应的数组
+    - absent：部分样本缺失的字段及其缺失的样本下标
+    :param samples: 按时间升序的样本，timestamp 应已为 datetime
+    """
+    flats = [flatten(sample) for sample in samples]
+    paths: Dict[str, None] = {}
+    for flat in flats:
+        for path in flat:
+            paths.setdefault(path)
+    static: Dict[str, Any] = {}
+    columns: Dict[str, List[Any]] = {}
+    absent: Dict[str, List[int]] = {}
+    for path in paths:
+        values = [flat.get(path, _MISSING) for flat in flats]
+        if _same(values):
+            static[path] = values[0]
+            continue
+        missing = [i for i, v in enumerate(values) if v is _MISSING]
+        if missing:
+            absent[path] = missing
+        columns[path] = [None if v is _MISSING else v for v in values]
+    timestamps = [sample["timestamp"] for sample in samples]
+    doc = {
+        "_id": ObjectId(),
+        "host_id": samples[0].get("host_id"),
+        "start": min(timestamps),
+        "end": max(timestamps),
+        "count": len(samples),
+        "static": static,
+        "columns": columns
+    }
+    if absent:
+        doc["absent"] = absent
+    return doc
+
+
+def unpack_bucket(doc: Dict[str, Any], start: Optional[datetime.datetime] = None,
+                  end: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
+    """
+    把桶文档还原为样本列表，可按时间范围 [start, end) 过滤
+    """
+    static = doc.get("static", {})
+    columns = doc.get("columns", {})
+    absent = {path: set(indexes) for path, indexes in doc.get("absent", {}).items()}
+    timestamps = columns.get("timestamp") or [static.get("timestamp")] * doc["count"]
+    samples = []
+    for i in range(doc["count"]):
+        ts = timestamps[i]
+        if (start is not None and ts < start) or (end is not None and ts >= end):
+            continue
+        flat = dict(static)
+        for path, values in columns.items():
+            if path in absent and i in absent[path]:
+                continue
+            flat[path] = values[i]
+        samples.append(unflatten(flat))
+    return samples
+
+
+class SampleBucketer:
+    """
+    按主机把样本聚合为对齐到 BUCKET_SPAN_SECONDS 时间窗口的桶，
+    窗口结束或样本数达到 BUCKET_MAX_SAMPLES 时封桶，打包后交给写后缓冲批量写入
+    尚未封桶的样本保留在内存中，读取时与数据库中的桶合并
+    """
+    def __init__(self, writer, span: int = BUCKET_SPAN_SECONDS, max_samples: int = BUCKET_MAX_SAMPLES):
+        self.writer = writer
+        self.span = span
+        self.max_samples = max_samples
+        self._open: Dict[Any, tuple] = {}  # host_id -> (窗口起点, [样本])
+        self.sealed_count = 0
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        """
+        加入一条样本（非阻塞）
+        :param doc: timestamp 已转换为 datetime 的样本
+        """
+        host_id = doc.get("host_id")
+        window = bucket_start(doc["timestamp"], self.span)
+        current = self._open.get(host_id)
+        if current is not None and current[0] != window:
+            self.seal(host_id)
+            current = None
+        if current is None:
+            current = self._open[host_id] = (window, [])
+        current[1].append(doc)
+        if len(current[1]) >= self.max_samples:
+            self.seal(host_id)
+
+    def seal(self, host_id: Any) -> None:
+        """封桶并交给写后缓冲"""
+        current = self._open.pop(host_id, None)
+        if current and current[1]:
+            self.writer.put(pack_bucket(current[1]))
+            self.sealed_count += 1
+
+    def seal_all(self) -> None:
+        for host_id in list(self._open):
+            self.seal(host_id)
+
+    def open_samples(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                     host_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        尚未封桶的样本（浅拷贝），可按时间范围和主机过滤
+        """
+        samples = []
+        for host, (_, docs) in self._open.items():
+            if host_id is not None and host != host_id:
+                continue
+            for doc in docs:
+                ts = doc["timestamp"]
+                if (start is None or ts >= start) and (end is None or ts < end):
+                    samples.append(dict(doc))
+        return samples
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open_buckets": len(self._open),
+            "open_samples": sum(len(docs) for _, docs in self._open.values()),
+            "sealed_count": self.sealed_count
+        }
+
+
+system_info_bucketer = SampleBucketer(system_info_bucket_writer)
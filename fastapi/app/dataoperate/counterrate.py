@@ -0,0 +1,85 @@
+import time
+from typing import Optional, Dict, Any
+
+# 需要换算为每秒速率的累计计数器：(所在子文档路径, 字段名)
+COUNTER_FIELDS = [
+    (("cpu_info", "cpu_stats"), "ctx_switches"),
+    (("cpu_info", "cpu_stats"), "interrupts"),
+    (("cpu_info", "cpu_stats"), "soft_interrupts"),
+    (("cpu_info", "cpu_stats"), "syscalls"),
+    (("network_info",), "bytes_sent_kb"),
+    (("network_info",), "bytes_recv_kb"),
+    (("network_info",), "packets_sent"),
+    (("network_info",), "packets_recv"),
+]
+
+# disk_info 中每个磁盘 disk_io 下的累计计数器
+DISK_IO_FIELDS = ["read_count", "write_count", "read_bytes", "write_bytes"]
+
+RATE_SUFFIX = "_per_sec"
+
+
+class CounterRate:
+    """
+    累计计数器速率引擎：在内存中保留上一次的原始计数，
+    为每个累计字段在原字段旁输出 <字段>_per_sec 每秒速率
+    - 计数器回绕/重启（当前值小于上次值）时，视为从 0 重新计数
+    - 采样间隔不均匀时按真实经过时间计算速率
+    - 首个样本或字段新出现时速率为 None
+    """
+    def __init__(self):
+        self._prev: Dict[str, float] = {}
+        self._prev_time: Optional[float] = None
+
+    def reset(self) -> None:
+        """清空历史计数"""
+        self._prev = {}
+        self._prev_time = None
+
+    def _rate(self, key: str, value: float, elapsed: Optional[float]) -> Optional[float]:
+        prev = self._prev.get(key)
+        if prev is None or elapsed is None or elapsed <= 0:
+            return None
+        delta = value - prev
+        if delta < 0:
+            # 计数器被重置，重置后的增量即为当前值
+            delta = value
+        return delta / elapsed
+
+    def apply(self, metrics: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        为一次采样结果补充每秒速率字段（原地修改）
+        :param metrics: collect_data/get_detailed_system_metrics 的采样结果
+        :param now: 采样时刻（单调时钟秒数），默认取当前时间
+        :return: 补充速率后的采样结果
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._prev_time if self._prev_time is not None else None
+        current = {}
+
+        for path, field in COUNTER_FIELDS:
+            node = metrics
+            for key in path:
+                node = node.get(key) if isinstance(node, dict) else None
+            if not isinstance(node, dict) or node.get(field) is None:
+                continue
+            key = ".".join(path) + "." + field
+            value = node[field]
+            node[field + RATE_SUFFIX] = self._rate(key, value, elapsed)
+            current[key] = value
+
+        for disk in metrics.get("disk_info") or []:
+            disk_io = disk.get("disk_io")
+            if not disk_io:
+                continue
+            for field in DISK_IO_FIELDS:
+                if disk_io.get(field) is None:
+                    continue
+                key = f"disk_io.{disk.get('device')}.{field}"
+                value = disk_io[field]
+                disk_io[field + RATE_SUFFIX] = self._rate(key, value, elapsed)
+                current[key] = value
+
+        self._prev = current
+        self._prev_time = now
+        return metrics
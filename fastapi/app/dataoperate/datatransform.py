@@ -69,10 +69,12 @@ class DataTransform:
                 transformed[used_key].append(0)
                 transformed[percent_key].append(0)
         
+        # 进程槽位按内存占用降序排列，保证每个槽位含义稳定
+        processes = sorted(data["process_info"], key=lambda p: p["memory_percent"], reverse=True)
         for i in range(10):
             mem_key = f"process{i}_memory_percent"
-            if i < len(data["process_info"]):
-                transformed[mem_key].append(data["process_info"][i]["memory_percent"])
+            if i < len(processes):
+                transformed[mem_key].append(processes[i]["memory_percent"])
             else:
                 transformed[mem_key].append(0)
 
@@ -0,0 +1,65 @@
+import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回被选中点的下标（升序，首尾两点必选）
+    中间的点均分为 threshold - 2 个桶，每个桶选出与「上一个选中点」「下一个桶的均值点」构成三角形面积最大的点。
+    各桶的均值一次性用 np.add.reduceat 算出，桶内面积与 argmax 向量化计算；
+    只有「上一个选中点」依赖前一个桶的结果，按桶顺序循环（循环次数为 threshold，与原始点数无关）
+    :param x: 横坐标（单调递增）
+    :param y: 纵坐标，不能含 NaN
+    :param threshold: 目标点数，不小于原始点数或小于 3 时不降采样
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # 桶边界：第 i 个桶为 [edges[i], edges[i + 1])，覆盖下标 1 .. n - 2
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # 第 i 个桶的「下一个桶均值点」，最后一个桶取末尾点
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # 三角形面积的两倍（省略常数因子不影响 argmax）
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_series(times: Sequence[datetime.datetime], columns: Dict[str, List[Optional[float]]],
+                      points: int, decimals: Optional[int] = None) -> Dict[str, List[List[float]]]:
+    """
+    对按时间升序排列的多列指标分别做 LTTB 降采样，每列先去掉缺失值
+    :param times: 各行的时间（本地时间，naive datetime）
+    :param columns: {指标: 与 times 等长的取值列表，缺失为 None}
+    :param points: 每个指标的目标点数
+    :param decimals: 取值保留的小数位数，为空时不取整
+    :return: {指标: [[毫秒时间戳, 取值], ...]}，可直接作为 echarts 时间轴折线的 data
+    """
+    if not times:
+        return {field: [] for field in columns}
+    # naive datetime 按本地时区换算为时间戳，与前端 new Date(毫秒) 显示的时间一致
+    x = np.fromiter((t.timestamp() for t in times), dtype=np.float64, count=len(times))
+    series = {}
+    for field, values in columns.items():
+        y = np.array(values, dtype=np.float64)
+        index = np.flatnonzero(~np.isnan(y))
+        chosen = index[lttb(x[index], y[index], points)]
+        chosen_y = y[chosen] if decimals is None else np.round(y[chosen], decimals)
+        series[field] = [[int(ms), value] for ms, value in
+                         zip(np.round(x[chosen] * 1000).astype(np.int64).tolist(), chosen_y.tolist())]
+    return series
@@ -0,0 +1,185 @@
+import struct
+from typing import List
+
+# Gorilla 时间序列压缩（Facebook, VLDB 2015）：
+# - 时间戳：记录相邻间隔之差（delta-of-delta），固定周期采样时每点只需 1 位
+# - 浮点值：与前一个值按位异或，只存有效位；值不变时每点只需 1 位
+
+# delta-of-delta 的分段编码：(前缀, 前缀位数, 取值位数)，取值为 n 位补码，范围 [-2^(n-1), 2^(n-1))
+_DOD_RANGES = ((0b10, 2, 7), (0b110, 3, 9), (0b1110, 4, 12))
+_DOD_FALLBACK = (0b1111, 4, 64)
+
+
+class BitWriter:
+    """按位追加写入，满 8 位写出一个字节"""
+    def __init__(self):
+        self.buf = bytearray()
+        self._acc = 0
+        self._nbits = 0
+        self.bit_length = 0
+
+    def write(self, value: int, nbits: int) -> None:
+        if nbits == 0:
+            return
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._nbits += nbits
+        self.bit_length += nbits
+        while self._nbits >= 8:
+            self._nbits -= 8
+            self.buf.append((self._acc >> self._nbits) & 0xFF)
+        self._acc &= (1 << self._nbits) - 1
+
+    def getvalue(self) -> bytes:
+        """返回已写入的字节，末尾不足 8 位补 0"""
+        if self._nbits:
+            return bytes(self.buf) + bytes([(self._acc << (8 - self._nbits)) & 0xFF])
+        return bytes(self.buf)
+
+
+class BitReader:
+    """按位顺序读取"""
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.pos = offset
+        self._acc = 0
+        self._nbits = 0
+
+    def read(self, nbits: int) -> int:
+        if nbits == 0:
+            return 0
+        while self._nbits < nbits:
+            self._acc = (self._acc << 8) | self.data[self.pos]
+            self.pos += 1
+            self._nbits += 8
+        self._nbits -= nbits
+        value = self._acc >> self._nbits
+        self._acc &= (1 << self._nbits) - 1
+        return value
+
+
+def _signed(value: int, nbits: int) -> int:
+    return value - (1 << nbits) if value >= 1 << (nbits - 1) else value
+
+
+def encode_timestamps(timestamps: List[int]) -> bytes:
+    """
+    编码一组递增的整数时间戳（毫秒）
+    首个时间戳存 64 位，第二个存与首个的间隔，之后存间隔之差
+    """
+    writer = BitWriter()
+    prev, prev_delta = 0, 0
+    for i, ts in enumerate(timestamps):
+        if i == 0:
+            writer.write(ts, 64)
+        elif i == 1:
+            prev_delta = ts - prev
+            writer.write(prev_delta, 64)
+        else:
+            delta = ts - prev
+            dod = delta - prev_delta
+            prev_delta = delta
+            if dod == 0:
+                writer.write(0, 1)
+            else:
+                for prefix, prefix_bits, value_bits in _DOD_RANGES:
+                    if -(1 << (value_bits - 1)) <= dod < 1 << (value_bits - 1):
+                        break
+                else:
+                    prefix, prefix_bits, value_bits = _DOD_FALLBACK
+                writer.write(prefix, prefix_bits)
+                writer.write(dod, value_bits)
+        prev = ts
+    return writer.getvalue()
+
+
+def decode_timestamps(data: bytes, count: int) -> List[int]:
+    """encode_timestamps 的逆操作"""
+    reader = BitReader(data)
+    out: List[int] = []
+    prev, prev_delta = 0, 0
+    for i in range(count):
+        if i == 0:
+            ts = _signed(reader.read(64), 64)
+        elif i == 1:
+            prev_delta = _signed(reader.read(64), 64)
+            ts = prev + prev_delta
+        else:
+            if reader.read(1) == 0:
+                dod = 0
+            else:
+                # 前缀中 1 的个数决定取值位数："10"、"110"、"1110"、"1111"
+                ones = 1
+                while ones < 4 and reader.read(1) == 1:
+                    ones += 1
+                value_bits = (_DOD_RANGES + (_DOD_FALLBACK,))[ones - 1][2]
+                dod = _signed(reader.read(value_bits), value_bits)
+            prev_delta += dod
+            ts = prev + prev_delta
+        out.append(ts)
+        prev = ts
+    return out
+
+
+def _float_bits(value: float) -> int:
+    return struct.unpack(">Q", struct.pack(">d", value))[0]
+
+
+def _bits_float(bits: int) -> float:
+    return struct.unpack(">d", struct.pack(">Q", bits))[0]
+
+
+def encode_floats(values: List[float]) -> bytes:
+    """
+    按 Gorilla XOR 方案编码一组浮点数
+    - 异或结果为 0：写 "0"
+    - 有效位落在上一个值的前导 / 尾随零窗口内：写 "10" + 有效位
+    - 否则写 "11" + 5 位前导零个数 + 6 位有效位长度 + 有效位
+    """
+    writer = BitWriter()
+    prev = 0
+    prev_leading, prev_trailing = -1, -1
+    for i, value in enumerate(values):
+        bits = _float_bits(value)
+        if i == 0:
+            writer.write(bits, 64)
+            prev = bits
+            continue
+        xor = bits ^ prev
+        prev = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        if prev_leading >= 0 and leading >= prev_leading and trailing >= prev_trailing:
+            writer.write(0b10, 2)
+            writer.write(xor >> prev_trailing, 64 - prev_leading - prev_trailing)
+        else:
+            meaningful = 64 - leading - trailing
+            writer.write(0b11, 2)
+            writer.write(leading, 5)
+            # 有效位长度为 64 时记为 0
+            writer.write(meaningful & 0x3F, 6)
+            writer.write(xor >> trailing, meaningful)
+            prev_leading, prev_trailing = leading, trailing
+    return writer.getvalue()
+
+
+def decode_floats(data: bytes, count: int) -> List[float]:
+    """encode_floats 的逆操作"""
+    reader = BitReader(data)
+    out: List[float] = []
+    prev = 0
+    leading, trailing = 0, 0
+    for i in range(count):
+        if i == 0:
+            prev = reader.read(64)
+        elif reader.read(1) == 1:
+            if reader.read(1) == 1:
+                leading = reader.read(5)
+                meaningful = reader.read(6) or 64
+                trailing = 64 - leading - meaningful
+            prev ^= reader.read(64 - leading - trailing) << trailing
+        out.append(_bits_float(prev))
+    return out
+
@@ -0,0 +1,159 @@
+import sys
+import os
+import time
+import psutil
+import platform
+from typing import List, Dict, Any, Tuple
+
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.config import COLLECTOR_BACKEND, PROCESS_TOP_K, HOST_ID
+from app.dataoperate.counterrate import CounterRate
+from app.dataoperate.procreader import ProcReader
+from app.dataoperate.processtable import ProcessTable
+
+
+class HostMetrics:
+    """
+    本机指标采集（不依赖数据库）：服务端的 DataCollect 与独立采集 agent 共用
+    """
+    def __init__(self, backend: str = COLLECTOR_BACKEND):
+        # 累计计数器速率引擎，保留上一次采样的原始计数
+        self.counter_rate = CounterRate()
+        # 常驻进程表，跨采样保留进程句柄，使进程 CPU 占用为真实增量
+        self.process_table = ProcessTable()
+        # /proc 单次读取后端，仅 Linux 可用，其他平台回退到 psutil
+        self.proc_reader = None
+        if backend == "proc" and sys.platform.startswith("linux"):
+            self.proc_reader = ProcReader()
+        # 静态主机属性只获取一次
+        try:
+            self.cpu_model = platform.processor() or "Unknown"
+        except Exception:
+            self.cpu_model = "Unknown"
+        self.cpu_count = psutil.cpu_count(logical=False)
+        self.logical_cpu_count = psutil.cpu_count(logical=True)
+        # 预热 CPU 利用率计数，之后每次调用返回距上次调用期间的利用率
+        psutil.cpu_percent(interval=None)
+        if self.proc_reader:
+            self.proc_reader.read()
+        self.process_table.refresh()
+
+    def read_psutil(self) -> Tuple[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        通过 psutil 读取 CPU、内存、磁盘、网络信息
+        :return: (cpu_info, memory_info, disk_info, network_info)
+        """
+        # CPU 信息（添加错误处理）
+        try:
+            cpu_freq = psutil.cpu_freq()
+            cpu_freq_current = cpu_freq.current if cpu_freq else None
+        except Exception as e:
+            print(f"获取 CPU 频率失败: {e}")
+            cpu_freq_current = None
+
+        # CPU 信息
+        cpu_stats = psutil.cpu_stats()
+        cpu_info = {
+            "cpu_count": self.cpu_count,
+            "logical_cpu_count": self.logical_cpu_count,
+            "cpu_percent": psutil.cpu_percent(interval=None),  # 距上次采样期间的利用率，不再阻塞等待
+            "cpu_freq": cpu_freq_current,
+            "cpu_model": self.cpu_model,
+            "cpu_stats": {
+                "ctx_switches": cpu_stats.ctx_switches,
+                "interrupts": cpu_stats.interrupts,
+                "soft_interrupts": cpu_stats.soft_interrupts,
+                "syscalls": cpu_stats.syscalls
+            }
+        }
+        # 内存信息
+        mem = psutil.virtual_memory()
+        swap_mem = psutil.swap_memory()
+        memory_info = {
+            "total_memory_gb": mem.total / (1024 ** 3),
+            "available_memory_gb": mem.available / (1024 ** 3),
+            "used_memory_gb": mem.used / (1024 ** 3),
+            "memory_percent": mem.percent,
+            "active_memory_gb": getattr(mem, 'active', 0) / (1024 ** 3),
+            "inactive_memory_gb": getattr(mem, 'inactive', 0) / (1024 ** 3),
+            "buffers_memory_gb": getattr(mem, 'buffers', 0) / (1024 ** 3),
+            "cached_memory_gb": getattr(mem, 'cached', 0) / (1024 ** 3),
+            "swap_memory_info":{
+                "total_smemory_gb":getattr(swap_mem, 'total', 0) / (1024 ** 3),
+                "used_smemory_gb":getattr(swap_mem, 'used', 0) / (1024 ** 3),
+                "free_smemory_gb":getattr(swap_mem, 'free', 0) / (1024 ** 3),
+                "smemory_percent": swap_mem.percent
+        }
+        }
+
+        # 磁盘信息（增加错误处理）
+        disk_info = []
+        partitions = psutil.disk_partitions()
+        try:
+            disk_io_counters = psutil.disk_io_counters(perdisk=True) or {}
+        except Exception:
+            disk_io_counters = {}
+        for part in partitions:
+            try:
+                if not part.mountpoint.startswith(('/proc', '/sys', '/dev')):  # 过滤虚拟文件系统
+                    disk_usage = psutil.disk_usage(part.mountpoint)
+                    disk = {
+                        "device": part.device,
+                        "mountpoint": part.mountpoint,
+                        "total_disk_gb": disk_usage.total / (1024 ** 3),
+                        "used_disk_gb": disk_usage.used / (1024 ** 3),
+                        "disk_percent": disk_usage.percent,
+                    }
+                    disk_io = disk_io_counters.get(part.device.split('/')[-1])
+                    if disk_io:
+                        disk["disk_io"] = {
+                            "read_count": disk_io.read_count,
+                            "write_count": disk_io.write_count,
+                            "read_bytes": disk_io.read_bytes,
+                            "write_bytes": disk_io.write_bytes
+                        }
+                    disk_info.append(disk)
+            except (PermissionError, OSError) as e:
+                print(f"获取磁盘 {part.mountpoint} 信息失败: {e}")
+                continue
+
+        # 网络信息
+        net_io_counters = psutil.net_io_counters()
+        network_info = {
+            "bytes_sent_kb": net_io_counters.bytes_sent / 1024,
+            "bytes_recv_kb": net_io_counters.bytes_recv / 1024,
+            "packets_sent": net_io_counters.packets_sent,
+            "packets_recv": net_io_counters.packets_recv
+        }
+
+        return cpu_info, memory_info, disk_info, network_info
+
+    def sample(self) -> Dict[str, Any]:
+        """
+        采集一次系统详细指标，包括 CPU、内存、磁盘、网络和进程信息
+        该方法为同步调用且不访问数据库，由后台采集任务放到线程中执行
+        """
+        sample_time = time.monotonic()
+        if self.proc_reader:
+            cpu_info, memory_info, disk_info, network_info = self.proc_reader.read()
+        else:
+            cpu_info, memory_info, disk_info, network_info = self.read_psutil()
+
+        # 进程信息：按 CPU、内存各取 Top-K，其余进程汇总为一项，文档大小不随进程数增长
+        process_info, process_summary = self.process_table.top(PROCESS_TOP_K)
+        # 整合所有数据
+        metrics = {
+            "anomaly_id": 0,
+            "host_id": HOST_ID,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+            "cpu_info": cpu_info,
+            "memory_info": memory_info,
+            "disk_info": disk_info,
+            "network_info": network_info,
+            "process_info": process_info,
+            "process_summary": process_summary
+        }
+        # 为累计计数器补充每秒速率，下游无需再对相邻文档做差
+        return self.counter_rate.apply(metrics, sample_time)
@@ -0,0 +1,92 @@
+import sys
+import os
+import json
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.config import LIVE_HEARTBEAT_INTERVAL, LIVE_STREAM_MAX_SECONDS, LIVE_RETRY_MS
+
+
+class LiveChannel:
+    """
+    实时样本推送（SSE）：后台采集每产生一个样本，只序列化一次为 SSE 帧，所有订阅者共享同一份字节串
+    - 发布只替换最新帧并唤醒等待中的订阅者（设置当前事件后换成新事件），不为每个客户端序列化或排队
+    - 订阅者醒来后取最新帧；发送慢的客户端会跳过中间样本直接拿到最新样本，服务端不会为它堆积数据
+    - 单个连接最长保持 LIVE_STREAM_MAX_SECONDS，到期后由浏览器 EventSource 自动重连，
+      避免长连接使服务停机时一直等待
+    """
+    def __init__(self):
+        self.seq = 0
+        self.frame: Optional[bytes] = None
+        self._event: Optional[asyncio.Event] = None
+        self.subscribers = 0
+        self.published = 0
+        self.serialize_errors = 0
+
+    def _current_event(self) -> asyncio.Event:
+        # 在事件循环中首次使用时创建，避免在导入时绑定到其他事件循环
+        if self._event is None:
+            self._event = asyncio.Event()
+        return self._event
+
+    def publish(self, sample: Dict[str, Any]) -> None:
+        """
+        发布一个新样本（在事件循环线程中调用）
+        :param sample: 采集结果
+        """
+        try:
+            data = json.dumps(sample, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            self.serialize_errors += 1
+            return
+        self.seq += 1
+        self.frame = f"id: {self.seq}\nevent: sample\ndata: {data}\n\n".encode()
+        self.published += 1
+        event, self._event = self._event, None
+        if event is not None:
+            event.set()
+
+    async def subscribe(self, max_seconds: float = LIVE_STREAM_MAX_SECONDS,
+                        heartbeat: float = LIVE_HEARTBEAT_INTERVAL) -> AsyncIterator[bytes]:
+        """
+        订阅实时样本，返回 SSE 分块：先推送当前最新样本，之后每有新样本推送一次；
+        空闲时每隔 heartbeat 秒发送注释行保持连接
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_seconds
+        self.subscribers += 1
+        try:
+            yield f"retry: {LIVE_RETRY_MS}\n\n".encode()
+            seq = self.seq
+            if self.frame is not None:
+                yield self.frame
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                if self.seq == seq:
+                    try:
+                        await asyncio.wait_for(self._current_event().wait(), min(heartbeat, remaining))
+                    except asyncio.TimeoutError:
+                        yield b": ping\n\n"
+                        continue
+                if self.seq != seq:
+                    seq = self.seq
+                    yield self.frame
+        finally:
+            self.subscribers -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """推送运行状态"""
+        return {
+            "subscribers": self.subscribers,
+            "published": self.published,
+            "serialize_errors": self.serialize_errors,
+            "last_seq": self.seq,
+            "frame_bytes": len(self.frame) if self.frame is not None else 0
+        }
+
+
+live_channel = LiveChannel()
@@ -0,0 +1,158 @@
+import heapq
+from typing import Iterator, List, Dict, Any, Tuple
+
+import psutil
+
+
+class _ProcessEntry:
+    """进程表中的一项：常驻的 psutil.Process 句柄及其静态属性"""
+    __slots__ = ("process", "create_time", "name", "username")
+
+    def __init__(self, process: psutil.Process, create_time: float, name: str, username: str):
+        self.process = process
+        self.create_time = create_time
+        self.name = name
+        self.username = username
+
+
+class ProcessTable:
+    """
+    常驻增量进程表：跨采样周期保留 psutil.Process 句柄，以 (pid, create_time) 标识进程
+    - 只对新出现/已退出的 pid 创建或回收句柄，名称、用户名等静态属性只查询一次
+    - 每个周期用 Process.is_running() 核对 pid 当前进程与句柄的启动时间是否一致，
+      不一致说明 pid 已被新进程复用，按新进程重建该项
+    - 同一句柄上连续调用 cpu_percent，得到的是两次采样之间真实的 CPU 占用
+    - 进程首次出现的那个周期 cpu_percent 记为 0.0，从下一周期开始为有效值
+    """
+    def __init__(self):
+        self._entries: Dict[int, _ProcessEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, pid: int) -> None:
+        try:
+            process = psutil.Process(pid)
+            with process.oneshot():
+                create_time = process.create_time()
+                name = process.name()
+                try:
+                    username = process.username()
+                except (psutil.AccessDenied, KeyError):
+                    username = None
+                process.cpu_percent(interval=None)  # 建立 CPU 时间基线
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return
+        self._entries[pid] = _ProcessEntry(process, create_time, name, username)
+
+    def _iter_usage(self) -> Iterator[Dict[str, Any]]:
+        """刷新进程表，逐个产出存活进程的资源占用"""
+        pids = set(psutil.pids())
+        known = self._entries.keys()
+        for pid in known - pids:
+            del self._entries[pid]
+        new_pids = pids - known
+        for pid in new_pids:
+            self._add(pid)
+
+        for pid, entry in list(self._entries.items()):
+            fresh = pid in new_pids
+            if not fresh and not entry.process.is_running():
+                # pid 已被新进程复用（或进程已退出）：句柄、名称、用户名与 CPU 基线都属于旧进程，按新出现的进程重建该项
+                del self._entries[pid]
+                self._add(pid)
+                entry = self._entries.get(pid)
+                if entry is None:
+                    continue
+                fresh = True
+            if not fresh:
+                try:
+                    with entry.process.oneshot():
+                        cpu_percent = entry.process.cpu_percent(interval=None)
+                        memory_percent = entry.process.memory_percent()
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    del self._entries[pid]
+                    continue
+            else:
+                cpu_percent = 0.0
+                try:
+                    memory_percent = entry.process.memory_percent()
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    del self._entries[pid]
+                    continue
+            yield {
+                "pid": pid,
+                "name": entry.name,
+                "username": entry.username,
+                "cpu_percent": cpu_percent,
+                "memory_percent": memory_percent
+            }
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """
+        刷新进程表并返回所有存活进程的资源占用
+        :return: [{"pid", "name", "username", "cpu_percent", "memory_percent"}, ...]
+        """
+        return list(self._iter_usage())
+
+    def top(self, k: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        刷新进程表，一次遍历中用容量为 k 的小顶堆分别选出 CPU、内存占用最高的进程
+        :param k: 每个维度保留的进程数
+        :return: (process_info, process_summary)
+            process_info 为两组 Top-K 的并集，按内存占用降序排列；
+            process_summary 记录进程总数、两组 Top-K 的 pid 以及其余进程的汇总占用
+        """
+        top_cpu: List[Tuple[float, int, Dict[str, Any]]] = []
+        top_mem: List[Tuple[float, int, Dict[str, Any]]] = []
+        count = 0
+        cpu_total = 0.0
+        mem_total = 0.0
+        for info in self._iter_usage():
+            count += 1
+            cpu_total += info["cpu_percent"]
+            mem_total += info["memory_percent"]
+            if k <= 0:
+                continue
+            # 堆顶是当前 Top-K 中最小的一项，新值更大时替换堆顶
+            cpu_item = (info["cpu_percent"], -info["pid"], info)
+            if len(top_cpu) < k:
+                heapq.heappush(top_cpu, cpu_item)
+            elif cpu_item[:2] > top_cpu[0][:2]:
+                heapq.heapreplace(top_cpu, cpu_item)
+            mem_item = (info["memory_percent"], -info["pid"], info)
+            if len(top_mem) < k:
+                heapq.heappush(top_mem, mem_item)
+            elif mem_item[:2] > top_mem[0][:2]:
+                heapq.heapreplace(top_mem, mem_item)
+
+        selected = {item[2]["pid"]: item[2] for item in top_cpu + top_mem}
+        process_info = sorted(selected.values(), key=lambda p: (-p["memory_percent"], p["pid"]))
+        process_summary = {
+            "total_count": count,
+            "top_cpu_pids": [item[2]["pid"] for item in sorted(top_cpu, reverse=True)],
+            "top_memory_pids": [item[2]["pid"] for item in sorted(top_mem, reverse=True)],
+            "rest": {
+                "count": count - len(selected),
+                "cpu_percent": max(cpu_total - sum(p["cpu_percent"] for p in process_info), 0.0),
+                "memory_percent": max(mem_total - sum(p["memory_percent"] for p in process_info), 0.0)
+            }
+        }
+        return process_info, process_summary
+
+    def keys(self) -> List[Tuple[int, float]]:
+        """当前进程表中所有进程的 (pid, create_time)"""
+        return [(pid, entry.create_time) for pid, entry in self._entries.items()]
+
+
+if __name__ == "__main__":
+    import time
+    table = ProcessTable()
+    table.refresh()
+    time.sleep(1)
+    start = time.perf_counter()
+    processes, summary = table.top(5)
+    print(f"进程数 {summary['total_count']}，刷新耗时 {(time.perf_counter() - start) * 1000:.2f} ms")
+    for p in processes:
+        print(p)
+    print(summary)
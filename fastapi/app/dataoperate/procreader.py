@@ -0,0 +1,273 @@
+import os
+import platform
+from typing import List, Optional, Dict, Any, Tuple
+
+import psutil
+
+GB = 1024 ** 3
+SECTOR_SIZE = 512  # /proc/diskstats 中扇区大小固定为 512 字节
+
+
+class _ProcFile:
+    """
+    常驻打开的 /proc 文件，每次读取都复用同一块缓冲区
+    /proc 下的文件在 seek(0) 后重新读取即可得到最新内容
+    """
+    def __init__(self, path: str, size: int = 16384):
+        self.path = path
+        self.buffer = bytearray(size)
+        self.file = open(path, "rb", buffering=0)
+
+    def read(self) -> bytes:
+        while True:
+            self.file.seek(0)
+            n = self.file.readinto(self.buffer)
+            if n < len(self.buffer):
+                return bytes(memoryview(self.buffer)[:n])
+            # 缓冲区被写满，说明文件可能更长，扩容后重读
+            self.buffer = bytearray(len(self.buffer) * 2)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _KeyedLines:
+    """
+    按行首关键字定位的 /proc 文件（/proc/stat、/proc/meminfo）
+    首次解析时记录每个关键字所在的行号，之后按行号直接取值；
+    行号失效（内核输出变化）时自动重新建立索引
+    """
+    def __init__(self, keys: List[bytes]):
+        self.keys = keys
+        self.offsets: Dict[bytes, int] = {}
+
+    def _build(self, lines: List[bytes]) -> None:
+        self.offsets = {}
+        for i, line in enumerate(lines):
+            key = line.split(None, 1)[0] if line else b""
+            if key in self.keys:
+                self.offsets[key] = i
+
+    def parse(self, data: bytes) -> Dict[bytes, List[bytes]]:
+        lines = data.split(b"\n")
+        for attempt in range(2):
+            if not self.offsets or attempt:
+                self._build(lines)
+            result = {}
+            for key, i in self.offsets.items():
+                fields = lines[i].split() if i < len(lines) else []
+                if not fields or fields[0] != key:
+                    break
+                result[key] = fields
+            else:
+                return result
+        return result
+
+
+def _unescape_mount(value: bytes) -> str:
+    """/proc/mounts 中空格等字符以 \\040 形式转义"""
+    if b"\\" in value:
+        value = value.decode("unicode_escape").encode("latin-1")
+    return value.decode("utf-8", "replace")
+
+
+class ProcReader:
+    """
+    基于 /proc 的单次读取采集后端（仅 Linux）
+    每个采样周期 /proc/stat、/proc/meminfo、/proc/diskstats、/proc/net/dev、/proc/mounts
+    各读取一次，输出与 psutil 采集路径一致的 cpu_info/memory_info/disk_info/network_info 结构
+    """
+    STAT_KEYS = [b"cpu", b"ctxt", b"intr", b"softirq"]
+    MEMINFO_KEYS = [b"MemTotal:", b"MemFree:", b"MemAvailable:", b"Buffers:", b"Cached:",
+                    b"SReclaimable:", b"Active:", b"Inactive:", b"SwapTotal:", b"SwapFree:"]
+
+    def __init__(self, proc_root: str = "/proc"):
+        self.stat = _ProcFile(os.path.join(proc_root, "stat"))
+        self.meminfo = _ProcFile(os.path.join(proc_root, "meminfo"))
+        self.diskstats = _ProcFile(os.path.join(proc_root, "diskstats"))
+        self.netdev = _ProcFile(os.path.join(proc_root, "net/dev"))
+        self.mounts = _ProcFile(os.path.join(proc_root, "mounts"))
+        self.stat_lines = _KeyedLines(self.STAT_KEYS)
+        self.meminfo_lines = _KeyedLines(self.MEMINFO_KEYS)
+
+        # 静态主机属性只在初始化时获取一次
+        try:
+            self.cpu_model = platform.processor() or "Unknown"
+        except Exception:
+            self.cpu_model = "Unknown"
+        self.cpu_count = psutil.cpu_count(logical=False)
+        self.logical_cpu_count = os.cpu_count()
+        self.physical_fstypes = self._read_physical_fstypes(os.path.join(proc_root, "filesystems"))
+
+        self._prev_cpu_times: Optional[Tuple[int, int]] = None
+        self._mounts_raw: Optional[bytes] = None
+        self._partitions: List[Tuple[str, str]] = []
+
+    @staticmethod
+    def _read_physical_fstypes(path: str) -> set:
+        """与 psutil.disk_partitions(all=False) 一致：只保留非 nodev 的文件系统类型"""
+        fstypes = {"zfs"}
+        try:
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.startswith(b"nodev"):
+                        fstypes.add(line.strip().decode())
+        except OSError:
+            pass
+        return fstypes
+
+    def close(self) -> None:
+        for f in (self.stat, self.meminfo, self.diskstats, self.netdev, self.mounts):
+            f.close()
+
+    def _cpu_info(self) -> Dict[str, Any]:
+        stat = self.stat_lines.parse(self.stat.read())
+        cpu = [int(v) for v in stat[b"cpu"][1:]]
+        # user nice system idle iowait irq softirq steal (guest 已计入 user/nice)
+        total = sum(cpu[:8])
+        idle = cpu[3] + (cpu[4] if len(cpu) > 4 else 0)
+        cpu_percent = 0.0
+        if self._prev_cpu_times is not None:
+            total_delta = total - self._prev_cpu_times[0]
+            busy_delta = (total - idle) - (self._prev_cpu_times[0] - self._prev_cpu_times[1])
+            if total_delta > 0:
+                cpu_percent = round(min(max(busy_delta / total_delta * 100, 0.0), 100.0), 1)
+        self._prev_cpu_times = (total, idle)
+
+        try:
+            cpu_freq = psutil.cpu_freq()
+            cpu_freq_current = cpu_freq.current if cpu_freq else None
+        except Exception:
+            cpu_freq_current = None
+
+        return {
+            "cpu_count": self.cpu_count,
+            "logical_cpu_count": self.logical_cpu_count,
+            "cpu_percent": cpu_percent,
+            "cpu_freq": cpu_freq_current,
+            "cpu_model": self.cpu_model,
+            "cpu_stats": {
+                "ctx_switches": int(stat[b"ctxt"][1]),
+                "interrupts": int(stat[b"intr"][1]),
+                "soft_interrupts": int(stat[b"softirq"][1]),
+                "syscalls": 0  # Linux 不提供系统调用计数，与 psutil 保持一致
+            }
+        }
+
+    def _memory_info(self) -> Dict[str, Any]:
+        mem = {k: int(v[1]) * 1024 for k, v in self.meminfo_lines.parse(self.meminfo.read()).items()}
+        total = mem.get(b"MemTotal:", 0)
+        free = mem.get(b"MemFree:", 0)
+        buffers = mem.get(b"Buffers:", 0)
+        cached = mem.get(b"Cached:", 0) + mem.get(b"SReclaimable:", 0)
+        available = mem.get(b"MemAvailable:", free + buffers + cached)
+        used = total - available  # 与 psutil 当前版本的 used 口径一致
+        swap_total = mem.get(b"SwapTotal:", 0)
+        swap_free = mem.get(b"SwapFree:", 0)
+        swap_used = swap_total - swap_free
+        return {
+            "total_memory_gb": total / GB,
+            "available_memory_gb": available / GB,
+            "used_memory_gb": used / GB,
+            "memory_percent": round((total - available) / total * 100, 1) if total else 0.0,
+            "active_memory_gb": mem.get(b"Active:", 0) / GB,
+            "inactive_memory_gb": mem.get(b"Inactive:", 0) / GB,
+            "buffers_memory_gb": buffers / GB,
+            "cached_memory_gb": cached / GB,
+            "swap_memory_info": {
+                "total_smemory_gb": swap_total / GB,
+                "used_smemory_gb": swap_used / GB,
+                "free_smemory_gb": swap_free / GB,
+                "smemory_percent": round(swap_used / swap_total * 100, 1) if swap_total else 0.0
+            }
+        }
+
+    def _read_partitions(self) -> List[Tuple[str, str]]:
+        """挂载表内容未变化时直接复用上次的解析结果"""
+        raw = self.mounts.read()
+        if raw != self._mounts_raw:
+            partitions = []
+            for line in raw.split(b"\n"):
+                fields = line.split()
+                if len(fields) < 3 or fields[0] == b"none":
+                    continue
+                if fields[2].decode() not in self.physical_fstypes:
+                    continue
+                mountpoint = _unescape_mount(fields[1])
+                if mountpoint.startswith(('/proc', '/sys', '/dev')):  # 过滤虚拟文件系统
+                    continue
+                partitions.append((_unescape_mount(fields[0]), mountpoint))
+            self._mounts_raw = raw
+            self._partitions = partitions
+        return self._partitions
+
+    def _disk_info(self) -> List[Dict[str, Any]]:
+        diskstats = {}
+        for line in self.diskstats.read().split(b"\n"):
+            fields = line.split()
+            if len(fields) >= 10:
+                # name reads merged sectors_read ms writes merged sectors_written
+                diskstats[fields[2].decode()] = fields
+
+        disk_info = []
+        for device, mountpoint in self._read_partitions():
+            try:
+                st = os.statvfs(mountpoint)
+            except OSError as e:
+                print(f"获取磁盘 {mountpoint} 信息失败: {e}")
+                continue
+            total = st.f_blocks * st.f_frsize
+            used = total - st.f_bfree * st.f_frsize
+            total_user = used + st.f_bavail * st.f_frsize
+            disk = {
+                "device": device,
+                "mountpoint": mountpoint,
+                "total_disk_gb": total / GB,
+                "used_disk_gb": used / GB,
+                "disk_percent": round(used / total_user * 100, 1) if total_user else 0.0,
+            }
+            fields = diskstats.get(device.split('/')[-1])
+            if fields is not None:
+                disk["disk_io"] = {
+                    "read_count": int(fields[3]),
+                    "write_count": int(fields[7]),
+                    "read_bytes": int(fields[5]) * SECTOR_SIZE,
+                    "write_bytes": int(fields[9]) * SECTOR_SIZE
+                }
+            disk_info.append(disk)
+        return disk_info
+
+    def _network_info(self) -> Dict[str, Any]:
+        bytes_recv = packets_recv = bytes_sent = packets_sent = 0
+        # 前两行为表头；"iface: rx_bytes rx_packets ... tx_bytes tx_packets ..."
+        for line in self.netdev.read().split(b"\n")[2:]:
+            _, sep, values = line.partition(b":")
+            if not sep:
+                continue
+            fields = values.split()
+            bytes_recv += int(fields[0])
+            packets_recv += int(fields[1])
+            bytes_sent += int(fields[8])
+            packets_sent += int(fields[9])
+        return {
+            "bytes_sent_kb": bytes_sent / 1024,
+            "bytes_recv_kb": bytes_recv / 1024,
+            "packets_sent": packets_sent,
+            "packets_recv": packets_recv
+        }
+
+    def read(self) -> Tuple[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        读取一次系统指标
+        :return: (cpu_info, memory_info, disk_info, network_info)
+        """
+        return self._cpu_info(), self._memory_info(), self._disk_info(), self._network_info()
+
+
+if __name__ == "__main__":
+    import time
+    reader = ProcReader()
+    reader.read()
+    time.sleep(0.5)
+    for part in reader.read():
+        print(part)
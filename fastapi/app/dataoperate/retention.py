@@ -0,0 +1,191 @@
+import sys
+import os
+import time
+import asyncio
+import datetime
+from typing import Optional, Dict, Any
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.config import (
+    HOST_ID, RETENTION_ENABLED, RETENTION_INTERVAL, RETENTION_BATCH_SIZE, RETENTION_BATCH_PAUSE,
+    RAW_RETENTION_DAYS, CAUSE_REPORT_RETENTION_DAYS, ROLLUP_1M_RETENTION_DAYS
+)
+from app.core.dbexecutor import run_db
+from app.crud.RetentionCrud import RetentionCrud
+from app.crud.RollupCrud import ROLLUP_TIERS
+from app.crud.SystemInfoCrud import SystemInfoCrud
+from app.dataoperate.rollup import bucket_start
+from app.dataoperate.bucketlayout import BUCKET_COLLECTION
+
+HOUR = datetime.timedelta(hours=1)
+
+
+class RetentionEngine:
+    """
+    数据保留与压缩：后台任务定期执行
+    - system_info：超过 RAW_RETENTION_DAYS 的原始样本，仅在对应主机、对应小时的 1h 汇总已存在时删除；
+      列式桶布局同时清理 system_info_buckets；时序集合布局由 expireAfterSeconds 自动过期，
+      本地存储布局按 LOCAL_RETENTION_DAYS 整段删除，均不在此处处理
+    - system_info_1m：超过 ROLLUP_1M_RETENTION_DAYS 的分钟级汇总（1h 汇总长期保留）
+    - cause_report：超过 CAUSE_REPORT_RETENTION_DAYS 的异常报告
+    - cause_report_by_timestamp：同一天的多版综合报告只保留最新一版（已生成解决方案的报告保留）
+    所有删除按 RETENTION_BATCH_SIZE 分批执行，批次之间暂停 RETENTION_BATCH_PAUSE 秒限速，
+    每批只占用数据库线程池中的一个线程，不影响前台请求
+    """
+    def __init__(self, interval: float = RETENTION_INTERVAL,
+                 batch_size: int = RETENTION_BATCH_SIZE,
+                 batch_pause: float = RETENTION_BATCH_PAUSE):
+        self.crud = RetentionCrud()
+        self.systeminfo_crud = SystemInfoCrud()
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self._task: Optional[asyncio.Task] = None
+        self.deleted: Dict[str, int] = {}
+        self.run_count = 0
+        self.last_run: Optional[str] = None
+        self.last_duration = 0.0
+        self.last_error: Optional[str] = None
+        self.skipped_without_rollup = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """启动后台保留任务"""
+        if self.running or not RETENTION_ENABLED:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台保留任务，正在进行的批次在当前批结束后中止"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _delete_all(self, collection_name: str, query: Dict[str, Any]) -> int:
+        """分批删除满足条件的全部文档，批次之间限速"""
+        total = 0
+        while True:
+            deleted = await run_db(self.crud.delete_batch, collection_name, query, self.batch_size)
+            total += deleted
+            if deleted < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause)
+        if total:
+            self.deleted[collection_name] = self.deleted.get(collection_name, 0) + total
+        return total
+
+    async def expire_raw(self, now: datetime.datetime) -> int:
+        """
+        删除已过保留期且已有 1h 汇总的原始样本
+        汇总缺失的小时保留原始数据，可运行 rollup.py 重建汇总后再清理
+        """
+        if RAW_RETENTION_DAYS is None:
+            return 0
+        storage = await run_db(self.systeminfo_crud.detect_storage)
+        if storage in ("timeseries", "local"):
+            return 0
+        cutoff = bucket_start(now - datetime.timedelta(days=RAW_RETENTION_DAYS), int(HOUR.total_seconds()))
+        candidates = [await run_db(self.crud.oldest_timestamp, "system_info")]
+        if storage == "bucket":
+            candidates.append(await run_db(self.crud.oldest_timestamp, BUCKET_COLLECTION, "start"))
+        candidates = [ts for ts in candidates if ts is not None]
+        oldest = min(candidates) if candidates else None
+        if oldest is None or oldest >= cutoff:
+            return 0
+        start = bucket_start(oldest, int(HOUR.total_seconds()))
+        rolled_up = await run_db(self.crud.rollup_buckets, "1h", start, cutoff)
+        total = 0
+        for host_id, hour in sorted(rolled_up, key=lambda b: b[1]):
+            # 早期样本没有 host_id 字段，汇总时记在本机名下
+            host_query = {"$in": [host_id, None]} if host_id == HOST_ID else host_id
+            total += await self._delete_all("system_info", {
+                "host_id": host_query,
+                "timestamp": {"$gte": hour, "$lt": hour + HOUR}
+            })
+            if storage == "bucket":
+                # 桶窗口对齐到 BUCKET_SPAN_SECONDS，不会跨越小时边界
+                total += await self._delete_all(BUCKET_COLLECTION, {
+                    "host_id": host_id,
+                    "start": {"$gte": hour, "$lt": hour + HOUR}
+                })
+        hours = int((cutoff - start) / HOUR)
+        self.skipped_without_rollup = len({hour for _, hour in rolled_up}) < hours
+        return total
+
+    async def expire_by_time(self, collection_name: str, field: str, days: Optional[int],
+                             now: datetime.datetime) -> int:
+        """删除某个时间字段早于保留期的文档"""
+        if days is None:
+            return 0
+        cutoff = now - datetime.timedelta(days=days)
+        return await self._delete_all(collection_name, {field: {"$lt": cutoff}})
+
+    async def compact_summaries(self) -> int:
+        """同一天的综合报告只保留最新一版"""
+        keep = await run_db(self.crud.referenced_report_ids)
+        total = 0
+        while True:
+            ids = await run_db(self.crud.superseded_summary_ids, keep, self.batch_size)
+            deleted = await run_db(self.crud.delete_by_ids, "cause_report_by_timestamp", ids)
+            total += deleted
+            if len(ids) < self.batch_size or not deleted:
+                break
+            await asyncio.sleep(self.batch_pause)
+        if total:
+            self.deleted["cause_report_by_timestamp"] = self.deleted.get("cause_report_by_timestamp", 0) + total
+        return total
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        执行一轮保留与压缩
+        :return: 本轮各集合删除条数
+        """
+        start = time.perf_counter()
+        now = datetime.datetime.now()
+        result = {
+            "system_info": await self.expire_raw(now),
+            ROLLUP_TIERS["1m"][0]: await self.expire_by_time(ROLLUP_TIERS["1m"][0], "bucket", ROLLUP_1M_RETENTION_DAYS, now),
+            "cause_report": await self.expire_by_time("cause_report", "timestamp", CAUSE_REPORT_RETENTION_DAYS, now),
+            "cause_report_by_timestamp": await self.compact_summaries()
+        }
+        self.run_count += 1
+        self.last_run = now.strftime("%Y-%m-%d %H:%M:%S")
+        self.last_duration = time.perf_counter() - start
+        return result
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                result = await self.run_once()
+                self.last_error = None
+                if any(result.values()):
+                    print(f"数据保留任务完成: {result}")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"数据保留任务失败: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """保留任务运行状态"""
+        return {
+            "enabled": RETENTION_ENABLED,
+            "running": self.running,
+            "run_count": self.run_count,
+            "last_run": self.last_run,
+            "last_duration_ms": round(self.last_duration * 1000, 3),
+            "deleted": dict(self.deleted),
+            "skipped_without_rollup": self.skipped_without_rollup,
+            "last_error": self.last_error
+        }
+
+
+retention_engine = RetentionEngine()
@@ -0,0 +1,287 @@
+import sys
+import os
+import asyncio
+import datetime
+from typing import List, Optional, Dict, Any, Tuple
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.config import HOST_ID, ROLLUP_FLUSH_INTERVAL, ROLLUP_TARGET_POINTS
+from app.core.dbexecutor import run_db
+from app.core.timeutil import to_datetime
+from app.crud.RollupCrud import RollupCrud, ROLLUP_TIERS
+
+# 参与汇总的数值字段：汇总字段名 -> 样本中的路径
+ROLLUP_FIELDS = {
+    "cpu_percent": ("cpu_info", "cpu_percent"),
+    "memory_percent": ("memory_info", "memory_percent"),
+    "used_memory_gb": ("memory_info", "used_memory_gb"),
+    "swap_percent": ("memory_info", "swap_memory_info", "smemory_percent"),
+    "ctx_switches_per_sec": ("cpu_info", "cpu_stats", "ctx_switches_per_sec"),
+    "interrupts_per_sec": ("cpu_info", "cpu_stats", "interrupts_per_sec"),
+    "bytes_sent_kb_per_sec": ("network_info", "bytes_sent_kb_per_sec"),
+    "bytes_recv_kb_per_sec": ("network_info", "bytes_recv_kb_per_sec"),
+    "packets_sent_per_sec": ("network_info", "packets_sent_per_sec"),
+    "packets_recv_per_sec": ("network_info", "packets_recv_per_sec"),
+    "process_count": ("process_summary", "total_count"),
+    "risk_score": ("risk_score",),
+}
+
+# 可查询的汇总字段（含由 disk_info 推导的最高磁盘使用率）
+ROLLUP_METRIC_NAMES = list(ROLLUP_FIELDS) + ["disk_percent_max"]
+
+# 查询可用的层级，由粗到细：(层级名, 桶宽度秒数)；"raw" 为原始秒级样本
+QUERY_TIERS = [(tier, seconds) for tier, (_, seconds) in sorted(ROLLUP_TIERS.items(), key=lambda t: -t[1][1])]
+QUERY_TIERS.append(("raw", 1))
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def extract_metrics(sample: Dict[str, Any]) -> Dict[str, float]:
+    """
+    从样本中取出参与汇总的数值字段，缺失或非数值的字段跳过
+    磁盘取所有分区中最高的使用率
+    """
+    metrics = {}
+    for field, path in ROLLUP_FIELDS.items():
+        value = sample
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+            if value is None:
+                break
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[field] = float(value)
+    disk_percents = [d.get("disk_percent") for d in sample.get("disk_info") or []
+                     if isinstance(d.get("disk_percent"), (int, float))]
+    if disk_percents:
+        metrics["disk_percent_max"] = float(max(disk_percents))
+    return metrics
+
+
+def bucket_start(ts: datetime.datetime, seconds: int) -> datetime.datetime:
+    """时间向下取整到桶边界"""
+    offset = int((ts - _EPOCH).total_seconds()) % seconds
+    return (ts - datetime.timedelta(seconds=offset)).replace(microsecond=0)
+
+
+def choose_tier(start: datetime.datetime, end: datetime.datetime,
+                resolution: Optional[float] = None) -> Tuple[str, int]:
+    """
+    选择满足分辨率要求的最粗层级
+    :param resolution: 期望的点间隔（秒），为空时按时间跨度 / ROLLUP_TARGET_POINTS 计算
+    :return: (层级名, 桶宽度秒数)
+    """
+    if resolution is None:
+        resolution = (end - start).total_seconds() / ROLLUP_TARGET_POINTS
+    for tier, seconds in QUERY_TIERS:
+        if seconds <= resolution:
+            return tier, seconds
+    return QUERY_TIERS[-1]
+
+
+class RollupAccumulator:
+    """
+    单个层级的内存累加器：{(host_id, bucket): {"samples": n, "fields": {字段: [min, max, sum, count, last]}}}
+    只保存尚未写入数据库的增量，写入后清空
+    """
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.pending: Dict[tuple, Dict[str, Any]] = {}
+
+    def add(self, host_id: str, ts: datetime.datetime, metrics: Dict[str, float]) -> None:
+        key = (host_id, bucket_start(ts, self.seconds))
+        delta = self.pending.get(key)
+        if delta is None:
+            delta = self.pending[key] = {"samples": 0, "fields": {}}
+        delta["samples"] += 1
+        fields = delta["fields"]
+        for field, value in metrics.items():
+            stats = fields.get(field)
+            if stats is None:
+                fields[field] = [value, value, value, 1, value]
+            else:
+                if value < stats[0]:
+                    stats[0] = value
+                if value > stats[1]:
+                    stats[1] = value
+                stats[2] += value
+                stats[3] += 1
+                stats[4] = value
+
+    def take(self) -> Dict[tuple, Dict[str, Any]]:
+        """取出全部增量并清空"""
+        pending, self.pending = self.pending, {}
+        return pending
+
+    def restore(self, pending: Dict[tuple, Dict[str, Any]]) -> None:
+        """写入失败时把取出的增量合并回来，等待下次重试"""
+        for key, old in pending.items():
+            new = self.pending.get(key)
+            if new is None:
+                self.pending[key] = old
+                continue
+            new["samples"] += old["samples"]
+            for field, stats in old["fields"].items():
+                cur = new["fields"].get(field)
+                if cur is None:
+                    new["fields"][field] = stats
+                else:
+                    # 新增量在时间上更晚，last 保留新值
+                    new["fields"][field] = [min(cur[0], stats[0]), max(cur[1], stats[1]),
+                                            cur[2] + stats[2], cur[3] + stats[3], cur[4]]
+
+
+class RollupEngine:
+    """
+    多分辨率汇总：样本到达时在内存中增量累加到 1 分钟、1 小时两个层级，
+    后台任务定期把增量 upsert 到 system_info_1m / system_info_1h
+    同一个桶可能跨多次刷写，由 $min/$max/$inc/$set 合并，结果与一次性写入相同
+    """
+    def __init__(self, flush_interval: float = ROLLUP_FLUSH_INTERVAL):
+        self.crud = RollupCrud()
+        self.flush_interval = flush_interval
+        self.accumulators = {tier: RollupAccumulator(seconds) for tier, (_, seconds) in ROLLUP_TIERS.items()}
+        self._task: Optional[asyncio.Task] = None
+        self.sample_count = 0
+        self.flushed_buckets = 0
+        self.failed_flushes = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def add(self, sample: Dict[str, Any], metrics: Optional[Dict[str, float]] = None) -> None:
+        """
+        累加一条样本（非阻塞）
+        :param sample: 系统信息样本，timestamp 可以是字符串或 datetime
+        :param metrics: 已由 extract_metrics 取出的汇总指标，为空时从样本中取出
+        """
+        ts = to_datetime(sample.get("timestamp"))
+        if not isinstance(ts, datetime.datetime):
+            return
+        if metrics is None:
+            metrics = extract_metrics(sample)
+        host_id = sample.get("host_id") or HOST_ID
+        for accumulator in self.accumulators.values():
+            accumulator.add(host_id, ts, metrics)
+        self.sample_count += 1
+
+    def flush_sync(self) -> int:
+        """
+        同步写出所有层级的增量
+        :return: 写入的桶数
+        """
+        written = 0
+        for tier, accumulator in self.accumulators.items():
+            pending = accumulator.take()
+            try:
+                written += self.crud.upsert_buckets(tier, pending)
+            except Exception:
+                accumulator.restore(pending)
+                raise
+        return written
+
+    async def flush(self) -> bool:
+        """
+        写出所有层级的增量
+        :return: 是否写入成功
+        """
+        written = 0
+        try:
+            for tier, accumulator in self.accumulators.items():
+                pending = accumulator.take()
+                try:
+                    written += await run_db(self.crud.upsert_buckets, tier, pending)
+                except Exception:
+                    accumulator.restore(pending)
+                    raise
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.failed_flushes += 1
+            self.last_error = str(e)
+            return False
+        finally:
+            self.flushed_buckets += written
+
+    async def start(self) -> None:
+        """启动后台刷写任务"""
+        if self.running:
+            return
+        try:
+            await run_db(self.crud.ensure_indexes)
+        except Exception as e:
+            print(f"汇总集合索引创建失败: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台刷写任务，并写出剩余增量"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """汇总任务运行状态"""
+        return {
+            "running": self.running,
+            "sample_count": self.sample_count,
+            "pending_buckets": {tier: len(acc.pending) for tier, acc in self.accumulators.items()},
+            "flushed_buckets": self.flushed_buckets,
+            "failed_flushes": self.failed_flushes,
+            "last_error": self.last_error
+        }
+
+
+system_info_rollup = RollupEngine()
+
+
+if __name__ == "__main__":
+    # 由已有的原始样本重建汇总层级：python fastapi/app/dataoperate/rollup.py [起始日期 结束日期]
+    # 先删除范围内已有的汇总桶再重新累加，起始时间对齐到最粗层级的桶边界
+    from pymongo import ASCENDING
+    from app.core.config import get_database
+    from app.core.timeutil import prefix_range
+
+    db = get_database()
+    query = {}
+    bucket_query = {}
+    if len(sys.argv) > 2:
+        start = bucket_start(prefix_range(sys.argv[1])[0], QUERY_TIERS[0][1])
+        end = prefix_range(sys.argv[2])[1]
+        query["timestamp"] = {"$gte": start, "$lt": end}
+        bucket_query["bucket"] = {"$gte": start, "$lt": end}
+    engine = RollupEngine()
+    engine.crud.ensure_indexes()
+    for collection_name, _ in ROLLUP_TIERS.values():
+        db[collection_name].delete_many(bucket_query)
+    projection = {"_id": 0, "timestamp": 1, "host_id": 1, "disk_info.disk_percent": 1}
+    projection.update({".".join(path): 1 for path in ROLLUP_FIELDS.values()})
+    for doc in db["system_info"].find(query, projection).sort("timestamp", ASCENDING):
+        engine.add(doc)
+        if engine.sample_count % 100000 == 0:
+            engine.flush_sync()
+    # 列式桶布局的样本
+    from app.dataoperate.bucketlayout import BUCKET_COLLECTION, unpack_bucket
+    from app.core.config import BUCKET_SPAN_SECONDS
+    bucket_doc_query = {}
+    if "timestamp" in query:
+        bucket_doc_query["start"] = {"$gt": start - datetime.timedelta(seconds=BUCKET_SPAN_SECONDS), "$lt": end}
+    for doc in db[BUCKET_COLLECTION].find(bucket_doc_query).sort("start", ASCENDING):
+        for sample in unpack_bucket(doc, query.get("timestamp", {}).get("$gte"), query.get("timestamp", {}).get("$lt")):
+            engine.add(sample)
+            if engine.sample_count % 100000 == 0:
+                engine.flush_sync()
+    engine.flush_sync()
+    print(f"处理样本 {engine.sample_count} 条，汇总完成")
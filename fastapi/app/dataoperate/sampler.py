@@ -0,0 +1,143 @@
+import sys
+import os
+import asyncio
+from collections import deque
+from typing import List, Optional, Dict, Any
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+from app.core.config import COLLECT_INTERVAL, SAMPLE_BUFFER_SIZE, SAMPLE_WAIT_TIMEOUT
+from app.dataoperate.datacollect import DataCollect
+from app.dataoperate.livechannel import live_channel
+
+
+class SystemSampler:
+    """
+    后台采集任务：按固定频率采样并落库，最近的样本保存在内存环形缓冲区中，
+    接口只读取缓冲区里的最新快照，采集频率不再受接口访问量影响；
+    每个新样本同时发布到实时推送通道（见 livechannel）
+    样本先进入缓冲区并发布，再保存：保存失败（如数据库不可用）只计入 save_error_count，不影响接口与实时推送
+    """
+    def __init__(self, interval: float = COLLECT_INTERVAL, buffer_size: int = SAMPLE_BUFFER_SIZE):
+        self.interval = interval
+        self.buffer = deque(maxlen=buffer_size)
+        self.datacollect = DataCollect()
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+        self.sample_count = 0
+        self.error_count = 0
+        self.save_error_count = 0
+        self.last_duration = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """启动后台采集任务（在 FastAPI lifespan 中调用）"""
+        if self.running:
+            return
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台采集任务"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            start = loop.time()
+            try:
+                metrics = await self.datacollect.sample_data()
+            except Exception as e:
+                metrics = None
+                self.error_count += 1
+                print(f"后台采集失败: {e}")
+            if metrics is not None:
+                data = self.datacollect.snapshot(metrics)
+                self.buffer.append(data)
+                self.sample_count += 1
+                self._ready.set()
+                live_channel.publish(data)
+                try:
+                    await self.datacollect.save(metrics)
+                except Exception as e:
+                    self.save_error_count += 1
+                    print(f"样本保存失败: {e}")
+            self.last_duration = loop.time() - start
+
+            # 固定节拍调度；单次采集超时则跳过落后的节拍，避免连续补采
+            next_tick += self.interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """
+        获取最新一次采样结果
+        :return: 最新样本，缓冲区为空时返回None
+        """
+        return self.buffer[-1] if self.buffer else None
+
+    def recent(self, count: int) -> List[Dict[str, Any]]:
+        """
+        获取最近若干个样本（按时间升序）
+        :param count: 样本个数
+        """
+        if count <= 0:
+            return []
+        return list(self.buffer)[-count:]
+
+    async def get_latest(self) -> Dict[str, Any]:
+        """
+        获取最新样本；后台任务刚启动时等待首个样本（至多 SAMPLE_WAIT_TIMEOUT 秒），未启动时直接采集一次
+        后台采集持续失败、等待超时时直接采样返回（不保存）
+        """
+        data = self.latest()
+        if data is not None:
+            return data
+        if not self.running:
+            data = await self.datacollect.collect_data()
+            self.buffer.append(data)
+            return data
+        try:
+            await asyncio.wait_for(self._ready.wait(), SAMPLE_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            return self.datacollect.snapshot(await self.datacollect.sample_data())
+        return self.latest()
+
+    def stats(self) -> Dict[str, Any]:
+        """后台采集任务运行状态"""
+        latest = self.latest()
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "buffer_size": len(self.buffer),
+            "sample_count": self.sample_count,
+            "error_count": self.error_count,
+            "save_error_count": self.save_error_count,
+            "last_duration_ms": round(self.last_duration * 1000, 3),
+            "latest_timestamp": latest["timestamp"] if latest else None
+        }
+
+
+system_sampler = SystemSampler()
+
+if __name__ == "__main__":
+    async def main():
+        await system_sampler.start()
+        await asyncio.sleep(3 * system_sampler.interval)
+        print(system_sampler.stats())
+        await system_sampler.stop()
+    asyncio.run(main())
@@ -0,0 +1,411 @@
+import datetime
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+import bson
+from bson import ObjectId
+from bson.int64 import Int64
+
+# 系统信息样本的二进制编码（agent 上报、/inforeceive/ingest 与本地持久化队列共用）
+# 单条样本：MAGIC(3) + 版本号(1，最高位为 1) + 按 schema 编码的样本
+# 样本按对象（dict）递归编码：
+#   存在位图（每个字段 1 位，末位表示有附加字段）→ 定长数值字段打包为一个 struct → 变长字段按声明顺序编码
+#   → 附加字段（schema 之外的键、类型与声明不符或为 None 的值）以 BSON 原样保存，保证未知字段也能无损往返
+# 版本号最高位为 1，使前 4 字节按小端解释时大于 BSON 文档的最大长度，与 BSON 负载不会混淆
+SAMPLE_MAGIC = b"SMW"
+BATCH_MAGIC = b"SMB"
+SCHEMA_VERSION = 1
+BATCH_CONTENT_TYPE = "application/x-sample-batch"
+
+_FLOAT32_MAX = 3.4028234663852886e38
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+_EPOCH = datetime.datetime(1970, 1, 1)
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_TS = struct.Struct("<Bq")
+
+# 定长数值类型：struct 格式码 -> 取值校验
+_NUMERIC = {
+    "f": lambda v: type(v) is float and -_FLOAT32_MAX <= v <= _FLOAT32_MAX,
+    "d": lambda v: type(v) is float,
+    "Q": lambda v: type(v) is int and 0 <= v < 1 << 64,
+    "q": lambda v: type(v) is int and -(1 << 63) <= v < 1 << 63,
+    "I": lambda v: type(v) is int and 0 <= v < 1 << 32,
+    "H": lambda v: type(v) is int and 0 <= v < 1 << 16,
+}
+# 变长类型："s" 字符串，"t" 时间戳（TIMESTAMP_FORMAT 字符串或 datetime），"o" ObjectId，"U" uint32 列表
+_VARIABLE = {
+    "s": lambda v: type(v) is str,
+    "t": lambda v: (type(v) is str and len(v) == 19 and v[10] == " ") or type(v) is datetime.datetime,
+    "o": lambda v: type(v) is ObjectId,
+    "U": lambda v: type(v) is list and len(v) < 1 << 16 and all(type(x) is int and 0 <= x < 1 << 32 for x in v),
+}
+
+
+class Record:
+    """
+    一个对象（dict）的编码规则
+    :param fields: [(字段名, 类型)]，类型为 struct 格式码、变长类型码、嵌套 Record 或 ListOf
+    """
+    def __init__(self, fields: List[Tuple[str, Any]]):
+        self.fields = fields
+        self.keys = frozenset(name for name, _ in fields)
+        self.numeric = [(name, code, 1 << i) for i, (name, code) in enumerate(fields)
+                        if isinstance(code, str) and code in _NUMERIC]
+        self.struct = struct.Struct("<" + "".join(code for _, code, _ in self.numeric))
+        self.variable = [(name, kind, 1 << i) for i, (name, kind) in enumerate(fields)
+                         if not (isinstance(kind, str) and kind in _NUMERIC)]
+        self.extras_bit = 1 << len(fields)
+        self.bitmap_size = (len(fields) + 1 + 7) // 8
+        # 解码时按声明顺序还原字段：(字段名, 是否数值, 是否 float32, 类型, 位)
+        self.order = [(name, isinstance(kind, str) and kind in _NUMERIC, kind == "f", kind, 1 << i)
+                      for i, (name, kind) in enumerate(fields)]
+
+    def describe(self, prefix: str = "") -> List[Tuple[str, str]]:
+        """展开为 (字段路径, 类型) 列表"""
+        table = []
+        for name, kind in self.fields:
+            if isinstance(kind, Record):
+                table.extend(kind.describe(prefix + name + "."))
+            elif isinstance(kind, ListOf):
+                table.extend(kind.record.describe(prefix + name + "[]."))
+            else:
+                table.append((prefix + name, kind))
+        return table
+
+    def encode(self, doc: Dict[str, Any], out: bytearray) -> None:
+        bits = 0
+        extras = None
+        values = []
+        for name, code, bit in self.numeric:
+            value = doc.get(name, _MISSING)
+            if value is _MISSING:
+                values.append(0)
+            elif _NUMERIC[code](value):
+                values.append(value)
+                bits |= bit
+            else:
+                values.append(0)
+                extras = extras or {}
+                extras[name] = value
+        variable = bytearray()
+        for name, kind, bit in self.variable:
+            value = doc.get(name, _MISSING)
+            if value is _MISSING:
+                continue
+            if isinstance(kind, Record):
+                ok = type(value) is dict
+                if ok:
+                    kind.encode(value, variable)
+            elif isinstance(kind, ListOf):
+                ok = kind.encode(value, variable)
+            else:
+                ok = _VARIABLE[kind](value)
+                if ok:
+                    ok = _encode_value(kind, value, variable)
+            if ok:
+                bits |= bit
+            else:
+                extras = extras or {}
+                extras[name] = value
+        unknown = doc.keys() - self.keys
+        if unknown:
+            extras = extras or {}
+            for name in unknown:
+                extras[name] = doc[name]
+        if extras:
+            bits |= self.extras_bit
+        out += bits.to_bytes(self.bitmap_size, "little")
+        out += self.struct.pack(*values)
+        out += variable
+        if extras:
+            payload = bson.encode(extras)
+            out += payload
+
+    def decode(self, buf: bytes, offset: int) -> Tuple[Dict[str, Any], int]:
+        bits = int.from_bytes(buf[offset:offset + self.bitmap_size], "little")
+        offset += self.bitmap_size
+        numbers = iter(self.struct.unpack_from(buf, offset))
+        offset += self.struct.size
+        doc = {}
+        for name, numeric, float32, kind, bit in self.order:
+            if numeric:
+                value = next(numbers)
+                if bits & bit:
+                    # float32 解码后按 7 位有效数字取整，避免 12.3 变成 12.300000190734863
+                    doc[name] = float("%.7g" % value) if float32 else value
+            elif bits & bit:
+                if isinstance(kind, Record):
+                    doc[name], offset = kind.decode(buf, offset)
+                elif isinstance(kind, ListOf):
+                    doc[name], offset = kind.decode(buf, offset)
+                else:
+                    doc[name], offset = _decode_value(kind, buf, offset)
+        if bits & self.extras_bit:
+            size, = _U32.unpack_from(buf, offset)
+            doc.update(_plain_ints(bson.decode(bytes(buf[offset:offset + size]))))
+            offset += size
+        return doc, offset
+
+
+def _plain_ints(value: Any) -> Any:
+    """BSON 把超出 int32 的整数解码为 Int64，附加字段还原为编码前的 int"""
+    if type(value) is Int64:
+        return int(value)
+    if type(value) is dict:
+        return {key: _plain_ints(item) for key, item in value.items()}
+    if type(value) is list:
+        return [_plain_ints(item) for item in value]
+    return value
+
+
+class ListOf:
+    """
+    对象列表，每个元素按同一个 Record 编码
+    元素只含数值与字符串字段、且键与 schema 完全一致时（如 process_info）按列编码：
+    每个数值列整体打包为一个 struct，字符串列为长度数组 + 拼接的 UTF-8，省去逐元素的位图与附加字段
+    """
+    def __init__(self, record: Record):
+        self.record = record
+        self.names = [name for name, _ in record.fields]
+        self.numeric = [(name, code) for name, code in record.fields if isinstance(code, str) and code in _NUMERIC]
+        self.strings = [name for name, code in record.fields if code == "s"]
+        self.columnar = len(self.numeric) + len(self.strings) == len(record.fields)
+
+    def encode(self, items: Any, out: bytearray) -> bool:
+        if type(items) is not list or len(items) >= 1 << 16 or not all(type(item) is dict for item in items):
+            return False
+        out += _U16.pack(len(items))
+        columns = self._encode_columns(items) if self.columnar and items else None
+        if columns is not None:
+            out.append(1)
+            out += columns
+        else:
+            out.append(0)
+            for item in items:
+                self.record.encode(item, out)
+        return True
+
+    def _encode_columns(self, items: List[Dict[str, Any]]) -> Optional[bytes]:
+        """按列编码，任一元素的键或取值不符合 schema 时返回 None，改为逐元素编码"""
+        keys = self.record.keys
+        if not all(item.keys() == keys for item in items):
+            return None
+        count = len(items)
+        values = []
+        fmt = "<"
+        for name, code in self.numeric:
+            column = [item[name] for item in items]
+            if not all(map(_NUMERIC[code], column)):
+                return None
+            values.extend(column)
+            fmt += f"{count}{code}"
+        out = bytearray(struct.pack(fmt, *values))
+        for name in self.strings:
+            column = [item[name] for item in items]
+            if not all(type(value) is str for value in column):
+                return None
+            encoded = [value.encode("utf-8") for value in column]
+            if any(len(data) >= 1 << 16 for data in encoded):
+                return None
+            out += struct.pack(f"<{count}H", *map(len, encoded))
+            out += b"".join(encoded)
+        return bytes(out)
+
+    def decode(self, buf: bytes, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        count, = _U16.unpack_from(buf, offset)
+        columnar = buf[offset + 2]
+        offset += 3
+        if not columnar:
+            items = []
+            for _ in range(count):
+                item, offset = self.record.decode(buf, offset)
+                items.append(item)
+            return items, offset
+        fmt = "<" + "".join(f"{count}{code}" for _, code in self.numeric)
+        values = struct.unpack_from(fmt, buf, offset)
+        offset += struct.calcsize(fmt)
+        columns = {}
+        for i, (name, code) in enumerate(self.numeric):
+            column = values[i * count:(i + 1) * count]
+            columns[name] = [float("%.7g" % value) for value in column] if code == "f" else column
+        for name in self.strings:
+            lengths = struct.unpack_from(f"<{count}H", buf, offset)
+            offset += 2 * count
+            column = []
+            for length in lengths:
+                column.append(str(buf[offset:offset + length], "utf-8"))
+                offset += length
+            columns[name] = column
+        rows = zip(*(columns[name] for name in self.names))
+        return [dict(zip(self.names, row)) for row in rows], offset
+
+
+_MISSING = object()
+
+
+def _encode_value(kind: str, value: Any, out: bytearray) -> bool:
+    """编码一个变长值，无法编码（如字符串过长）时返回 False，由调用方放入附加字段"""
+    if kind == "s":
+        data = value.encode("utf-8")
+        if len(data) >= 1 << 16:
+            return False
+        out += _U16.pack(len(data))
+        out += data
+    elif kind == "t":
+        if type(value) is str:
+            try:
+                value_dt = datetime.datetime.fromisoformat(value)
+            except ValueError:
+                return False
+            if value_dt.strftime(_TIMESTAMP_FORMAT) != value:
+                return False
+            out += _TS.pack(0, (value_dt - _EPOCH) // datetime.timedelta(microseconds=1))
+        else:
+            if value.tzinfo is not None:
+                return False
+            out += _TS.pack(1, (value - _EPOCH) // datetime.timedelta(microseconds=1))
+    elif kind == "o":
+        out += value.binary
+    elif kind == "U":
+        out += _U16.pack(len(value))
+        out += struct.pack(f"<{len(value)}I", *value)
+    return True
+
+
+def _decode_value(kind: str, buf: bytes, offset: int) -> Tuple[Any, int]:
+    if kind == "s":
+        size, = _U16.unpack_from(buf, offset)
+        offset += 2
+        return str(buf[offset:offset + size], "utf-8"), offset + size
+    if kind == "t":
+        as_datetime, micros = _TS.unpack_from(buf, offset)
+        value = _EPOCH + datetime.timedelta(microseconds=micros)
+        return (value if as_datetime else value.strftime(_TIMESTAMP_FORMAT)), offset + _TS.size
+    if kind == "o":
+        return ObjectId(bytes(buf[offset:offset + 12])), offset + 12
+    count, = _U16.unpack_from(buf, offset)
+    offset += 2
+    return list(struct.unpack_from(f"<{count}I", buf, offset)), offset + 4 * count
+
+
+# 版本 1：与 HostMetrics.sample() / collect_data() 的文档结构一致
+# 占比、容量（GB）、速率为 float32；累计计数为 uint64；累计流量（KB，浮点）为 float64
+_RATE_FIELDS = [("ctx_switches_per_sec", "f"), ("interrupts_per_sec", "f"),
+                ("soft_interrupts_per_sec", "f"), ("syscalls_per_sec", "f")]
+SAMPLE_SCHEMA_V1 = Record([
+    ("_id", "o"),
+    ("id", "q"),
+    ("anomaly_id", "q"),
+    ("risk_score", "f"),
+    ("host_id", "s"),
+    ("timestamp", "t"),
+    ("cpu_info", Record([
+        ("cpu_count", "H"), ("logical_cpu_count", "H"), ("cpu_percent", "f"), ("cpu_freq", "f"), ("cpu_model", "s"),
+        ("cpu_stats", Record([
+            ("ctx_switches", "Q"), ("interrupts", "Q"), ("soft_interrupts", "Q"), ("syscalls", "Q")
+        ] + _RATE_FIELDS)),
+    ])),
+    ("memory_info", Record([
+        ("total_memory_gb", "f"), ("available_memory_gb", "f"), ("used_memory_gb", "f"), ("memory_percent", "f"),
+        ("active_memory_gb", "f"), ("inactive_memory_gb", "f"), ("buffers_memory_gb", "f"), ("cached_memory_gb", "f"),
+        ("swap_memory_info", Record([
+            ("total_smemory_gb", "f"), ("used_smemory_gb", "f"), ("free_smemory_gb", "f"), ("smemory_percent", "f")
+        ])),
+    ])),
+    ("disk_info", ListOf(Record([
+        ("device", "s"), ("mountpoint", "s"), ("total_disk_gb", "f"), ("used_disk_gb", "f"), ("disk_percent", "f"),
+        ("disk_io", Record([
+            ("read_count", "Q"), ("write_count", "Q"), ("read_bytes", "Q"), ("write_bytes", "Q"),
+            ("read_count_per_sec", "f"), ("write_count_per_sec", "f"),
+            ("read_bytes_per_sec", "f"), ("write_bytes_per_sec", "f")
+        ])),
+    ]))),
+    ("network_info", Record([
+        ("bytes_sent_kb", "d"), ("bytes_recv_kb", "d"), ("packets_sent", "Q"), ("packets_recv", "Q"),
+        ("bytes_sent_kb_per_sec", "f"), ("bytes_recv_kb_per_sec", "f"),
+        ("packets_sent_per_sec", "f"), ("packets_recv_per_sec", "f")
+    ])),
+    ("process_info", ListOf(Record([
+        ("pid", "I"), ("name", "s"), ("username", "s"), ("cpu_percent", "f"), ("memory_percent", "f")
+    ]))),
+    ("process_summary", Record([
+        ("total_count", "I"), ("top_cpu_pids", "U"), ("top_memory_pids", "U"),
+        ("rest", Record([("count", "I"), ("cpu_percent", "f"), ("memory_percent", "f")])),
+    ])),
+])
+SCHEMAS = {1: SAMPLE_SCHEMA_V1}
+
+
+def describe_schema(version: int = SCHEMA_VERSION) -> List[Tuple[str, str]]:
+    """返回指定版本的字段表 [(字段路径, 类型)]"""
+    return SCHEMAS[version].describe()
+
+
+def is_encoded_sample(payload: bytes) -> bool:
+    return payload[:3] == SAMPLE_MAGIC and len(payload) > 3 and payload[3] & 0x80 != 0
+
+
+def encode_sample(doc: Dict[str, Any], version: int = SCHEMA_VERSION) -> bytes:
+    """
+    编码一条样本
+    :param doc: 系统信息样本（timestamp 可以是字符串或 datetime，_id 可选）
+    :return: 二进制编码
+    """
+    out = bytearray(SAMPLE_MAGIC)
+    out.append(0x80 | version)
+    SCHEMAS[version].encode(doc, out)
+    return bytes(out)
+
+
+def decode_sample(payload: bytes) -> Dict[str, Any]:
+    """encode_sample 的逆操作，按负载中的版本号选择 schema"""
+    if not is_encoded_sample(payload):
+        raise ValueError("不是二进制编码的样本")
+    schema = SCHEMAS.get(payload[3] & 0x7F)
+    if schema is None:
+        raise ValueError(f"不支持的样本编码版本: {payload[3] & 0x7F}")
+    doc, _ = schema.decode(memoryview(payload), 4)
+    return doc
+
+
+def encode_batch(samples: List[Dict[str, Any]], header: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    编码一批样本（agent 上报用）：BATCH_MAGIC + 版本号 + BSON 批次头（host_id、agent 自报状态等）
+    + 样本数 + 逐条（长度 + 样本编码）
+    """
+    out = bytearray(BATCH_MAGIC)
+    out.append(0x80 | SCHEMA_VERSION)
+    out += bson.encode(header or {})
+    out += _U32.pack(len(samples))
+    for sample in samples:
+        payload = encode_sample(sample)
+        out += _U32.pack(len(payload))
+        out += payload
+    return bytes(out)
+
+
+def is_encoded_batch(body: bytes) -> bool:
+    return body[:3] == BATCH_MAGIC and len(body) > 3 and body[3] & 0x80 != 0
+
+
+def decode_batch(body: bytes) -> Dict[str, Any]:
+    """
+    encode_batch 的逆操作
+    :return: 批次头字段加上 "samples": [样本, ...]，与 JSON 上报的请求体结构一致
+    """
+    if not is_encoded_batch(body):
+        raise ValueError("不是二进制编码的样本批次")
+    view = memoryview(body)
+    size, = _U32.unpack_from(view, 4)
+    payload = bson.decode(bytes(view[4:4 + size]))
+    offset = 4 + size
+    count, = _U32.unpack_from(view, offset)
+    offset += 4
+    samples = []
+    for _ in range(count):
+        size, = _U32.unpack_from(view, offset)
+        offset += 4
+        samples.append(decode_sample(bytes(view[offset:offset + size])))
+        offset += size
+    payload["samples"] = samples
+    return payload
@@ -1,5 +1,7 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from api import SystemInfoApi
 from api import CauseAnalysisApi
@@ -7,10 +9,63 @@ from api import CauseModelApi
 from api import CauseReportApi
 from api import SolutionApi  
 from api import LLMapi
+from api import InfoReceiveApi
+from app.dataoperate.sampler import system_sampler
+from app.crud.WriteBuffer import system_info_writer, system_info_bucket_writer
+from app.dataoperate.bucketlayout import system_info_bucketer
+from app.crud.LocalMetricCrud import local_metric_store
+from app.crud.SpoolCrud import system_info_spool, system_info_replayer
+from app.core.config import SPOOL_ENABLED, SYSTEM_INFO_STORAGE
+from app.dataoperate.rollup import system_info_rollup
+from app.dataoperate.retention import retention_engine
+from app.crud.SystemInfoCrud import SystemInfoCrud
+from app.crud.CauseReportCrud import CauseReportCrud
+from app.core.database import database_manager
+from app.core.dbexecutor import run_db, start_db_executor, shutdown_db_executor
 import uvicorn
 import os
 
-app = FastAPI(title="SH-13")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 数据库线程池随 lifespan 创建，结束时关闭
+    start_db_executor()
+    # 建立进程内共享的 MongoDB 连接池，所有 CRUD 复用同一个 MongoClient
+    try:
+        stats = await run_db(database_manager.connect)
+        print(f"MongoDB 已连接，连接池上限 {stats['max_pool_size']}，"
+              f"已建立连接 {stats['pool']['opened']} 个，读偏好 {stats['read_preference']}")
+        # 时间字段索引：按日期/时间范围的查询走索引范围扫描
+        for crud in (SystemInfoCrud(), CauseReportCrud()):
+            await run_db(crud.ensure_indexes)
+    except Exception as e:
+        print(f"MongoDB 初始化失败: {e}")
+    # 启动写后缓冲与后台采集任务，按固定频率采样并批量落库
+    await system_info_writer.start()
+    await system_info_bucket_writer.start()
+    # 本地持久化队列：样本先落本地文件，由回放任务批量写入 MongoDB
+    if SPOOL_ENABLED and SYSTEM_INFO_STORAGE in ("standard", "timeseries"):
+        await system_info_replayer.start()
+    await system_info_rollup.start()
+    await system_sampler.start()
+    # 后台数据保留任务：分批限速删除过期数据、压缩重复的综合报告
+    await retention_engine.start()
+    yield
+    await retention_engine.stop()
+    await system_sampler.stop()
+    await system_info_rollup.stop()
+    await system_info_replayer.stop()
+    await run_db(system_info_spool.close)
+    await system_info_writer.stop()
+    # 未满的桶封桶后随缓冲一起写出
+    system_info_bucketer.seal_all()
+    await system_info_bucket_writer.stop()
+    # 本地存储布局：未写满的压缩块写入段文件
+    await run_db(local_metric_store.close)
+    shutdown_db_executor()
+    database_manager.close()
+
+app = FastAPI(title="SH-13", lifespan=lifespan)
 
 # 添加 CORS 中间件
 # 允许所有来源的跨域请求
@@ -22,6 +77,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应体超过 1 KB 时按客户端的 Accept-Encoding 压缩（图表序列、历史数据等 JSON 响应压缩率很高）；
+# NDJSON / SSE 流式响应带 Content-Encoding: identity，不被压缩（见 app/core/streaming.py）
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # 配置静态文件服务
 uploads_dir = "./uploads"
 if not os.path.exists(uploads_dir):
@@ -35,6 +94,7 @@ app.include_router(CauseModelApi.router, prefix="/causemodel", tags=["根因模
 app.include_router(CauseReportApi.router, prefix="/causereport", tags=["根因报告接口"])
 app.include_router(SolutionApi.router, prefix="/solution", tags=["解决方案接口"])
 app.include_router(LLMapi.router, prefix="/llm", tags=["LLM接口"])
+app.include_router(InfoReceiveApi.router, prefix="/inforeceive", tags=["远程采集接入接口"])
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
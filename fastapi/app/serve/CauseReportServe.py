@@ -1,7 +1,7 @@
 import asyncio
 import sys
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, AsyncIterator
 import time
 import uuid
 from fastapi import UploadFile
@@ -41,6 +41,15 @@ def fix_objectid(obj):
     else:
         return obj
 
+def process_cpu_total(metrics: Dict[str, Any]) -> float:
+    """
+    进程 CPU 占用总和：process_info 中 Top-K 进程之和，加上 process_summary 中其余进程的汇总值
+    """
+    process_info = metrics.get("process_info", [])
+    total = sum([p.get("cpu_percent", 0) for p in process_info])
+    rest = (metrics.get("process_summary") or {}).get("rest") or {}
+    return total + rest.get("cpu_percent", 0)
+
 class CauseReportServe:
     def __init__(self):
         self.crud = CauseReportCrud()
@@ -53,8 +62,7 @@ class CauseReportServe:
         """
         if anomaly_type == "负载-进程矛盾":
             cpu_percent = metrics.get("cpu_info", {}).get("cpu_percent", 0)
-            process_info = metrics.get("process_info", [])
-            process_cpu_sum = sum([p.get("cpu_percent", 0) for p in process_info])
+            process_cpu_sum = process_cpu_total(metrics)
             cpu_diff = abs(cpu_percent - process_cpu_sum)
             
             if cpu_percent > 90 or cpu_diff > 70:
@@ -179,7 +187,7 @@ class CauseReportServe:
         if anomaly_type == "负载-进程矛盾":
             cpu_percent = metrics.get("cpu_info", {}).get("cpu_percent", 0)
             process_info = metrics.get("process_info", [])
-            process_cpu_sum = sum([p.get("cpu_percent", 0) for p in process_info])
+            process_cpu_sum = process_cpu_total(metrics)
             return {
                 "index": index,
                 "anomaly_type": anomaly_type,
@@ -283,67 +291,80 @@ class CauseReportServe:
         template = self.get_template_by_type(anomaly_type, anomaly)
         return template
 
-    async def get_all_cause_reports(self) -> Dict[str, Any]:
+    async def get_all_cause_reports(self, host_id: Optional[str] = None) -> Dict[str, Any]:
         """
         获取所有异常报告（返回字段结构与 CauseReportServe.py 模板一致）
+        :param host_id: 主机标识，为空时返回所有主机
         """
-        reports = await self.crud.find_cause_reports()
+        reports = await self.crud.find_cause_reports(host_id)
         if not reports:
             return {"errCode": 1, "message": "无异常报告数据", "data": None}
-        formatted_reports = []
-        for r in reports:
-            anomaly_type = r.get("anomaly_type") or "未知异常"
-            # 兼容历史数据
-            anomaly = {
-                "type": anomaly_type,
-                "risk_level": r.get("risk_level"),
-                "status": r.get("current_status"),
-                "metrics": {
-                    "cpu_info": r.get("cpu_info", {}),
-                    "memory_info": r.get("memory_info", {}),
-                    "network_info": r.get("network_info", {}),
-                    "disk_info": r.get("disk_info", []),
-                    "process_info": r.get("process_detail", []) or r.get("process_info", [])
-                }
-            }
-            # 用 CauseReportServe 的模板格式化
-            formatted = self.get_template_by_type(anomaly_type, anomaly, r.get("index", 1))
-            # 保留原有的基础信息
-            formatted.update({
-                "timestamp": r.get("timestamp"),
-                "system_info_id": r.get("system_info_id"),
-                "original_timestamp": r.get("original_timestamp"),
-                "index": r.get("index"),
-                "_id": r.get("_id"),
-            })
-            formatted_reports.append(formatted)
+        formatted_reports = [self.format_cause_report(r) for r in reports]
         return {"errCode": 0, "message": "success", "data": formatted_reports}
 
+    def stream_all_cause_reports(self, host_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        流式获取所有异常报告（NDJSON，每行一条，格式与 get_all_cause_reports 的 data 元素相同）
+        :param host_id: 主机标识，为空时返回所有主机
+        """
+        return self.crud.stream_cause_reports(host_id, self.format_cause_report)
+
+    def format_cause_report(self, r: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        把一条异常报告按模板格式化（返回字段结构与 CauseReportServe.py 模板一致）
+        """
+        anomaly_type = r.get("anomaly_type") or "未知异常"
+        # 兼容历史数据
+        anomaly = {
+            "type": anomaly_type,
+            "risk_level": r.get("risk_level"),
+            "status": r.get("current_status"),
+            "metrics": {
+                "cpu_info": r.get("cpu_info", {}),
+                "memory_info": r.get("memory_info", {}),
+                "network_info": r.get("network_info", {}),
+                "disk_info": r.get("disk_info", []),
+                "process_info": r.get("process_detail", []) or r.get("process_info", [])
+            }
+        }
+        # 用 CauseReportServe 的模板格式化
+        formatted = self.get_template_by_type(anomaly_type, anomaly, r.get("index", 1))
+        # 保留原有的基础信息
+        formatted.update({
+            "timestamp": r.get("timestamp"),
+            "host_id": r.get("host_id"),
+            "system_info_id": r.get("system_info_id"),
+            "original_timestamp": r.get("original_timestamp"),
+            "index": r.get("index"),
+            "_id": r.get("_id"),
+        })
+        return formatted
+
     async def clean_old_format_reports(self) -> Dict[str, Any]:
         """
         清理旧格式的异常报告数据
         """
         try:
             # 删除包含 "异常列表" 字段的旧格式记录
-            result = self.crud.db["cause_report"].delete_many({"异常列表": {"$exists": True}})
-            deleted_count = result.deleted_count
+            deleted_count = await self.crud.delete_old_format_reports()
             return {"errCode": 0, "message": f"成功清理 {deleted_count} 条旧格式记录", "data": {"deleted_count": deleted_count}}
         except Exception as e:
             return {"errCode": 1, "message": f"清理旧格式记录失败: {str(e)}", "data": None}
 
-    async def generate_report_from_systeminfo(self) -> Dict[str, Any]:
-        # 获取所有系统信息数据
-        system_data_list = await self.systeminfo_crud.find_systeminfo()
+    async def generate_report_from_systeminfo(self, host_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        从系统信息生成异常报告，报告记录样本所属主机
+        :param host_id: 主机标识，为空时处理所有主机
+        """
+        # 获取系统信息数据
+        system_data_list = await self.systeminfo_crud.find_systeminfo(host_id)
         # 转换所有 _id 字段为字符串，避免 ObjectId 报错
         system_data_list = [fix_objectid(item) for item in system_data_list if isinstance(item, dict)]
         if not system_data_list:
             return {"errCode": 1, "message": "无系统信息数据", "data": None}
         
         # 获取已经处理过的系统信息ID列表
-        processed_system_info_ids = set()
-        existing_reports = list(self.crud.db["cause_report"].find({}, {"system_info_id": 1}))
-        for report in existing_reports:
-            processed_system_info_ids.add(report.get("system_info_id"))
+        processed_system_info_ids = await self.crud.find_processed_system_info_ids()
         
         # 用于跟踪已处理的异常，避免重复存储
         processed_anomalies = set()
@@ -390,7 +411,8 @@ class CauseReportServe:
                 "memory_info": item.get("memory_info", {}),
                 "network_info": item.get("network_info", {}),
                 "disk_info": item.get("disk_info", []),
-                "process_info": item.get("process_info", [])
+                "process_info": item.get("process_info", []),
+                "process_summary": item.get("process_summary", {})
             }
             
             # 调用judge_risk_level函数计算风险等级
@@ -412,8 +434,9 @@ class CauseReportServe:
             current_timestamp = original_timestamp if original_timestamp else time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
             
             single_report = {
-                "id": self.crud.db["cause_report"].count_documents({}) + 1,  # 简单生成 ID,
+                "id": None,  # 循环结束后为本批报告统一分配 ID
                 "timestamp": current_timestamp,  # 使用原始时间戳
+                "host_id": item.get("host_id"),
                 "system_info_id": system_info_id,
                 "original_timestamp": original_timestamp,
                 "data": {
@@ -422,14 +445,21 @@ class CauseReportServe:
             }
             
             # 保存单个异常报告到数据库前，先查重
-            exists = self.crud.db["cause_report"].find_one({
+            exists = await self.crud.exists_cause_report({
                 "anomaly_type": template.get("anomaly_type"),
                 "original_timestamp": single_report["original_timestamp"],
                 "system_info_id": single_report["system_info_id"]
             })
             if not exists:
-                await self.crud.save_cause_report(single_report)
-                saved_reports.append(fix_objectid(single_report))
+                saved_reports.append(single_report)
+
+        # 一次往返为本批报告预留连续 ID，并批量写入
+        if saved_reports:
+            report_ids = await self.crud.reserve_report_ids(len(saved_reports))
+            for report_id, report in zip(report_ids, saved_reports):
+                report["id"] = report_id
+            await self.crud.save_cause_reports(saved_reports)
+            saved_reports = [fix_objectid(report) for report in saved_reports]
         
         if not saved_reports:
             return {"errCode": 1, "message": "未发现新的异常数据", "data": None}
@@ -503,9 +533,10 @@ class CauseReportServe:
         else:
             return "高危"
 
-    async def generate_summary_report_by_date(self, date_str: str) -> Dict[str, Any]:
+    async def generate_summary_report_by_date(self, date_str: str, host_id: Optional[str] = None) -> Dict[str, Any]:
         """
         根据前端传来的日期字符串（如2025-07-15）生成当天的综合性报告。
+        指定 host_id 时只汇总该主机的异常，为空时汇总所有主机。
         报告结构：
         - 日期
         - 异常个数
@@ -514,7 +545,7 @@ class CauseReportServe:
         - 每个异常的名称和特有字段
         """
         # 查找当天所有异常报告
-        reports = await self.crud.find_cause_reports_by_timestamp(date_str)
+        reports = await self.crud.find_cause_reports_by_timestamp(date_str, host_id)
         if not reports:
             return {"errCode": 1, "message": f"{date_str} 无异常报告数据", "data": None}
         
@@ -538,12 +569,12 @@ class CauseReportServe:
         # 计算总体异常等级
         overall_risk_level = self.calculate_overall_risk_level(reports)
         
-        # 获取当前最大id
-        last = self.crud.db["cause_report_by_timestamp"].find_one(sort=[("id", -1)])
-        next_id = (last["id"] + 1) if last and "id" in last else 1
+        # 分配新的综合报告id
+        next_id = await self.crud.next_summary_id()
         summary = {
             "id": next_id,
             "date": date_str,
+            "host_id": host_id,
             "anomaly_count": len(reports),
             "overall_risk_level": overall_risk_level,  # 新增总体异常等级字段
             #"public_fields": public_fields,
@@ -551,36 +582,22 @@ class CauseReportServe:
             #"advice": "建议：请关注系统运行状态，及时处理异常。"
         }
         # 存储到新的数据库集合 cause_report_by_timestamp
-        self.crud.db["cause_report_by_timestamp"].insert_one(summary)
+        await self.crud.save_summary_report(summary)
         # 移除summary中的_id（如果有）
         summary.pop("_id", None)
         return {"errCode": 0, "message": "success", "data": summary}
 
-    async def get_latest_summary_reports_by_day(self) -> dict:
+    async def get_latest_summary_reports_by_day(self, host_id: Optional[str] = None) -> dict:
         """
-        获取cause_report_by_timestamp集合中每一天最后一条综合性报告
+        获取cause_report_by_timestamp集合中每一天（每台主机）最后一条综合性报告
+        :param host_id: 主机标识，为空时返回所有主机
         """
-        # 聚合：按date分组，取每组最后一条
-        pipeline = [
-            {"$sort": {"date": 1, "_id": 1}},
-            {"$group": {
-                "_id": "$date",
-                "last_report": {"$last": "$$ROOT"}
-            }},
-            {"$replaceRoot": {"newRoot": "$last_report"}},
-            {"$sort": {"date": 1}}
-        ]
-        result = list(self.crud.db["cause_report_by_timestamp"].aggregate(pipeline))
-        # 转换_id为字符串
-        for item in result:
-            if "_id" in item:
-                item["_id"] = str(item["_id"])
-            
+        result = await self.crud.find_latest_summary_reports_by_day(host_id)
         return {"errCode": 0, "message": "success", "data": result}
 
-    async def get_report_id(self, timestamp: str):
+    async def get_report_id(self, timestamp: str, host_id: Optional[str] = None):
         #print(await self.crud.get_id(timestamp))
-        return await self.crud.get_id(timestamp)
+        return await self.crud.get_id(timestamp, host_id)
 
     async def save_pdf_report(self, file: UploadFile) -> Dict[str, Any]:
         """
@@ -0,0 +1,235 @@
+import asyncio
+import datetime
+import json
+import struct
+import zlib
+import collections
+import sys
+import os
+
+#自己的路径
+sys.path.append(os.path.abspath("./fastapi"))
+
+from typing import List, Optional, Dict, Any, Tuple
+from app.core.config import INGEST_MAX_BODY_BYTES, INGEST_MAX_SAMPLES, INGEST_MAX_ERRORS, INGEST_DEDUP_WINDOW
+from app.core.timeutil import TIMESTAMP_FORMAT
+from app.crud.SystemInfoCrud import SystemInfoCrud
+from app.dataoperate.wireformat import is_encoded_batch, decode_batch
+from bson import ObjectId
+from bson.errors import BSONError
+
+# 样本中允许的指标分组及其类型（列表分组的元素必须为对象）；其他顶层字段（包括客户端自带的 id）一律丢弃，
+# 只保留 agent 入队时生成的 _id（ObjectId 或其 24 位十六进制字符串），重发的批次据此去重
+SAMPLE_SECTIONS = {
+    "cpu_info": dict,
+    "memory_info": dict,
+    "disk_info": list,
+    "network_info": dict,
+    "process_info": list,
+    "process_summary": dict,
+}
+REQUIRED_SECTIONS = ("cpu_info", "memory_info")
+HOST_ID_MAX_LENGTH = 128
+# 未压缩的请求体小于该大小时直接在事件循环中解析，线程切换的开销比解析本身更大；
+# gzip 请求体解压后的大小无法预知（可达 INGEST_MAX_BODY_BYTES），总是放到线程中解析
+INLINE_PARSE_BYTES = 64 * 1024
+
+
+class IngestError(ValueError):
+    """整批拒绝（请求体无法解析、超出大小限制、缺少主机标识等）"""
+
+
+def is_gzip_body(body: bytes, content_encoding: Optional[str] = None) -> bool:
+    """请求体是否为 gzip 压缩（按 Content-Encoding 或 gzip 魔数判断）"""
+    return (content_encoding or "").lower() == "gzip" or body[:2] == b"\x1f\x8b"
+
+
+def decode_body(body: bytes, content_encoding: Optional[str] = None) -> Any:
+    """
+    解码请求体：按 Content-Encoding（或 gzip 魔数）解压后，按魔数识别样本二进制批次，否则按 JSON 解析
+    解压时限制输出大小，防止压缩炸弹
+    :param body: 原始请求体
+    :param content_encoding: Content-Encoding 请求头
+    :return: 解析后的对象，二进制批次解码为与 JSON 请求体相同的结构
+    """
+    if is_gzip_body(body, content_encoding):
+        decompressor = zlib.decompressobj(wbits=31)
+        try:
+            body = decompressor.decompress(body, INGEST_MAX_BODY_BYTES)
+        except zlib.error as e:
+            raise IngestError(f"gzip 解压失败: {e}")
+        if decompressor.unconsumed_tail:
+            raise IngestError(f"解压后请求体超过 {INGEST_MAX_BODY_BYTES} 字节")
+    elif len(body) > INGEST_MAX_BODY_BYTES:
+        raise IngestError(f"请求体超过 {INGEST_MAX_BODY_BYTES} 字节")
+    if is_encoded_batch(body):
+        try:
+            return decode_batch(body)
+        except (ValueError, IndexError, KeyError, OverflowError, struct.error, BSONError) as e:
+            raise IngestError(f"二进制批次解析失败: {e}")
+    try:
+        return json.loads(body)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise IngestError(f"JSON 解析失败: {e}")
+
+
+def normalize_timestamp(value: Any) -> Optional[datetime.datetime]:
+    """
+    解析样本时间戳：接受 TIMESTAMP_FORMAT 字符串、Unix 秒数或 datetime（二进制批次），无法解析时返回 None
+    解析结果直接作为 datetime 写入，后续汇总与入库不再重复解析字符串
+    """
+    if isinstance(value, datetime.datetime):
+        return value.replace(tzinfo=None, microsecond=0)
+    if isinstance(value, str):
+        # 先检查长度与分隔符，限定为 TIMESTAMP_FORMAT 的形状，再用 C 实现的 fromisoformat 解析
+        if len(value) != 19 or value[4] != "-" or value[10] != " ":
+            return None
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+        try:
+            return datetime.datetime.fromtimestamp(int(value))
+        except (ValueError, OverflowError, OSError):
+            return None
+    return None
+
+
+def validate_sample(sample: Any, host_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    轻量校验单条样本：只检查结构（分组存在且类型正确、列表分组的元素为对象、时间戳可解析），不逐字段构造模型
+    :return: (清洗后的样本, None) 或 (None, 错误原因)
+    """
+    if not isinstance(sample, dict):
+        return None, "样本不是对象"
+    timestamp = normalize_timestamp(sample.get("timestamp"))
+    if timestamp is None:
+        return None, f"时间戳无效: {sample.get('timestamp')!r}"
+    doc = {"anomaly_id": 0, "host_id": host_id, "timestamp": timestamp}
+    sample_id = sample.get("_id")
+    if isinstance(sample_id, str) and len(sample_id) == 24 and ObjectId.is_valid(sample_id):
+        sample_id = ObjectId(sample_id)
+    if isinstance(sample_id, ObjectId):
+        doc["_id"] = sample_id
+    for name, kind in SAMPLE_SECTIONS.items():
+        value = sample.get(name)
+        if value is None:
+            if name in REQUIRED_SECTIONS:
+                return None, f"缺少 {name}"
+            continue
+        if not isinstance(value, kind):
+            return None, f"{name} 类型应为 {kind.__name__}"
+        if kind is list:
+            for index, item in enumerate(value):
+                if not isinstance(item, dict):
+                    return None, f"{name}[{index}] 类型应为 dict"
+        doc[name] = value
+    return doc, None
+
+
+def validate_batch(payload: Any, host_id: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]], List[str]]:
+    """
+    校验一批样本
+    :param payload: {"host_id": 主机标识, "samples": [样本, ...]}，也可以直接是样本列表（主机标识取自请求头）
+    :param host_id: X-Host-Id 请求头，优先于请求体中的 host_id
+    :return: (主机标识, 通过校验的样本, 错误信息)
+    """
+    if isinstance(payload, list):
+        samples = payload
+    elif isinstance(payload, dict):
+        samples = payload.get("samples")
+        host_id = host_id or payload.get("host_id")
+    else:
+        raise IngestError("请求体应为对象或样本列表")
+    if not isinstance(host_id, str) or not host_id or len(host_id) > HOST_ID_MAX_LENGTH:
+        raise IngestError("缺少有效的 host_id")
+    if not isinstance(samples, list):
+        raise IngestError("samples 应为列表")
+    if len(samples) > INGEST_MAX_SAMPLES:
+        raise IngestError(f"单批样本数超过 {INGEST_MAX_SAMPLES}")
+    accepted = []
+    errors = []
+    for index, sample in enumerate(samples):
+        doc, error = validate_sample(sample, host_id)
+        if doc is None:
+            errors.append(f"samples[{index}]: {error}")
+        else:
+            accepted.append(doc)
+    return host_id, accepted, errors
+
+
+class InfoReceiveServe:
+    def __init__(self):
+        self.crud = SystemInfoCrud()
+        self.batch_count = 0
+        self.accepted_count = 0
+        self.rejected_count = 0
+        self.duplicate_count = 0
+        self.hosts = set()
+        # 最近写入的样本 _id（按写入顺序，至多 INGEST_DEDUP_WINDOW 个）：agent 未收到响应而重发的批次在这里去重，
+        # 不会重复写入，也不会重复累加到汇总层级；超出窗口的重发仍由数据库的 _id 唯一性兜底
+        self._recent_ids: "collections.OrderedDict[ObjectId, None]" = collections.OrderedDict()
+        # 各主机 agent 最近一次随批上报的自身状态（CPU / 内存占用与预算、积压等）
+        self.agents: Dict[str, Dict[str, Any]] = {}
+
+    def _parse(self, body: bytes, content_encoding: Optional[str], host_id: Optional[str]):
+        payload = decode_body(body, content_encoding)
+        host_id, samples, errors = validate_batch(payload, host_id)
+        agent = payload.get("agent") if isinstance(payload, dict) else None
+        return host_id, samples, errors, agent if isinstance(agent, dict) else None
+
+    async def ingest(self, body: bytes, content_encoding: Optional[str] = None,
+                     host_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        接收远端 agent 上报的一批样本，校验后进入批量写入路径
+        :param body: 请求体（JSON 或样本二进制批次，可 gzip 压缩）
+        :param content_encoding: Content-Encoding 请求头
+        :param host_id: X-Host-Id 请求头
+        :return: 接收、拒绝与重复（已写入过，本次跳过）的条数，以及前若干条校验错误
+        """
+        # 解压与较大请求体的解析是 CPU 密集操作，放到线程中执行以免阻塞事件循环
+        if len(body) < INLINE_PARSE_BYTES and not is_gzip_body(body, content_encoding):
+            host_id, samples, errors, agent = self._parse(body, content_encoding, host_id)
+        else:
+            host_id, samples, errors, agent = await asyncio.to_thread(self._parse, body, content_encoding, host_id)
+        fresh = [sample for sample in samples if sample.get("_id") not in self._recent_ids]
+        await self.crud.save_system_infos(fresh)
+        # 写入成功后才记入窗口，写入失败的批次重发时照常写入
+        for sample in fresh:
+            if "_id" in sample:
+                self._recent_ids[sample["_id"]] = None
+        while len(self._recent_ids) > INGEST_DEDUP_WINDOW:
+            self._recent_ids.popitem(last=False)
+        duplicates = len(samples) - len(fresh)
+        self.batch_count += 1
+        self.accepted_count += len(fresh)
+        self.duplicate_count += duplicates
+        self.rejected_count += len(errors)
+        self.hosts.add(host_id)
+        if agent is not None:
+            self.agents[host_id] = dict(agent, reported_at=datetime.datetime.now().strftime(TIMESTAMP_FORMAT))
+        return {
+            "host_id": host_id,
+            "accepted": len(fresh),
+            "rejected": len(errors),
+            "duplicates": duplicates,
+            "errors": errors[:INGEST_MAX_ERRORS]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batch_count,
+            "accepted": self.accepted_count,
+            "rejected": self.rejected_count,
+            "duplicates": self.duplicate_count,
+            "hosts": len(self.hosts),
+            "agents_over_budget": sum(1 for agent in self.agents.values() if agent.get("over_budget"))
+        }
+
+    def get_agents(self, over_budget: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各主机 agent 最近一次上报的自身状态
+        :param over_budget: 只返回超出 CPU / 内存预算的 agent
+        """
+        return {host: agent for host, agent in self.agents.items() if not over_budget or agent.get("over_budget")}
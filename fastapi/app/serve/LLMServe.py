@@ -23,7 +23,7 @@ class LLMServe:
         if res=="3":
             data=await system_info_serve.get_system_info()
             myres=f"当前时间: {data['timestamp']},CPU利用率：{data['cpu_info']['cpu_percent']}%,内存利用率：{data['memory_info']['memory_percent']}%\n"
-            myres+=f"磁盘数量：{len(data['disk_info'])},进程数：{len(data['process_info'])}\n"
+            myres+=f"磁盘数量：{len(data['disk_info'])},进程数：{data.get('process_summary', {}).get('total_count', len(data['process_info']))}\n"
             tail="以上为系统状态的简要信息，详细信息请查看日志。\n"
             if(data["anomaly_id"]==0):
                 myres=myres+"当前系统状态正常。\n"
@@ -91,7 +91,7 @@ class LLMServe:
             myres="开始进行系统全面检测\n"
             data=await system_info_serve.get_system_info()
             myres+=f"当前时间: {data['timestamp']},CPU利用率：{data['cpu_info']['cpu_percent']}%,内存利用率：{data['memory_info']['memory_percent']}\n"
-            myres+=f"磁盘数量：{len(data['disk_info'])},进程数：{len(data['process_info'])}\n"
+            myres+=f"磁盘数量：{len(data['disk_info'])},进程数：{data.get('process_summary', {}).get('total_count', len(data['process_info']))}\n"
             if(data["anomaly_id"]==0):
                 myres+="当前系统状态正常。\n"
                 myres+="系统自动检测结束。\n"
@@ -3,7 +3,7 @@ import sys
 import os
 import time
 import uuid
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator
 from fastapi import UploadFile
 from app.crud.SolutionCrud import SolutionCrud
 from app.crud.CauseReportCrud import CauseReportCrud
@@ -403,20 +403,19 @@ class SolutionServe:
         获取所有解决方案
         :return: 所有解决方案列表
         """
-        # 实际应用中应该实现此方法
-        # 这里仅为示例，返回模拟数据
-        solutions = []
-        # 将异步迭代改为同步方式
-        for solution in list(self.solution_crud.db['solutions'].find()):
-            if '_id' in solution:
-                solution['_id'] = str(solution['_id'])
-            solutions.append(solution)
+        solutions = await self.solution_crud.get_all_solutions()
         return {
             "errCode": 0,
             "message": "success",
             "data": solutions
         }
 
+    def stream_all_solutions(self) -> AsyncIterator[bytes]:
+        """
+        流式获取所有解决方案（NDJSON，每行一个解决方案）
+        """
+        return self.solution_crud.stream_all_solutions()
+
     async def get_solution_by_report_id(self, report_id: int) -> Dict[str, Any]:
         """
         根据报告ID获取解决方案
@@ -452,7 +451,7 @@ class SolutionServe:
         :return: 插入结果
         """
         data={
-            "id":self.solution_crud.db["solution_note"].count_documents({}) + 1,
+            "id": await self.solution_crud.next_SN_id(),
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
             "update_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),    
             "title": title,
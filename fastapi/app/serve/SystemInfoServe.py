@@ -1,70 +1,322 @@
 import asyncio
+import datetime
 import sys
 import os
 
 #自己的路径
 sys.path.append(os.path.abspath("./fastapi"))
 
-from typing import List, Dict, Any
-from app.crud.SystemInfoCrud import SystemInfoCrud
-from app.dataoperate.datacollect import DataCollect
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
+from app.core.timeutil import prefix_range, to_timestamp_str
+from app.crud.SystemInfoCrud import SystemInfoCrud, sample_projection
+from app.core.projection import apply_projection
+from app.crud.RollupCrud import RollupCrud
+from app.dataoperate.rollup import (
+    system_info_rollup, choose_tier, extract_metrics, bucket_start, ROLLUP_METRIC_NAMES, QUERY_TIERS
+)
+from app.crud.RollupCrud import ROLLUP_TIERS
+from app.dataoperate.retention import retention_engine
+from app.crud.WriteBuffer import system_info_writer, system_info_bucket_writer
+from app.dataoperate.bucketlayout import system_info_bucketer
+from app.crud.LocalMetricCrud import local_metric_store
+from app.crud.SpoolCrud import system_info_replayer
+from app.core.config import (
+    HOST_ID, SYSTEM_INFO_STORAGE, DAILY_SUMMARY_PAGE_SIZE, DAILY_RAW_PAGE_SIZE, DAILY_MAX_PAGE_SIZE,
+    RANGE_DEFAULT_POINTS, RANGE_MAX_POINTS, RANGE_OVERSAMPLE, RANGE_VALUE_DECIMALS
+)
+from app.core.dbexecutor import run_db
+from app.dataoperate.downsample import downsample_series
+from app.core.database import database_manager
+from app.dataoperate.sampler import system_sampler
+from app.dataoperate.livechannel import live_channel
 
+FLEET_STATS = ("mean", "max", "min", "last")
+FLEET_MAX_LIMIT = 1000
 
-datacollect = DataCollect()
 
 class SystemInfoServe:
     def __init__(self):
         self.crud = SystemInfoCrud()
-    async def get_system_info(self) -> Dict[str, Any]:
+        self.rollup_crud = RollupCrud()
+    async def get_system_info(self, fields: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         获取系统信息
+        :param fields: 只返回这些字段（见 SystemInfoCrud.PROJECTABLE_FIELDS），为空时返回完整快照
         """
-        # 调用数据采集方法
-        data = await datacollect.collect_data()
-        # 返回采集到的系统信息
-        return data
+        projection = sample_projection(fields)
+        # 直接返回后台采集任务的最新快照，接口访问不再触发采集
+        return apply_projection(await system_sampler.get_latest(), projection)
     
-    async def get_daily_system_info(self) -> List[Dict[str, Any]]:
+    async def get_collector_status(self) -> Dict[str, Any]:
         """
-        获取每日系统信息
+        获取后台采集、实时推送与写入队列的运行状态（订阅数、队列深度、刷写延迟、丢弃数等）
+        以及 MongoDB 连接池状态（连接数、取连接等待时间与命令执行时间分开统计）
         """
-        data = await self.crud.find_systeminfo()
-        date = []
-        for i in data:
-            date.append(i["timestamp"].split(" ")[0])
-        date = list(set(date))
-        # 从数据库中获取每日系统信息
-        system_info = []
-        for i in date:
-            daily_info = {
-                "date": i,
-                "system_info": [j for j in data if j["timestamp"].split(" ")[0] == i]
-            }
-            system_info.append(daily_info)
-        
-        return system_info
-        
-    async def get_daily_system_info_by_date(self,date: str) -> List[Dict[str, Any]]:
+        return {
+            "sampler": system_sampler.stats(),
+            "live": live_channel.stats(),
+            "spool": system_info_replayer.stats(),
+            "writer": system_info_writer.stats(),
+            "bucket_writer": dict(system_info_bucket_writer.stats(), **system_info_bucketer.stats()),
+            "rollup": system_info_rollup.stats(),
+            "retention": retention_engine.stats(),
+            "database": database_manager.stats(),
+            "local_store": local_metric_store.stats() if SYSTEM_INFO_STORAGE == "local" else None
+        }
+
+    async def get_daily_system_info(self, mode: str = "summary", page: int = 1, page_size: Optional[int] = None,
+                                    host_id: Optional[str] = None, start: Optional[str] = None,
+                                    end: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        获取每日系统信息（分页，最新的在第一页）
+        - summary：每天一条汇总（样本数、异常样本数、主要指标的 min / mean / max），由数据库按天分组聚合，按天分页
+        - raw：原始样本按样本分页，本页样本按日期归组为 {"date", "system_info"}，组内按时间升序
+        :param mode: "summary" 或 "raw"
+        :param page: 页码，从 1 开始
+        :param page_size: 每页天数（summary）或样本数（raw），为空时取默认值
+        :param host_id: 主机标识，为空时返回所有主机
+        :param start: 起始时间前缀，如 2025-07-01，为空时不限
+        :param end: 结束时间前缀（含该前缀表示的整段时间），为空时不限
+        :param fields: raw 模式下只返回这些样本字段，为空时返回完整样本
+        :return: {"mode", "page", "page_size", "total", "days": [...]}，total 为天数（summary）或样本数（raw）
+        """
+        if mode not in ("summary", "raw"):
+            raise ValueError("mode 应为 summary 或 raw")
+        if fields and mode != "raw":
+            raise ValueError("fields 只用于 raw 模式")
+        if page_size is None:
+            page_size = DAILY_SUMMARY_PAGE_SIZE if mode == "summary" else DAILY_RAW_PAGE_SIZE
+        if page < 1 or not 1 <= page_size <= DAILY_MAX_PAGE_SIZE:
+            raise ValueError(f"page 应不小于 1，page_size 应在 1 到 {DAILY_MAX_PAGE_SIZE} 之间")
+        start_time = prefix_range(start)[0] if start else None
+        end_time = prefix_range(end)[1] if end else None
+        if mode == "summary":
+            summaries = await self.crud.summarize_days(start_time, end_time, host_id)
+            total = len(summaries)
+            days = summaries[(page - 1) * page_size:page * page_size]
+        else:
+            total, samples = await self.crud.find_systeminfo_page(page, page_size, start_time, end_time, host_id, fields)
+            days = []
+            for sample in reversed(samples):
+                date = sample["timestamp"].split(" ")[0]
+                if not days or days[0]["date"] != date:
+                    days.insert(0, {"date": date, "system_info": []})
+                days[0]["system_info"].append(sample)
+        return {"mode": mode, "page": page, "page_size": page_size, "total": total, "days": days}
+
+    async def get_daily_system_info_by_date(self, date: str, host_id: Optional[str] = None,
+                                            fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         获取每日系统信息
+        :param host_id: 主机标识，为空时返回所有主机
+        :param fields: 只返回这些样本字段，为空时返回完整样本
         """
-        data = await self.crud.find_systeminfo()
-        # 从数据库中获取每日系统信息
+        # 按时间索引只取当天的数据，指定主机时走 (主机, 时间) 复合索引
+        data = await self.crud.find_systeminfo_by_date(date, host_id, fields)
         system_info = []
         daily_info = {
             "date": date,
-            "system_info": [j for j in data if j["timestamp"].split(" ")[0] == date]
+            "system_info": data
         }
         system_info.append(daily_info)
         
         return system_info
-    async def get_nearly_system_info(self):
+    def stream_daily_system_info_by_date(self, date: str, host_id: Optional[str] = None,
+                                         fields: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+        """
+        流式获取某一天的系统信息（NDJSON，每行一条样本，按时间升序），内存占用与样本数无关
+        :param host_id: 主机标识，为空时返回所有主机
+        :param fields: 只返回这些样本字段，为空时返回完整样本
+        """
+        return self.crud.stream_systeminfo_by_date(date, host_id, fields)
+
+    async def _select_tier(self, start_time: datetime.datetime, end_time: datetime.datetime,
+                           resolution: Optional[float], host_id: Optional[str]) -> Tuple[str, int]:
+        """
+        选择读取的数据层级：先按分辨率选最粗的层级（见 choose_tier），该层级在时间范围内没有汇总数据时
+        （如启用汇总之前写入的历史样本、尚未刷写的最近数据）逐级退到更细的层级，直至原始样本
+        本地存储布局不维护汇总层级，直接读取原始样本
+        :return: (层级名, 桶宽度秒数)
+        """
+        if SYSTEM_INFO_STORAGE == "local":
+            return "raw", 1
+        chosen = choose_tier(start_time, end_time, resolution)
+        for tier, seconds in QUERY_TIERS[QUERY_TIERS.index(chosen):]:
+            if tier == "raw" or await self.rollup_crud.has_rollups(tier, start_time, end_time, host_id):
+                return tier, seconds
+        return QUERY_TIERS[-1]
+
+    async def get_metric_series(self, start: str, end: str, fields: Optional[List[str]] = None,
+                                resolution: Optional[float] = None, host_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取指标时间序列，自动选择满足分辨率要求的最粗汇总层级（1h / 1m / 原始样本）
+        :param start: 起始时间前缀，如 2025-07-01 或 2025-07-01 08
+        :param end: 结束时间前缀（含该前缀表示的整段时间）
+        :param fields: 指标字段，为空时返回全部汇总字段
+        :param resolution: 期望的点间隔（秒），为空时按时间跨度自动计算
+        :param host_id: 主机标识，为空时返回所有主机
+        :return: {"tier", "resolution", "fields", "points": [{"timestamp", "host_id", <字段>: {"min", "max", "mean", "last"}}]}
+        """
+        fields = fields or ROLLUP_METRIC_NAMES
+        unknown = [f for f in fields if f not in ROLLUP_METRIC_NAMES]
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+        start_time = prefix_range(start)[0]
+        end_time = prefix_range(end)[1]
+        tier, seconds = await self._select_tier(start_time, end_time, resolution, host_id)
+        if tier != "raw":
+            points = await self.rollup_crud.find_buckets(tier, start_time, end_time, fields, host_id)
+        else:
+            points = []
+            for sample in await self.crud.find_metric_samples(start_time, end_time, host_id):
+                metrics = extract_metrics(sample)
+                point = {"timestamp": sample["timestamp"], "host_id": sample.get("host_id")}
+                for field in fields:
+                    value = metrics.get(field)
+                    point[field] = None if value is None else {"min": value, "max": value, "mean": value, "last": value}
+                points.append(point)
+        return {"tier": tier, "resolution": seconds, "fields": fields, "points": points}
+
+    async def get_range_series(self, start: str, end: Optional[str] = None, metrics: Optional[List[str]] = None,
+                               points: int = RANGE_DEFAULT_POINTS, stat: str = "mean",
+                               host_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取时间范围内若干指标的图表序列，在服务端用 LTTB 降采样到目标点数
+        数据层级按「目标点数 × RANGE_OVERSAMPLE」选择（7 天约读取 1 万个分钟级桶），降采样只保留曲线形状上的关键点
+        :param start: 起始时间前缀，如 2025-07-01 或 2025-07-01 08
+        :param end: 结束时间前缀（含该前缀表示的整段时间），为空时到当前时间
+        :param metrics: 汇总字段，如 cpu_percent、memory_percent
+        :param points: 每个指标的目标点数
+        :param stat: 汇总层级取桶内的哪项统计值，"mean"、"max"、"min" 或 "last"；原始样本层级忽略
+        :param host_id: 主机标识，为空时为本机（不同主机的序列不能混在一条曲线里）
+        :return: {"tier", "resolution", "host_id", "start", "end", "source_points",
+                  "series": {指标: [[毫秒时间戳, 取值], ...]}}
+        """
+        if not metrics:
+            raise ValueError("metrics 不能为空")
+        unknown = [m for m in metrics if m not in ROLLUP_METRIC_NAMES]
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+        if stat not in FLEET_STATS:
+            raise ValueError(f"stat 应为 {', '.join(FLEET_STATS)} 之一")
+        if not 3 <= points <= RANGE_MAX_POINTS:
+            raise ValueError(f"points 应在 3 到 {RANGE_MAX_POINTS} 之间")
+        start_time = prefix_range(start)[0]
+        end_time = prefix_range(end)[1] if end is not None else datetime.datetime.now()
+        if start_time >= end_time:
+            raise ValueError("起始时间应早于结束时间")
+        host_id = host_id or HOST_ID
+        resolution = (end_time - start_time).total_seconds() / (points * RANGE_OVERSAMPLE)
+        tier, seconds = await self._select_tier(start_time, end_time, resolution, host_id)
+        if tier != "raw":
+            times, columns = await self.rollup_crud.find_columns(tier, start_time, end_time, metrics, stat, host_id)
+        else:
+            times, columns = await self.crud.find_metric_columns(start_time, end_time, metrics, host_id)
+        series = await run_db(downsample_series, times, columns, points, RANGE_VALUE_DECIMALS)
+        return {"tier": tier, "resolution": seconds, "host_id": host_id, "start": to_timestamp_str(start_time),
+                "end": to_timestamp_str(end_time), "source_points": len(times), "series": series}
+
+    def _fleet_window(self, start: Optional[str], end: Optional[str],
+                      minutes: Optional[float]) -> Tuple[str, datetime.datetime, datetime.datetime]:
+        """
+        解析全体主机查询的时间窗口，并选择汇总层级：窗口两端都对齐到整点时用 1h 层级，否则用 1m 层级
+        :return: (层级名, 起始时间, 结束时间)，起始时间向下取整到桶边界
+        """
+        if start is not None:
+            start_time = prefix_range(start)[0]
+            end_time = prefix_range(end)[1] if end is not None else datetime.datetime.now()
+        else:
+            end_time = datetime.datetime.now()
+            start_time = end_time - datetime.timedelta(minutes=minutes or 60)
+        if start_time >= end_time:
+            raise ValueError("起始时间应早于结束时间")
+        hour = ROLLUP_TIERS["1h"][1]
+        if bucket_start(start_time, hour) == start_time and bucket_start(end_time, hour) == end_time:
+            return "1h", start_time, end_time
+        return "1m", bucket_start(start_time, ROLLUP_TIERS["1m"][1]), end_time
+
+    async def _fleet_from_samples(self, start: datetime.datetime, end: datetime.datetime,
+                                  field: str) -> List[Dict[str, Any]]:
+        """本地存储布局没有汇总层级，从原始样本按主机计算统计值"""
+        hosts: Dict[Any, Dict[str, Any]] = {}
+        for sample in await self.crud.find_metric_samples(start, end):
+            host = hosts.setdefault(sample.get("host_id"), {"host_id": sample.get("host_id"), "samples": 0})
+            host["last_seen"] = sample["timestamp"]
+            value = extract_metrics(sample).get(field)
+            if value is None:
+                continue
+            if host["samples"] == 0:
+                host.update({"min": value, "max": value, "sum": 0.0})
+            host["min"] = min(host["min"], value)
+            host["max"] = max(host["max"], value)
+            host["sum"] += value
+            host["last"] = value
+            host["samples"] += 1
+        result = []
+        for host in hosts.values():
+            if host["samples"]:
+                host["mean"] = host.pop("sum") / host["samples"]
+                result.append(host)
+        return result
+
+    async def get_fleet_top(self, field: str = "cpu_percent", stat: str = "mean", limit: int = 10,
+                            start: Optional[str] = None, end: Optional[str] = None,
+                            minutes: Optional[float] = None) -> Dict[str, Any]:
+        """
+        获取时间窗口内某个指标排名前 N 的主机，由汇总层级在服务端按主机聚合得出，不扫描原始样本
+        :param field: 汇总字段，如 cpu_percent、memory_percent
+        :param stat: 排序依据，"mean"、"max"、"min" 或 "last"
+        :param limit: 返回的主机数
+        :param start: 起始时间前缀，如 2025-07-01 或 2025-07-01 08；为空时取最近 minutes 分钟
+        :param end: 结束时间前缀（含该前缀表示的整段时间），为空时到当前时间
+        :param minutes: 未指定 start 时的窗口长度（分钟），默认 60
+        :return: {"tier", "field", "stat", "start", "end", "hosts": [{"host_id", "min", "max", "mean", "last", "samples", "last_seen"}]}
+        """
+        if field not in ROLLUP_METRIC_NAMES:
+            raise ValueError(f"不支持的字段: {field}")
+        if stat not in FLEET_STATS:
+            raise ValueError(f"stat 应为 {', '.join(FLEET_STATS)} 之一")
+        if not 1 <= limit <= FLEET_MAX_LIMIT:
+            raise ValueError(f"limit 应在 1 到 {FLEET_MAX_LIMIT} 之间")
+        tier, start_time, end_time = self._fleet_window(start, end, minutes)
+        if SYSTEM_INFO_STORAGE == "local":
+            tier = "raw"
+            hosts = await self._fleet_from_samples(start_time, end_time, field)
+            hosts.sort(key=lambda host: (-host[stat], str(host["host_id"])))
+            hosts = hosts[:limit]
+        else:
+            hosts = await self.rollup_crud.top_hosts(tier, start_time, end_time, field, stat, limit)
+        return {"tier": tier, "field": field, "stat": stat, "start": to_timestamp_str(start_time),
+                "end": to_timestamp_str(end_time), "hosts": hosts}
+
+    async def get_fleet_hosts(self, start: Optional[str] = None, end: Optional[str] = None,
+                              minutes: Optional[float] = None) -> Dict[str, Any]:
+        """
+        获取时间窗口内上报过样本的主机及其样本数、首末时间
+        :return: {"tier", "start", "end", "hosts": [{"host_id", "samples", "first_seen", "last_seen"}]}
+        """
+        tier, start_time, end_time = self._fleet_window(start, end, minutes)
+        if SYSTEM_INFO_STORAGE == "local":
+            tier = "raw"
+            hosts: Dict[Any, Dict[str, Any]] = {}
+            for sample in await self.crud.find_metric_samples(start_time, end_time):
+                host = hosts.setdefault(sample.get("host_id"), {
+                    "host_id": sample.get("host_id"), "samples": 0, "first_seen": sample["timestamp"]})
+                host["samples"] += 1
+                host["last_seen"] = sample["timestamp"]
+            hosts = sorted(hosts.values(), key=lambda host: str(host["host_id"]))
+        else:
+            hosts = await self.rollup_crud.find_hosts(tier, start_time, end_time)
+        return {"tier": tier, "start": to_timestamp_str(start_time), "end": to_timestamp_str(end_time), "hosts": hosts}
+
+    async def get_nearly_system_info(self, host_id: Optional[str] = None):
         """
         获取近七天系统信息
+        :param host_id: 主机标识，为空时返回所有主机
         """
         res=[]
         edate=[]
-        data = await self.crud.get_nearly_system_info()
+        data = await self.crud.get_nearly_system_info(host_id)
         for i in data:
             if len(i['system_info'])!=0:
                 edate.append(i['date'])
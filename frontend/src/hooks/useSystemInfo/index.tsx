@@ -1,51 +1,48 @@
 import { SystemInfoContext } from "@/contexts/SystemInfoContext";
-import useSystemInfoService from "@/services/useSystemInfoService";
-import { useCallback, useContext, useEffect } from "react";
-import useSWR from "swr";
+import type { SystemInfo } from "@/services/useSystemInfoService/type";
+import { useContext, useEffect } from "react";
 
-const useSystemInfo = () => {
-  const { getSystemInfo } = useSystemInfoService();
+// 服务端实时推送（SSE）：后台采集每产生一个样本推送一次，连接建立后先收到最新样本
+const LIVE_URL = `${import.meta.env.VITE_API_BASE_URL ?? ""}/systeminfo/live`;
 
+const useSystemInfo = () => {
   // 获取 SystemInfo 的 Dispatch 函数
   const { dispatch } = useContext(SystemInfoContext);
 
-  // 第一步封装原始 getDashBoardSystemInfo，解构出 data
-  const getAllSystemInfo = useCallback(async () => {
-    const res = await getSystemInfo();
-    return res.data;
-  }, [getSystemInfo])
-
-  // 使用 useSWR 进行轮询
-  const SWROptions = {
-    refreshInterval: 30000, // 30s 轮询一次
-    refreshWhenHidden: true, // 页面离开时继续轮询
-    refreshWhenOffline: false, // 离线时轮询
-  }
-
-  const { data: systemInfo, error } = useSWR('/systeminfo/getsysteminfo', getAllSystemInfo, SWROptions);
-
-  // systemInfo 获取到以后，更新 state（包括异常检测状态）
   useEffect(() => {
-    if (!systemInfo) return;
-    dispatch({
-      type: 'Update_State',
-      payload: systemInfo
-    });
-  }, [systemInfo, dispatch]);
+    // EventSource 断开后按服务端给出的 retry 间隔自动重连，服务端也会定期主动断开让客户端重连
+    const source = new EventSource(LIVE_URL);
 
-  // 处理获取数据时的错误
-  useEffect(() => {
-    if (error) {
+    // 收到新样本后更新 state（包括异常检测状态）
+    const onSample = (event: MessageEvent<string>) => {
+      const systemInfo: SystemInfo = JSON.parse(event.data);
       dispatch({
-        type: 'Set_Detection_Error',
-        payload: error.message || '获取系统信息失败'
+        type: 'Update_State',
+        payload: systemInfo
       });
-    } else {
+    };
+
+    source.addEventListener('sample', onSample);
+    source.onopen = () => {
       dispatch({
         type: 'Clear_Detection_Error'
       });
-    }
-  }, [error, dispatch]);
+    };
+    // 处理连接错误：正在重连时不提示，连接被关闭（如服务不可用）时提示
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        dispatch({
+          type: 'Set_Detection_Error',
+          payload: '获取系统信息失败'
+        });
+      }
+    };
+
+    return () => {
+      source.removeEventListener('sample', onSample);
+      source.close();
+    };
+  }, [dispatch]);
 }
 
-export default useSystemInfo;
\ No newline at end of file
+export default useSystemInfo;
@@ -59,3 +59,59 @@ export interface IResponse<T> {
   message?: string;
   data: T;
 }
+
+// 读取 NDJSON 流式响应（stream=true）：每收到一批完整的行就回调一次，可在查询结束前开始渲染
+// 服务端中途出错时会输出一行 {"errCode": 1, "message": ...}，这里转为异常抛出
+export const streamNdjson = async <T>(
+  url: string,
+  params: Record<string, any>,
+  onRows: (rows: T[]) => void,
+  signal?: AbortSignal
+): Promise<number> => {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined && value !== null) query.append(key, String(value));
+  });
+  query.set("stream", "true");
+  const response = await fetch(
+    `${import.meta.env.VITE_API_BASE_URL ?? ""}${url}?${query.toString()}`,
+    { signal }
+  );
+  if (!response.ok || !response.body) {
+    throw new Error(`HTTP ${response.status}`);
+  }
+  const contentType = response.headers.get("content-type") ?? "";
+  if (!contentType.includes("ndjson")) {
+    // 参数错误等情况在开始输出前返回普通 JSON
+    const result = await response.json();
+    throw new Error(result.message ?? "请求失败");
+  }
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  let total = 0;
+  const flush = (lines: string[]) => {
+    const rows: T[] = [];
+    for (const line of lines) {
+      if (!line) continue;
+      const row = JSON.parse(line);
+      if (row && typeof row === "object" && row.errCode === 1 && "message" in row) {
+        throw new Error(row.message);
+      }
+      rows.push(row);
+    }
+    if (rows.length) {
+      total += rows.length;
+      onRows(rows);
+    }
+  };
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    const lines = buffer.split("\n");
+    buffer = lines.pop() ?? "";
+    flush(lines);
+  }
+  flush([buffer]);
+  return total;
+};
@@ -1,13 +1,24 @@
-import { request, type IResponse } from "../request";
-import type { SystemInfo, SystenDailyInfo } from "./type";
+import { request, streamNdjson, type IResponse } from "../request";
+import type {
+  DailySummary,
+  DailySystemInfoPage,
+  DailySystemInfoQuery,
+  RangeSeries,
+  RangeSeriesQuery,
+  SystemInfo,
+  SystenDailyInfo
+} from "./type";
 
 const useSystemInfoService = () => {
   const getSystemInfo = (): Promise<IResponse<SystemInfo>> => {
     return request("get", "/systeminfo/getsysteminfo");
   };
 
-  const getDailySystemInfo = (): Promise<IResponse<SystenDailyInfo>> => {
-    return request("get", "/systeminfo/getdailysysteminfo");
+  // 默认返回每天的汇总统计（mode=summary），mode=raw 时返回按日期归组的一页原始样本
+  const getDailySystemInfo = (
+    query: DailySystemInfoQuery = {}
+  ): Promise<IResponse<DailySystemInfoPage<DailySummary | SystenDailyInfo[number]>>> => {
+    return request("get", "/systeminfo/getdailysysteminfo", undefined, { params: query });
   }
 
   const getSystemInfoByDate = (
@@ -15,10 +26,26 @@ const useSystemInfoService = () => {
   ): Promise<IResponse<SystenDailyInfo>> => {
     return request("get", `/systeminfo/getdailysysteminfobydate?date=${date}`);
   }; 
+
+  // 时间范围内的图表序列，服务端已降采样到 points 个点（默认 500）
+  const getRangeSeries = (query: RangeSeriesQuery): Promise<IResponse<RangeSeries>> => {
+    return request("get", "/systeminfo/range", undefined, { params: query });
+  };
+
+  // 按批接收某一天的样本（NDJSON），适合数据量大时边接收边渲染，返回收到的总条数
+  const streamSystemInfoByDate = (
+    date: string,
+    onRows: (rows: SystemInfo[]) => void,
+    signal?: AbortSignal
+  ): Promise<number> => {
+    return streamNdjson<SystemInfo>("/systeminfo/getdailysysteminfobydate", { date }, onRows, signal);
+  };
   return {
     getSystemInfo,
     getDailySystemInfo,
-    getSystemInfoByDate
+    getSystemInfoByDate,
+    getRangeSeries,
+    streamSystemInfoByDate
   }
 }
 
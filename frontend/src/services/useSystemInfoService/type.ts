@@ -1,12 +1,14 @@
 export interface SystemInfo {
   _id: string;
   anomaly_id: number;
+  host_id?: string;
   cpu_info: CpuInfo;
   disk_info: DiskInfo[];
   id: number;
   memory_info: MemoryInfo;
   network_info: NetworkInfo;
   process_info: ProcessInfo[];
+  process_summary?: ProcessSummary;
   timestamp: string;
   risk_score?: number;
 }
@@ -25,6 +27,10 @@ export interface CpuStats {
   interrupts: number;
   soft_interrupts: number;
   syscalls: number;
+  ctx_switches_per_sec?: number | null;
+  interrupts_per_sec?: number | null;
+  soft_interrupts_per_sec?: number | null;
+  syscalls_per_sec?: number | null;
 }
 
 export interface DiskInfo {
@@ -33,6 +39,18 @@ export interface DiskInfo {
   mountpoint: string;
   total_disk_gb: number;
   used_disk_gb: number;
+  disk_io?: DiskIo;
+}
+
+export interface DiskIo {
+  read_count: number;
+  write_count: number;
+  read_bytes: number;
+  write_bytes: number;
+  read_count_per_sec?: number | null;
+  write_count_per_sec?: number | null;
+  read_bytes_per_sec?: number | null;
+  write_bytes_per_sec?: number | null;
 }
 
 export interface MemoryInfo {
@@ -59,6 +77,10 @@ export interface NetworkInfo {
   bytes_sent_kb: number;
   packets_recv: number;
   packets_sent: number;
+  bytes_recv_kb_per_sec?: number | null;
+  bytes_sent_kb_per_sec?: number | null;
+  packets_recv_per_sec?: number | null;
+  packets_sent_per_sec?: number | null;
 }
 
 export interface ProcessInfo {
@@ -69,7 +91,72 @@ export interface ProcessInfo {
   username: string;
 }
 
+export interface ProcessSummary {
+  total_count: number;
+  top_cpu_pids: number[];
+  top_memory_pids: number[];
+  rest: {
+    count: number;
+    cpu_percent: number;
+    memory_percent: number;
+  };
+}
+
 export type SystenDailyInfo = {
   date: string;
   system_info: SystemInfo[];
 }[];
+
+export interface MetricSummary {
+  min: number;
+  mean: number;
+  max: number;
+}
+
+export interface DailySummary {
+  date: string;
+  count: number;
+  anomaly_count: number;
+  metrics: Record<string, MetricSummary | null>;
+}
+
+export interface DailySystemInfoQuery {
+  mode?: "summary" | "raw";
+  page?: number;
+  page_size?: number;
+  host_id?: string;
+  start?: string;
+  end?: string;
+  // raw 模式下只返回这些字段（逗号分隔），如 "cpu_info.cpu_percent,memory_info.memory_percent"
+  fields?: string;
+}
+
+export interface DailySystemInfoPage<T> {
+  mode: "summary" | "raw";
+  page: number;
+  page_size: number;
+  total: number;
+  days: T[];
+}
+
+// /systeminfo/range：服务端 LTTB 降采样后的图表序列
+export interface RangeSeriesQuery {
+  start: string;
+  end?: string;
+  // 逗号分隔的汇总字段，如 "cpu_percent,memory_percent"
+  metrics: string;
+  points?: number;
+  stat?: "mean" | "max" | "min" | "last";
+  host_id?: string;
+}
+
+export interface RangeSeries {
+  tier: "1h" | "1m" | "raw";
+  resolution: number;
+  host_id: string;
+  start: string;
+  end: string;
+  source_points: number;
+  // 每个指标为 [毫秒时间戳, 取值] 数组，可直接作为 echarts 时间轴折线的 data
+  series: Record<string, [number, number][]>;
+}